@@ -1,17 +1,121 @@
 # Description: A program that allows a user to play an transportation themed chesslike board game.
 # The game takes place on a 7x7 grid with 4 different piece types, each with different movement patterns
 
+import random
+from collections.abc import Mapping
+from itertools import chain, repeat
+
+#squares are stored internally as integers 0-48, counting left to right from a1 (0) to g7 (48)
+COLUMNS = "abcdefg"
+ROWS = "1234567"
+BOARD_WIDTH = 7
+SQUARES = [f"{column}{row}" for row in ROWS for column in COLUMNS]
+SQUARE_INDEX = {square: index for index, square in enumerate(SQUARES)}
+
+#(column step, row step) for each of the 8 directions a piece can travel
+ORTHOGONAL_STEPS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+DIAGONAL_STEPS = ((1, 1), (1, -1), (-1, -1), (-1, 1))
+
+
+def build_move_tables(direction, maximum_distance, locomotion):
+    """
+    Precomputes every ray a piece type can travel from every square. Each ray is a tuple of square indexes in the
+    order the piece passes over them, so a move is legal when every square before the destination is empty. Jumping
+    pieces get single square rays because nothing can block them. Every piece can also move 1 square in any direction
+    that isn't its main direction.
+
+    :param direction: "DIAGONAL" or "ORTHOGONAL"
+    :param maximum_distance: Farthest the piece can travel in its main direction
+    :param locomotion: "SLIDING" or "JUMPING"
+
+    :return: Tuple of (rays, paths, ray_indexes) where rays[square] is a tuple of rays, paths[square] maps each
+        reachable destination to the tuple of squares that must be empty along the way, and ray_indexes[square] maps
+        each reachable destination to the position of its ray in rays[square]
+    """
+    if direction == "DIAGONAL":
+        main_steps = DIAGONAL_STEPS
+        other_steps = ORTHOGONAL_STEPS
+    else:
+        main_steps = ORTHOGONAL_STEPS
+        other_steps = DIAGONAL_STEPS
+
+    if locomotion == "SLIDING":
+        main_distances = range(1, maximum_distance + 1)
+    else:
+        main_distances = (maximum_distance,)
+
+    rays = []
+    paths = []
+    ray_indexes = []
+    for square in range(BOARD_WIDTH * BOARD_WIDTH):
+        column, row = square % BOARD_WIDTH, square // BOARD_WIDTH
+        square_rays = []
+        square_paths = {}
+        square_ray_indexes = {}
+
+        for steps, distances in ((main_steps, main_distances), (other_steps, (1,))):
+            for column_step, row_step in steps:
+                ray = []
+                for distance in distances:
+                    target_column = column + column_step * distance
+                    target_row = row + row_step * distance
+                    if not (0 <= target_column < BOARD_WIDTH and 0 <= target_row < BOARD_WIDTH):
+                        break
+                    ray.append(target_row * BOARD_WIDTH + target_column)
+
+                for position, target in enumerate(ray):
+                    square_paths[target] = tuple(ray[:position])
+                    square_ray_indexes[target] = len(square_rays)
+                if ray:
+                    square_rays.append(tuple(ray))
+
+        rays.append(tuple(square_rays))
+        paths.append(square_paths)
+        ray_indexes.append(square_ray_indexes)
+
+    return tuple(rays), tuple(paths), tuple(ray_indexes)
+
+
 class Piece:
     """
     Represents a piece on the ChessLike game board along with relevant attributes. Acts as the parent class of the
-    specific pieces on the board (Helicopter, Train, Car, and Bike)
+    specific pieces on the board (Helicopter, Train, Car, and Bike). Pieces never change once made, so there is only
+    one piece object for each type and color and every game shares it.
     """
-    def __init__(self, color, direction, maximum_distance, locomotion, name):
-        self._color = color
-        self._direction = direction
-        self._maximum_distance = maximum_distance
-        self._locomotion = locomotion
-        self._name = name
+    __slots__ = ("_color",)
+
+    #movement rules and move tables are set on each subclass, the tables are built once at import time
+    _name = None
+    _direction = None
+    _maximum_distance = None
+    _locomotion = None
+    _rays = None
+    _paths = None
+    _ray_indexes = None
+
+    #the shared piece object for each (class, color)
+    _instances = {}
+
+    def __new__(cls, color):
+        piece = Piece._instances.get((cls, color))
+        if piece is None:
+            piece = super().__new__(cls)
+            object.__setattr__(piece, "_color", color)
+            Piece._instances[(cls, color)] = piece
+
+        return piece
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Pieces can't be changed")
+
+    def __reduce__(self):
+        return type(self), (self._color,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def get_color(self):
         return self._color
@@ -28,58 +132,84 @@ class Piece:
     def get_name(self):
         return self._name
 
-    def can_move(self, game, origin, destination):
+    def get_rays(self, origin):
+        """
+        Returns the precomputed rays for this piece type from the origin square
+
+        :param origin: Square index 0-48
+
+        :return: Tuple of rays, each a tuple of square indexes ordered outward from the origin
         """
-        Default function that should be overridden by subclasses
+        return self._rays[origin]
+
+    def get_ray_index(self, origin, destination):
         """
-        raise NotImplementedError("Subclasses must implement can_move()")
+        Returns which of the piece's rays from the origin passes over the destination
 
+        :param origin: Square index 0-48
+        :param destination: Square index 0-48 on one of the rays
 
-class Helicopter(Piece):
-    """
-    Represents a Helicopter piece on the game board and holds the current position of the piece along with the attributes
-    that determine legal moves. Inherits from the Piece class. Interacts with the ChessLike class.
-    """
-    def __init__(self, color):
-        super().__init__(color, "DIAGONAL", 2, "JUMPING", "Helicopter")
+        :return: Position of the ray in get_rays(origin)
+        """
+        return self._ray_indexes[origin][destination]
 
     def can_move(self, game, origin, destination):
         """
-        Determines if the Helicopter piece can move down the specified path given by the player
+        Determines if the piece can move down the specified path given by the player
+
+        :param game: The ChessLike game the piece is on
+        :param origin: Starting square in board notation
+        :param destination: Target square in board notation
+
+        :return: True if the piece's movement rules allow the move, False otherwise
         """
+        origin_index = SQUARE_INDEX.get(origin)
+        destination_index = SQUARE_INDEX.get(destination)
+        if origin_index is None or destination_index is None:
+            return False
 
-        #stores origin and destination row/column identifiers in separate variables
-        origin_column = origin[0]
-        origin_row = int(origin[1])
-        destination_column = destination[0]
-        destination_row = int(destination[1])
+        return self.can_move_index(game, origin_index, destination_index)
 
-        #calculates the distance traveled in the x and y dimensions and stores in variables
-        x_delta = abs(ord(origin_column) - ord(destination_column))
-        y_delta = abs(origin_row - destination_row)
+    def can_move_index(self, game, origin, destination):
+        """
+        Integer square version of can_move used by the game's internal rule checks
 
-        #the distance a piece moves is the maximum between the x and y deltas
-        distance = max(x_delta, y_delta)
+        :param game: The ChessLike game the piece is on
+        :param origin: Starting square index 0-48
+        :param destination: Target square index 0-48
 
-        if distance == 0:
-            return False
+        :return: True if the piece's movement rules allow the move, False otherwise
+        """
+        if self._paths is None:
+            raise NotImplementedError("Subclasses must provide move tables")
 
-        #if the move is not diagonal
-        if x_delta != y_delta:
-            #the piece can move orthogonal for a distance of one
-            if distance == 1:
-                return True
-            #return False if an imperfect diagonal is entered by the player
-            else:
-                return False
+        path = self._paths[origin].get(destination)
 
-        # returns false if the piece is told to move any distance other than its max distance
-        if distance != self._maximum_distance:
+        #the destination is not on any of the piece's rays
+        if path is None:
             return False
 
+        #if a piece is in the path of the moving piece, return False
+        for square in path:
+            if not game.is_empty(square):
+                return False
+
         return True
 
 
+class Helicopter(Piece):
+    """
+    Represents a Helicopter piece on the game board and holds the current position of the piece along with the attributes
+    that determine legal moves. Inherits from the Piece class. Interacts with the ChessLike class.
+    """
+    __slots__ = ()
+
+    #jumps exactly 2 squares diagonally or moves 1 square orthogonally
+    _name = "Helicopter"
+    _direction = "DIAGONAL"
+    _maximum_distance = 2
+    _locomotion = "JUMPING"
+    _rays, _paths, _ray_indexes = build_move_tables(_direction, _maximum_distance, _locomotion)
 
 
 class Train(Piece):
@@ -87,188 +217,272 @@ class Train(Piece):
     Represents a Train piece on the game board and holds the current position of the piece along with the attributes
     that determine legal moves. Inherits from the Piece class. Interacts with the ChessLike class.
     """
+    __slots__ = ()
 
-    def __init__(self, color):
-        super().__init__(color, "DIAGONAL", 4, "SLIDING", "Train")
-
-    def can_move(self, game, origin, destination):
-        """
-        Determines if the Train piece can move down the specified path given by the player
-        """
+    #slides up to 4 squares diagonally or moves 1 square orthogonally
+    _name = "Train"
+    _direction = "DIAGONAL"
+    _maximum_distance = 4
+    _locomotion = "SLIDING"
+    _rays, _paths, _ray_indexes = build_move_tables(_direction, _maximum_distance, _locomotion)
 
-        #stores origin and destination row/column identifiers in separate variables
-        origin_column = origin[0]
-        origin_row = int(origin[1])
-        destination_column = destination[0]
-        destination_row = int(destination[1])
 
-        #calculates the distance traveled in the x and y dimensions and stores in variables
-        x_delta = abs(ord(origin_column) - ord(destination_column))
-        y_delta = abs(origin_row - destination_row)
+class Bike(Piece):
+    """
+    Represents a Bike piece on the game board and holds the current position of the piece along with the attributes
+    that determine legal moves. If this piece is captured, the game is over. Inherits from the Piece class.
+    Interacts with the ChessLike class.
+    """
+    __slots__ = ()
 
-        #the distance a piece moves is the maximum between the x and y deltas
-        distance = max(x_delta, y_delta)
+    #moves 1 square in any direction, so there is no path checking
+    _name = "Bike"
+    _direction = "ORTHOGONAL"
+    _maximum_distance = 1
+    _locomotion = "JUMPING"
+    _rays, _paths, _ray_indexes = build_move_tables(_direction, _maximum_distance, _locomotion)
 
-        if distance == 0:
-            return False
 
-        #if the move is not diagonal
-        if x_delta != y_delta:
-            #the piece can move orthogonal for a distance of one
-            if distance == 1:
-                return True
-            #return False if an imperfect diagonal is entered by the player
-            else:
-                return False
+class Car(Piece):
+    """
+    Represents an Car piece on the game board and holds the current position of the piece along with the attributes
+    that determine legal moves. Inherits from the Piece class. Interacts with the ChessLike class.
+    """
+    __slots__ = ()
 
-        # returns false if the piece is told to move any distance greater than its max distance
-        if distance > self._maximum_distance:
-            return False
+    #slides up to 3 squares orthogonally or moves 1 square diagonally
+    _name = "Car"
+    _direction = "ORTHOGONAL"
+    _maximum_distance = 3
+    _locomotion = "SLIDING"
+    _rays, _paths, _ray_indexes = build_move_tables(_direction, _maximum_distance, _locomotion)
 
-        #if locomotion is SLIDING, check every square between origin and destination
-        #these variables increment, decrement or do nothing based on the movement direction
-        column_direction = 0
-        row_direction = 0
+#random 64-bit keys for Zobrist hashing, one per (piece type, color, square) plus one for ORANGE to move. The seed is
+#fixed so hashes are the same in every process and every run
+_zobrist_random = random.Random(0x7C4E55)
+ZOBRIST_PIECES = {
+    (piece_class.__name__, color): tuple(_zobrist_random.getrandbits(64) for _ in SQUARES)
+    for piece_class in (Helicopter, Train, Car, Bike)
+    for color in ("BLUE", "ORANGE")
+}
+ZOBRIST_ORANGE_TURN = _zobrist_random.getrandbits(64)
 
-        if destination_column > origin_column:
-            column_direction = 1
-        elif destination_column < origin_column:
-            column_direction = -1
 
-        if destination_row > origin_row:
-            row_direction = 1
-        elif destination_row < origin_row:
-            row_direction = -1
+#4-bit code per piece used by to_bytes, 0 is an empty square
+CODE_PIECES = dict(enumerate(
+    ((piece_class, color) for color in ("BLUE", "ORANGE") for piece_class in (Helicopter, Train, Car, Bike)), start=1))
+PIECE_CODES = {(piece_class.__name__, color): code for code, (piece_class, color) in CODE_PIECES.items()}
+GAME_STATES = ("UNFINISHED", "BLUE", "ORANGE")
 
-        #initializes the column and row values to be the first square that comes after the origin in the path
-        column = chr(ord(origin_column) + column_direction)
-        row = origin_row + row_direction
+#bytes used by to_bytes: 49 squares packed two to a byte, then one byte for the turn and game state
+ENCODED_SIZE = (len(SQUARES) + 1) // 2 + 1
 
-        #loop executes as long as the column or row has not reached the destination
-        while column != destination_column or row != destination_row:
 
-            #if a piece is in the path of the moving piece, return False
-            if game.get_board()[f"{column}{row}"] is not None:
-                return False
+def zobrist_key(piece, index):
+    """
+    Returns the Zobrist key for a piece standing on a square
 
-            #increments row and column
-            column = chr(ord(column) + column_direction)
-            row += row_direction
+    :param piece: Piece object
+    :param index: Square index 0-48
 
-        return True
+    :return: 64-bit integer key
+    """
+    return ZOBRIST_PIECES[(piece.get_name(), piece.get_color())][index]
 
 
-class Bike(Piece):
+class BoardView(Mapping):
     """
-    Represents a Bike piece on the game board and holds the current position of the piece along with the attributes
-    that determine legal moves. If this piece is captured, the game is over. Inherits from the Piece class.
-    Interacts with the ChessLike class.
+    A read-only, live view of a ChessLike board keyed by board notation. Reads go straight to the game's board, so
+    creating or querying a view never copies the board. Use ChessLike.get_board for a snapshot instead.
     """
 
-    def __init__(self, color):
-        super().__init__(color, "ORTHOGONAL", 1, "JUMPING", "Bike")
+    def __init__(self, board):
+        self._board = board
 
-    def can_move(self, game, origin, destination):
-        """
-        Determines if the Bike piece can move down the specified path given by the player
-        """
+    def __getitem__(self, square):
+        index = SQUARE_INDEX.get(square)
+        if index is None:
+            raise KeyError(square)
 
-        #stores origin and destination row/column identifiers in separate variables
-        origin_column = origin[0]
-        origin_row = int(origin[1])
-        destination_column = destination[0]
-        destination_row = int(destination[1])
+        return self._board[index]
 
-        #calculates the distance traveled in the x and y dimensions and stores in variables
-        x_delta = abs(ord(origin_column) - ord(destination_column))
-        y_delta = abs(origin_row - destination_row)
+    def __iter__(self):
+        return iter(SQUARES)
 
-        #the distance a piece moves is the maximum between the x and y deltas
-        distance = max(x_delta, y_delta)
+    def __len__(self):
+        return len(SQUARES)
 
-        #the Bike can move 1 space in any direction, so there is no path checking
-        if distance != 1:
-            return False
-        else:
-            return True
-        
-class Car(Piece):
+
+class AttackMap:
     """
-    Represents an Car piece on the game board and holds the current position of the piece along with the attributes
-    that determine legal moves. Inherits from the Piece class. Interacts with the ChessLike class.
+    Keeps track of which squares every piece on a board reaches, the reverse map of which pieces reach every square,
+    and every piece's legal moves. Only Train and Car paths can be blocked, so after a move only the pieces standing
+    on the changed squares are walked again in full, and every other piece that reached a changed square only walks
+    again the one ray that passes over it.
     """
 
-    def __init__(self, color):
-        super().__init__(color, "ORTHOGONAL", 3, "SLIDING", "Car")
+    def __init__(self, board):
+        """
+        :param board: The board list of a ChessLike game, which the map reads but never changes
+        """
+        self._board = board
+
+        #for each piece, per ray, the squares it reaches up to and including the first occupied one of any color
+        self._ray_reach = [() for _ in board]
+        #for each piece, per ray, the destinations it can legally move to
+        self._ray_destinations = [() for _ in board]
+        #each piece's legal moves as (origin, destination) tuples, None until asked for after a change
+        self._moves = [() for _ in board]
+        #origins of the pieces that reach each square
+        self._attackers = [set() for _ in board]
+        #squares holding each color's pieces
+        self._origins = {"BLUE": set(), "ORANGE": set()}
+
+        for square in range(len(board)):
+            self._walk_piece(square)
+
+    def get_moves(self, origin):
+        """
+        :param origin: Square index 0-48
 
-    def can_move(self, game, origin, destination):
+        :return: Tuple of the legal (origin, destination) moves of the piece on the square, empty if there is none
         """
-        Determines if the Car piece can move down the specified path given by the player
+        moves = self._moves[origin]
+        if moves is None:
+            moves = tuple(zip(repeat(origin), chain.from_iterable(self._ray_destinations[origin])))
+            self._moves[origin] = moves
+
+        return moves
+
+    def get_origins(self, color):
         """
+        :param color: "BLUE" or "ORANGE"
 
-        #stores origin and destination row/column identifiers in separate variables
-        origin_column = origin[0]
-        origin_row = int(origin[1])
-        destination_column = destination[0]
-        destination_row = int(destination[1])
+        :return: Set of the squares holding that color's pieces
+        """
+        return self._origins[color]
 
-        #calculates the distance traveled in the x and y dimensions and stores in variables
-        x_delta = abs(ord(origin_column) - ord(destination_column))
-        y_delta = abs(origin_row - destination_row)
+    def get_attackers(self, square):
+        """
+        :param square: Square index 0-48
 
-        #the distance a piece moves is the maximum between the x and y deltas
-        distance = max(x_delta, y_delta)
+        :return: Set of the origins of every piece that reaches the square, whichever color holds it
+        """
+        return self._attackers[square]
 
-        if distance == 0:
-            return False
+    def is_attacked(self, square, color):
+        """
+        Checks whether a piece of the given color could move to the square, capturing whatever is on it
+
+        :param square: Square index 0-48
+        :param color: "BLUE" or "ORANGE"
 
-        #if the move is diagonal
-        if x_delta == y_delta:
-            #the piece can move orthogonal for a distance of one
-            if distance == 1:
+        :return: True if a piece of that color reaches the square
+        """
+        for origin in self._attackers[square]:
+            if self._board[origin].get_color() == color:
                 return True
-            #return False if a diagonal greater than 1 is entered by the player
-            else:
-                return False
-        #return False if an imperfect diagonal is entered by the player
-        elif x_delta != 0 and y_delta != 0:
-            return False
 
-        # returns false if the piece is told to move any distance greater than its max distance
-        if distance > self._maximum_distance:
-            return False
+        return False
+
+    def update(self, squares):
+        """
+        Brings the map up to date after the contents of some squares changed
 
-        #Because locomotion is SLIDING, check every square between origin and destination
-        #these variables increment, decrement or do nothing based on the movement direction
-        column_direction = 0
-        row_direction = 0
+        :param squares: Square indexes whose contents changed
 
-        if destination_column > origin_column:
-            column_direction = 1
-        elif destination_column < origin_column:
-            column_direction = -1
+        :return: None
+        """
+        for square in squares:
+            self._walk_piece(square)
 
-        if destination_row > origin_row:
-            row_direction = 1
-        elif destination_row < origin_row:
-            row_direction = -1
+        for square in squares:
+            for origin in list(self._attackers[square]):
+                if origin not in squares:
+                    self._walk_ray(origin, self._board[origin].get_ray_index(origin, square))
 
-        #initializes the column and row values to be the first square that comes after the origin in the path
-        column = chr(ord(origin_column) + column_direction)
-        row = origin_row + row_direction
+    def _walk(self, color, ray):
+        """
+        Walks one ray outward until the first occupied square
 
-        #loop executes as long as the column or row has not reached the destination
-        while column != destination_column or row != destination_row:
+        :param color: Color of the piece walking the ray
+        :param ray: Tuple of square indexes
 
-            #if a piece is in the path of the moving piece, return False
-            if game.get_board()[f"{column}{row}"] is not None:
-                return False
+        :return: Tuple of (reached squares, legal destinations) for the ray
+        """
+        board = self._board
+        for position, square in enumerate(ray):
+            target = board[square]
+            if target is not None:
+                reach = ray[:position + 1]
+                #the piece can capture an opposing piece but is blocked by its own
+                if target.get_color() == color:
+                    return reach, ray[:position]
+                return reach, reach
+
+        return ray, ray
+
+    def _walk_piece(self, origin):
+        """
+        Replaces every entry of the piece on a square, or clears them if the square is now empty
 
-            #increments row and column
-            column = chr(ord(column) + column_direction)
-            row += row_direction
+        :param origin: Square index 0-48
+
+        :return: None
+        """
+        attackers = self._attackers
+        for reach in self._ray_reach[origin]:
+            for square in reach:
+                attackers[square].discard(origin)
+
+        piece = self._board[origin]
+        for origins in self._origins.values():
+            origins.discard(origin)
+
+        if piece is None:
+            self._ray_reach[origin] = ()
+            self._ray_destinations[origin] = ()
+            self._moves[origin] = ()
+            return
+
+        color = piece.get_color()
+        self._origins[color].add(origin)
+        ray_reach = []
+        ray_destinations = []
+        for ray in piece.get_rays(origin):
+            reach, destinations = self._walk(color, ray)
+            for square in reach:
+                attackers[square].add(origin)
+            ray_reach.append(reach)
+            ray_destinations.append(destinations)
+
+        self._ray_reach[origin] = ray_reach
+        self._ray_destinations[origin] = ray_destinations
+        self._moves[origin] = None
+
+    def _walk_ray(self, origin, ray_index):
+        """
+        Walks one ray of a piece again and replaces its entries
+
+        :param origin: Square index 0-48 of the piece
+        :param ray_index: Position of the ray in the piece's rays
+
+        :return: None
+        """
+        attackers = self._attackers
+        ray_reach = self._ray_reach[origin]
+        for square in ray_reach[ray_index]:
+            attackers[square].discard(origin)
+
+        piece = self._board[origin]
+        reach, destinations = self._walk(piece.get_color(), piece.get_rays(origin)[ray_index])
+        for square in reach:
+            attackers[square].add(origin)
+
+        ray_reach[ray_index] = reach
+        self._ray_destinations[origin][ray_index] = destinations
+        self._moves[origin] = None
 
-        return True
 
 class ChessLike:
     """
@@ -276,68 +490,137 @@ class ChessLike:
     moves, and checks for wins. Utilizes the Piece subclasses for movement rules.
     """
 
-    def __init__(self):
+    def __init__(self, silent=False):
+        """
+        :param silent: If True, the game doesn't print anything when it ends, for running many games unattended
+        """
         self._game_state = "UNFINISHED"
         self._turn = "BLUE"
+        self._silent = silent
 
-        self._board = {
-            "a1":Helicopter("BLUE"),
-            "b1":Train("BLUE"),
-            "c1":Car("BLUE"),
-            "d1":Bike("BLUE"),
-            "e1":Car("BLUE"),
-            "f1":Train("BLUE"),
-            "g1":Helicopter("BLUE"),
-            "a2":None,
-            "b2": None,
-            "c2": None,
-            "d2": None,
-            "e2": None,
-            "f2": None,
-            "g2": None,
-            "a3": None,
-            "b3": None,
-            "c3": None,
-            "d3": None,
-            "e3": None,
-            "f3": None,
-            "g3": None,
-            "a4": None,
-            "b4": None,
-            "c4": None,
-            "d4": None,
-            "e4": None,
-            "f4": None,
-            "g4": None,
-            "a5": None,
-            "b5": None,
-            "c5": None,
-            "d5": None,
-            "e5": None,
-            "f5": None,
-            "g5": None,
-            "a6": None,
-            "b6": None,
-            "c6": None,
-            "d6": None,
-            "e6": None,
-            "f6": None,
-            "g6": None,
-            "a7": Helicopter("ORANGE"),
-            "b7": Train("ORANGE"),
-            "c7": Car("ORANGE"),
-            "d7": Bike("ORANGE"),
-            "e7": Car("ORANGE"),
-            "f7": Train("ORANGE"),
-            "g7": Helicopter("ORANGE"),
-        }
+        #the board is a list of 49 squares indexed from a1 (0) to g7 (48), holding a Piece or None
+        self._board = [None] * (BOARD_WIDTH * BOARD_WIDTH)
+
+        back_rank = (Helicopter, Train, Car, Bike, Car, Train, Helicopter)
+        for column, piece_class in enumerate(back_rank):
+            self._board[SQUARE_INDEX[f"{COLUMNS[column]}1"]] = piece_class("BLUE")
+            self._board[SQUARE_INDEX[f"{COLUMNS[column]}7"]] = piece_class("ORANGE")
+
+        #moves made with push, along with what pop needs to take them back
+        self._undo_stack = []
+
+        #built the first time attacks are asked about, then kept up to date move by move
+        self._attack_map = None
+
+        self._hash = self.compute_hash()
 
     def get_game_state(self):
         return self._game_state
 
+    def is_silent(self):
+        return self._silent
+
+    def set_silent(self, silent):
+        self._silent = silent
+
     def get_turn(self):
         return self._turn
 
+    @classmethod
+    def from_bytes(cls, data, silent=False):
+        """
+        Builds a game from the encoding made by to_bytes. The new game has no moves to pop
+
+        :param data: Bytes from to_bytes
+        :param silent: If True, the game doesn't print anything when it ends
+
+        :return: ChessLike game at the encoded position
+        """
+        if len(data) != ENCODED_SIZE:
+            raise ValueError(f"Encoded position must be {ENCODED_SIZE} bytes, got {len(data)}")
+
+        board = []
+        for index in range(len(SQUARES)):
+            code = (data[index >> 1] >> ((index & 1) * 4)) & 0xF
+            if code == 0:
+                board.append(None)
+            elif code in CODE_PIECES:
+                piece_class, color = CODE_PIECES[code]
+                board.append(piece_class(color))
+            else:
+                raise ValueError(f"Invalid piece code {code} on {SQUARES[index]}")
+
+        flags = data[ENCODED_SIZE - 1]
+        if flags >> 1 >= len(GAME_STATES):
+            raise ValueError(f"Invalid game state {flags >> 1}")
+
+        game = cls.__new__(cls)
+        game._board = board
+        game._turn = "ORANGE" if flags & 1 else "BLUE"
+        game._game_state = GAME_STATES[flags >> 1]
+        game._silent = silent
+        game._undo_stack = []
+        game._attack_map = None
+        game._hash = game.compute_hash()
+        return game
+
+    def to_bytes(self):
+        """
+        Encodes the position in its canonical compact form: one 4-bit PIECE_CODES nibble per square, two squares per
+        byte with the lower square in the low nibble, followed by a byte holding the player to move in bit 0 and the
+        GAME_STATES index above it. Equal positions always give equal bytes.
+
+        :return: Bytes of length ENCODED_SIZE
+        """
+        data = bytearray(ENCODED_SIZE)
+        for index, piece in enumerate(self._board):
+            if piece is not None:
+                data[index >> 1] |= PIECE_CODES[(piece.get_name(), piece.get_color())] << ((index & 1) * 4)
+
+        data[ENCODED_SIZE - 1] = (GAME_STATES.index(self._game_state) << 1) | (self._turn == "ORANGE")
+        return bytes(data)
+
+    def clone(self):
+        """
+        Makes an independent copy of the position without copying any pieces, which are never changed once made.
+        The copy starts with no moves to pop
+
+        :return: ChessLike game at the same position
+        """
+        game = type(self).__new__(type(self))
+        game._board = self._board[:]
+        game._turn = self._turn
+        game._game_state = self._game_state
+        game._silent = self._silent
+        game._undo_stack = []
+        game._attack_map = None
+        game._hash = self._hash
+        return game
+
+    def get_hash(self):
+        """
+        Returns the Zobrist hash of the position, which is kept up to date as moves are made
+
+        :return: 64-bit integer hash of the pieces and the player to move
+        """
+        return self._hash
+
+    def compute_hash(self):
+        """
+        Computes the Zobrist hash of the position from scratch
+
+        :return: 64-bit integer hash of the pieces and the player to move
+        """
+        position_hash = 0
+        for index, piece in enumerate(self._board):
+            if piece is not None:
+                position_hash ^= zobrist_key(piece, index)
+
+        if self._turn == "ORANGE":
+            position_hash ^= ZOBRIST_ORANGE_TURN
+
+        return position_hash
+
     def get_piece(self, position):
         """
         Returns the piece at the board position if the position is valid
@@ -346,13 +629,48 @@ class ChessLike:
 
         :return: Piece object if position valid, None otherwise
         """
-        if position in self._board:
-            return self._board[position]
-        else:
+        index = SQUARE_INDEX.get(position)
+        if index is None:
             return None
 
+        return self._board[index]
+
+    def get_piece_at(self, index):
+        """
+        Returns the piece at the square index
+
+        :param index: Square index 0-48
+
+        :return: Piece object, or None if the square is empty
+        """
+        return self._board[index]
+
+    def is_empty(self, index):
+        """
+        Checks whether a square is empty without copying the board. Used by the pieces' path checks
+
+        :param index: Square index 0-48
+
+        :return: True if there is no piece on the square, False otherwise
+        """
+        return self._board[index] is None
+
+    def get_board_view(self):
+        """
+        Returns a read-only view of the board keyed by board notation that reflects later moves without copying
+
+        :return: BoardView of the current board
+        """
+        return BoardView(self._board)
+
     def get_board(self):
-        return self._board.copy()
+        """
+        Returns a copy of the board keyed by board notation. Rule code should use is_empty or get_board_view instead,
+        which don't copy
+
+        :return: Dictionary mapping squares like "d4" to a Piece object or None
+        """
+        return dict(zip(SQUARES, self._board))
 
     def switch_turn(self):
         """
@@ -365,6 +683,8 @@ class ChessLike:
         else:
             self._turn = "ORANGE"
 
+        self._hash ^= ZOBRIST_ORANGE_TURN
+
 
     def make_move(self, origin, destination):
         """
@@ -378,20 +698,35 @@ class ChessLike:
         :return: True if move is valid, False if move is invalid
         """
 
-        origin = origin.lower()
-        destination = destination.lower()
+        origin = SQUARE_INDEX.get(origin.lower())
+        destination = SQUARE_INDEX.get(destination.lower())
 
-        if self.get_game_state() != "UNFINISHED":
+        if origin is None or destination is None:
+            return False
+
+        return self.make_move_index(origin, destination)
+
+    def make_move_index(self, origin, destination):
+        """
+        Integer square version of make_move for callers that have already parsed the squares. Validates the move the
+        same way and switches the turn if it was made.
+
+        :param origin: Starting square index 0-48
+        :param destination: Target square index 0-48
+
+        :return: True if move is valid, False if move is invalid
+        """
+        if self._game_state != "UNFINISHED":
             return False
 
-        if not self.check_origin(origin):
+        if not self.check_origin_index(origin):
             return False
 
-        if not self.check_destination(destination):
+        if not self.check_destination_index(destination):
             return False
 
         origin_piece = self._board[origin]
-        if not origin_piece.can_move(self, origin, destination):
+        if not origin_piece.can_move_index(self, origin, destination):
             return False
 
         #if the above checks pass, commit the move and switch the turn to the other player
@@ -401,25 +736,200 @@ class ChessLike:
 
         return True
 
+    def legal_moves(self):
+        """
+        Lists every legal move for the player whose turn it is
+
+        :return: List of (origin, destination) tuples in board notation
+        """
+        return [(SQUARES[origin], SQUARES[destination]) for origin, destination in self.legal_move_indexes()]
+
+    def legal_moves_from(self, square):
+        """
+        Lists the squares the piece at the given square can legally move to this turn
+
+        :param square: Board notation like "d1"
+
+        :return: List of destination squares in board notation, empty if the square holds no piece of the current turn
+        """
+        origin = SQUARE_INDEX.get(square)
+        if origin is None:
+            return []
+
+        return [SQUARES[destination] for destination in self.legal_moves_from_index(origin)]
+
+    def legal_move_indexes(self):
+        """
+        Integer square version of legal_moves
+
+        :return: List of (origin, destination) square index tuples
+        """
+        moves = []
+        if self._game_state != "UNFINISHED":
+            return moves
+
+        #a game that already keeps an attack map reads the moves from it, the others walk the rays
+        attack_map = self._attack_map
+        if attack_map is not None:
+            for origin in sorted(attack_map.get_origins(self._turn)):
+                moves.extend(attack_map.get_moves(origin))
+            return moves
+
+        for origin in range(len(self._board)):
+            for destination in self.legal_moves_from_index(origin):
+                moves.append((origin, destination))
+
+        return moves
+
+    def legal_moves_from_index(self, origin):
+        """
+        Integer square version of legal_moves_from. Walks the piece's precomputed rays outward and stops each ray at
+        the first occupied square, so only candidate targets for the piece type are ever looked at.
+
+        :param origin: Starting square index 0-48
+
+        :return: List of destination square indexes
+        """
+        destinations = []
+        piece = self._board[origin]
+        if piece is None or piece.get_color() != self._turn or self._game_state != "UNFINISHED":
+            return destinations
+
+        if self._attack_map is not None:
+            return [destination for _, destination in self._attack_map.get_moves(origin)]
+
+        for ray in piece.get_rays(origin):
+            for square in ray:
+                target = self._board[square]
+                if target is None:
+                    destinations.append(square)
+                    continue
+
+                #the piece can capture an opposing piece but is blocked by its own
+                if target.get_color() != self._turn:
+                    destinations.append(square)
+                break
+
+        return destinations
+
+    def get_attack_map(self):
+        """
+        Returns the attack map of the board, building it the first time it is needed. From then on every move,
+        push and pop keeps it up to date and legal moves are read from it, which pays off when attacks are asked
+        about several times per move but slows down callers that only list the moves once.
+
+        :return: AttackMap kept up to date with every move
+        """
+        if self._attack_map is None:
+            self._attack_map = AttackMap(self._board)
+
+        return self._attack_map
+
+    def is_attacked(self, square, color):
+        """
+        Checks whether a piece of the given color could move to a square, for example to see if a Bike is in danger
+
+        :param square: Square in board notation or as a square index
+        :param color: "BLUE" or "ORANGE"
+
+        :return: True if a piece of that color reaches the square, False if it doesn't or the square isn't on the
+            board
+        """
+        if isinstance(square, str):
+            square = SQUARE_INDEX.get(square.lower())
+            if square is None:
+                return False
+
+        return self.get_attack_map().is_attacked(square, color)
+
     def commit_move(self, origin, destination):
         """
         Makes the move specified by the player if the move is valid
 
-        :param origin: Starting square in board notation
-        :param destination: Target square in board notation
+        :param origin: Starting square in board notation or as a square index
+        :param destination: Target square in board notation or as a square index
 
         :return: None
         """
+        if isinstance(origin, str):
+            origin = SQUARE_INDEX[origin]
+        if isinstance(destination, str):
+            destination = SQUARE_INDEX[destination]
 
         #if the piece being captured is a Bike, end the game
         if isinstance(self._board[destination], Bike):
             self.game_over()
 
-        #moves the piece from the origin to the destination, which removes the opposing player's piece if it
-        #   is at the destination
-        self._board[destination] = self._board[origin]
+        self._move_piece(origin, destination)
+
+    def _move_piece(self, origin, destination):
+        """
+        Moves the piece from the origin to the destination, which removes the opposing player's piece if it is at the
+        destination, and updates the hash to match
+
+        :param origin: Starting square index 0-48
+        :param destination: Target square index 0-48
+
+        :return: None
+        """
+        piece = self._board[origin]
+        captured = self._board[destination]
+
+        if captured is not None:
+            self._hash ^= zobrist_key(captured, destination)
+        self._hash ^= zobrist_key(piece, origin) ^ zobrist_key(piece, destination)
+
+        self._board[destination] = piece
         self._board[origin] = None
 
+        if self._attack_map is not None:
+            self._attack_map.update((origin, destination))
+
+    def push(self, move):
+        """
+        Makes a move without checking that it is legal and remembers how to take it back with pop. Meant for searching
+        the game tree with moves from legal_move_indexes, so nothing is printed when a Bike is captured.
+
+        :param move: (origin, destination) tuple of square indexes or board notation
+
+        :return: None
+        """
+        origin, destination = move
+        if isinstance(origin, str):
+            origin = SQUARE_INDEX[origin]
+        if isinstance(destination, str):
+            destination = SQUARE_INDEX[destination]
+
+        captured = self._board[destination]
+        self._undo_stack.append((origin, destination, captured, self._turn, self._game_state, self._hash))
+
+        #if the piece being captured is a Bike, the player moving wins
+        if isinstance(captured, Bike):
+            self._game_state = self._turn
+
+        self._move_piece(origin, destination)
+
+        self.switch_turn()
+
+    def pop(self):
+        """
+        Takes back the last move made with push, restoring the captured piece, the turn, the game state and the hash
+
+        :return: The (origin, destination) square indexes of the move taken back
+        """
+        origin, destination, captured, turn, game_state, position_hash = self._undo_stack.pop()
+
+        self._board[origin] = self._board[destination]
+        self._board[destination] = captured
+        self._turn = turn
+        self._game_state = game_state
+        self._hash = position_hash
+
+        if self._attack_map is not None:
+            self._attack_map.update((origin, destination))
+
+        return origin, destination
+
     def check_origin(self, origin):
         """
         Checks the origin of the move to see if the entered origin is valid. Returns True if so, otherwise returns False
@@ -429,9 +939,20 @@ class ChessLike:
         :return: True if origin is valid, False if origin is invalid
         """
 
-        if origin not in self._board:
+        origin = SQUARE_INDEX.get(origin)
+        if origin is None:
             return False
 
+        return self.check_origin_index(origin)
+
+    def check_origin_index(self, origin):
+        """
+        Integer square version of check_origin
+
+        :param origin: Starting square index 0-48
+
+        :return: True if origin is valid, False if origin is invalid
+        """
         piece = self._board[origin]
 
         #if there is not a piece at the origin, return False
@@ -454,9 +975,20 @@ class ChessLike:
         :return: True if destination is valid, False if destination is invalid
         """
 
-        if destination not in self._board:
+        destination = SQUARE_INDEX.get(destination)
+        if destination is None:
             return False
 
+        return self.check_destination_index(destination)
+
+    def check_destination_index(self, destination):
+        """
+        Integer square version of check_destination
+
+        :param destination: Target square index 0-48
+
+        :return: True if destination is valid, False if destination is invalid
+        """
         piece = self._board[destination]
 
         #if there isn't a piece at the destination, it's a valid destination
@@ -471,12 +1003,14 @@ class ChessLike:
 
     def game_over(self):
         """
-        Prints a congratulations message and changes the game state to reflect which color won
+        Prints a congratulations message, unless the game is silent, and changes the game state to reflect which
+        color won
 
         :return: None
         """
-        print(f"Congratulations! {self._turn} won the game!")
-        print()
+        if not self._silent:
+            print(f"Congratulations! {self._turn} won the game!")
+            print()
 
         self._game_state = self._turn
 
@@ -487,14 +1021,11 @@ class ChessLike:
 
         :return: None
         """
-        rows = ["7", "6", "5", "4", "3", "2", "1"]
-        columns = ["a", "b", "c", "d", "e", "f", "g"]
-
-        print("   " + "  ".join(columns))
-        for row in rows:
+        print("   " + "  ".join(COLUMNS))
+        for row in reversed(ROWS):
             row_string = row + " "
-            for column in columns:
-                piece = self._board.get(column + row)
+            for column in COLUMNS:
+                piece = self._board[SQUARE_INDEX[column + row]]
                 if piece:
                     color = piece.get_color()[0]
                     transport = piece.get_name()[0]
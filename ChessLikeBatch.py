@@ -0,0 +1,286 @@
+# Description: A batch of ChessLike boards stepped in lockstep with NumPy. Holds B boards as one (B, 7, 7) int8 array
+# and computes legal move masks, applies moves and detects finished games for the whole batch at once. Needs numpy,
+# which the rest of the game doesn't.
+
+import numpy as np
+
+from ChessLike import BOARD_WIDTH, CODE_PIECES, ENCODED_SIZE, GAME_STATES, PIECE_CODES, SQUARES, ChessLike, \
+    Helicopter, Train, Car, Bike
+
+#squares hold 0 when empty, PIECE_CODES 1-4 for BLUE pieces and the negative of the same type's code for ORANGE, so
+#the sign is the color and the absolute value is the type
+PIECE_CLASSES = (Helicopter, Train, Car, Bike)
+TYPE_CODES = {piece_class: PIECE_CODES[(piece_class.__name__, "BLUE")] for piece_class in PIECE_CLASSES}
+BIKE_CODE = TYPE_CODES[Bike]
+
+BLUE = 0
+ORANGE = 1
+
+SQUARE_COUNT = BOARD_WIDTH * BOARD_WIDTH
+ACTION_COUNT = SQUARE_COUNT * SQUARE_COUNT
+
+
+def _ray_steps(piece_class):
+    """
+    Flattens a piece type's precomputed rays into one entry per (ray, step), with the arrays the batch needs to test
+    every origin square at once
+
+    :param piece_class: Piece subclass
+
+    :return: List of (origins, destinations, actions, path) tuples. origins, destinations and actions (origin * 49 +
+        destination) are matching index arrays for every square that has a square at that step of the ray, and path
+        is a (len(origins), steps before) array of the squares that must be empty on the way
+    """
+    #each origin has at most one square per (ray number, step), so no (origin, destination) pair repeats in an entry
+    entries = {}
+    for origin in range(SQUARE_COUNT):
+        for ray_number, ray in enumerate(piece_class._rays[origin]):
+            for step, destination in enumerate(ray):
+                path = piece_class._paths[origin][destination]
+                entries.setdefault((ray_number, step, len(path)), []).append((origin, destination, path))
+
+    steps = []
+    for (_, _, path_length), squares in sorted(entries.items()):
+        origins = np.array([origin for origin, _, _ in squares], dtype=np.intp)
+        actions = np.array([origin * SQUARE_COUNT + destination for origin, destination, _ in squares], dtype=np.intp)
+        destinations = np.array([destination for _, destination, _ in squares], dtype=np.intp)
+        path = np.array([path for _, _, path in squares], dtype=np.intp).reshape(len(squares), path_length)
+        steps.append((origins, destinations, actions, path))
+
+    return steps
+
+
+RAY_STEPS = {TYPE_CODES[piece_class]: _ray_steps(piece_class) for piece_class in PIECE_CLASSES}
+
+
+class ChessLikeBatch:
+    """
+    Represents B ChessLike games stored as NumPy arrays: a (B, 7, 7) int8 board array with row 0 as rank 1, and per
+    board turn and game state vectors. Every board starts at the ChessLike start position. The rules are the same as
+    the Piece classes' can_move.
+    """
+
+    def __init__(self, size):
+        """
+        :param size: Number of boards B
+        """
+        self._boards = np.zeros((size, BOARD_WIDTH, BOARD_WIDTH), dtype=np.int8)
+        self._turns = np.zeros(size, dtype=np.int8)
+        self._states = np.zeros(size, dtype=np.int8)
+        self.reset()
+
+    @classmethod
+    def from_games(cls, games):
+        """
+        Builds a batch from ChessLike games
+
+        :param games: List of ChessLike games
+
+        :return: ChessLikeBatch holding their positions
+        """
+        batch = cls(len(games))
+        flat = batch._boards.reshape(len(games), SQUARE_COUNT)
+        for number, game in enumerate(games):
+            for index in range(SQUARE_COUNT):
+                piece = game.get_piece_at(index)
+                flat[number, index] = 0 if piece is None else encode_piece(piece)
+            batch._turns[number] = BLUE if game.get_turn() == "BLUE" else ORANGE
+            batch._states[number] = GAME_STATES.index(game.get_game_state())
+
+        return batch
+
+    @classmethod
+    def from_arrays(cls, boards, turns, states):
+        """
+        Builds a batch around existing arrays without copying them
+
+        :param boards: (B, 7, 7) int8 array of signed piece codes
+        :param turns: (B,) array, 0 for BLUE or 1 for ORANGE to move
+        :param states: (B,) array of GAME_STATES indexes
+
+        :return: ChessLikeBatch using those arrays
+        """
+        batch = cls.__new__(cls)
+        batch._boards = np.asarray(boards, dtype=np.int8)
+        batch._turns = np.asarray(turns, dtype=np.int8)
+        batch._states = np.asarray(states, dtype=np.int8)
+        return batch
+
+    def to_game(self, number):
+        """
+        Copies one board out of the batch as a silent ChessLike game
+
+        :param number: Board number
+
+        :return: ChessLike game at that board's position
+        """
+        data = bytearray(ENCODED_SIZE)
+        for index, code in enumerate(self._boards[number].reshape(SQUARE_COUNT).tolist()):
+            if code:
+                piece = decode_piece(code)
+                data[index >> 1] |= PIECE_CODES[(piece.get_name(), piece.get_color())] << ((index & 1) * 4)
+        data[-1] = (int(self._states[number]) << 1) | int(self._turns[number])
+
+        return ChessLike.from_bytes(bytes(data), silent=True)
+
+    def reset(self, boards=None):
+        """
+        Puts boards back to the start position
+
+        :param boards: Board numbers or boolean mask to reset, or None for every board
+
+        :return: None
+        """
+        if boards is None:
+            boards = slice(None)
+
+        start = ChessLike()
+        start_board = np.array([0 if start.get_piece_at(index) is None else encode_piece(start.get_piece_at(index))
+                                for index in range(SQUARE_COUNT)], dtype=np.int8).reshape(BOARD_WIDTH, BOARD_WIDTH)
+        self._boards[boards] = start_board
+        self._turns[boards] = BLUE
+        self._states[boards] = 0
+
+    def get_size(self):
+        return len(self._boards)
+
+    def get_boards(self):
+        return self._boards
+
+    def get_turns(self):
+        return self._turns
+
+    def get_states(self):
+        return self._states
+
+    def get_unfinished(self):
+        """
+        :return: (B,) bool array, True for boards where the game is still going
+        """
+        return self._states == 0
+
+    def legal_move_mask(self):
+        """
+        Computes every legal move on every board at once
+
+        :return: (B, 49, 49) bool array, True where [board, origin, destination] is a legal move for the player to
+            move. Finished boards have no legal moves
+        """
+        size = len(self._boards)
+
+        #works square-major, (49, B), so every gather below copies whole contiguous rows
+        flat = self._boards.reshape(size, SQUARE_COUNT).T
+
+        #the side to move is positive on every board, so own pieces are > 0 and opposing pieces < 0
+        sign = np.where(self._turns == BLUE, 1, -1).astype(np.int8)
+        relative = flat * sign
+        own = relative > 0
+        empty = flat == 0
+        active = self._states == 0
+
+        mask = np.zeros((ACTION_COUNT, size), dtype=bool)
+        for code, steps in RAY_STEPS.items():
+            movers = (relative == code) & active
+            if not movers.any():
+                continue
+
+            for origins, destinations, actions, path in steps:
+                allowed = movers[origins] & ~own[destinations]
+                if path.shape[1]:
+                    allowed &= empty[path].all(axis=1)
+                mask[actions] |= allowed
+
+        #a transposed view, so no copy is made
+        return mask.T.reshape(size, SQUARE_COUNT, SQUARE_COUNT)
+
+    def random_actions(self, rng, mask=None):
+        """
+        Picks a uniformly random legal move on every board
+
+        :param rng: numpy.random.Generator
+        :param mask: Legal move mask from legal_move_mask, computed if not given
+
+        :return: (B,) int array of actions origin * 49 + destination, -1 for boards with no legal move
+        """
+        if mask is None:
+            mask = self.legal_move_mask()
+
+        #lists every legal move action-major, which is how legal_move_mask lays them out in memory, groups them by
+        #board and picks one of each board's moves at random
+        actions, boards = np.divmod(np.flatnonzero(mask.reshape(len(mask), ACTION_COUNT).T), len(mask))
+        order = np.argsort(boards, kind="stable")
+        actions = actions[order]
+        counts = np.bincount(boards, minlength=len(mask))
+        starts = np.cumsum(counts) - counts
+        picks = starts + (rng.random(len(mask)) * counts).astype(np.intp)
+
+        chosen = np.full(len(mask), -1, dtype=np.intp)
+        has_moves = counts > 0
+        chosen[has_moves] = actions[picks[has_moves]]
+        return chosen
+
+    def step(self, actions):
+        """
+        Plays one move on every board. Moves aren't checked against the rules, so they should come from
+        legal_move_mask. Boards given -1, and boards whose game has ended, are left as they are.
+
+        :param actions: (B,) int array of origin * 49 + destination
+
+        :return: (B,) int8 array of the piece codes captured, 0 where nothing was captured
+        """
+        size = len(self._boards)
+        flat = self._boards.reshape(size, SQUARE_COUNT)
+        actions = np.asarray(actions)
+
+        playing = np.nonzero((actions >= 0) & (self._states == 0))[0]
+        captured = np.zeros(size, dtype=np.int8)
+        if not len(playing):
+            return captured
+
+        origins, destinations = np.divmod(actions[playing], SQUARE_COUNT)
+        captured[playing] = flat[playing, destinations]
+        flat[playing, destinations] = flat[playing, origins]
+        flat[playing, origins] = 0
+
+        #capturing the Bike wins the game for the player who moved
+        won = playing[np.abs(captured[playing]) == BIKE_CODE]
+        self._states[won] = self._turns[won] + 1
+
+        self._turns[playing] ^= 1
+        return captured
+
+
+def encode_piece(piece):
+    """
+    Returns the signed batch code for a piece
+
+    :param piece: Piece object
+
+    :return: Positive type code for BLUE, negative for ORANGE
+    """
+    code = PIECE_CODES[(piece.get_name(), "BLUE")]
+    return code if piece.get_color() == "BLUE" else -code
+
+
+def decode_piece(code):
+    """
+    Returns the piece for a signed batch code
+
+    :param code: Nonzero signed code
+
+    :return: Piece object
+    """
+    piece_class, _ = CODE_PIECES[abs(code)]
+    return piece_class("BLUE" if code > 0 else "ORANGE")
+
+
+def action_to_move(action):
+    """
+    Converts a batch action to board notation
+
+    :param action: origin * 49 + destination
+
+    :return: (origin, destination) tuple in board notation
+    """
+    origin, destination = divmod(int(action), SQUARE_COUNT)
+    return SQUARES[origin], SQUARES[destination]
@@ -0,0 +1,278 @@
+# Description: An opening book for ChessLike built from recorded games. Every game starts from the same position, so
+# the moves played in the first few plies of many recorded games, and how those games ended, tell a bot what to play
+# there without searching. The book is a file of fixed-size entries sorted by position hash and probed through mmap
+# with a binary search, so it is never loaded into memory as a whole.
+#
+# Book file: the 8-byte header BOOK_MAGIC, then one ENTRY per (position, move), sorted by position hash and then move.
+# Each entry is the position's Zobrist hash from ChessLike.get_hash as a little-endian uint64, the move as a uint16
+# origin * 49 + destination, the number of games that played it as a uint32, and their score for the player who made
+# the move as a uint32 counting 2 for a win and 1 for an unfinished game.
+
+import argparse
+import math
+import mmap
+import os
+import struct
+import sys
+
+from ChessLike import ChessLike, SQUARES
+from ChessLikeRecords import GameRecordReader
+
+BOOK_MAGIC = b"CLBOOK01"
+HEADER_SIZE = 8
+
+ENTRY = struct.Struct("<QHII")
+KEY = struct.Struct("<Q")
+
+#how deep into a game positions are added to the book
+DEFAULT_PLIES = 12
+
+#points a game scores for the player who made a move
+WIN_POINTS = 2
+DRAW_POINTS = 1
+
+#z value of the confidence interval whose lower bound ranks book moves, 1.96 for 95%
+CONFIDENCE_Z = 1.96
+
+
+def _points(result, color):
+    if result == color:
+        return WIN_POINTS
+    if result == "UNFINISHED":
+        return DRAW_POINTS
+
+    return 0
+
+
+def collect_statistics(games, plies=DEFAULT_PLIES, statistics=None):
+    """
+    Counts how often each move was played in each early position and how those games ended
+
+    :param games: Iterable of (moves, result) tuples with moves as (origin, destination) square index tuples, such
+        as GameRecordReader.iter_games
+    :param plies: Moves of each game to count
+    :param statistics: Dictionary to add to, from an earlier call, or None to start a new one
+
+    :return: Dictionary mapping (position hash, origin * 49 + destination) to [count, score]
+    """
+    if statistics is None:
+        statistics = {}
+
+    for moves, result in games:
+        game = ChessLike(silent=True)
+        for origin, destination in moves[:plies]:
+            key = (game.get_hash(), origin * len(SQUARES) + destination)
+            entry = statistics.get(key)
+            if entry is None:
+                entry = statistics[key] = [0, 0]
+            entry[0] += 1
+            entry[1] += _points(result, game.get_turn())
+
+            game.commit_move(origin, destination)
+            game.switch_turn()
+
+    return statistics
+
+
+def write_book(statistics, path, min_count=1):
+    """
+    Writes a book file. It is written under a temporary name and then renamed, so a half-written book is never
+    probed.
+
+    :param statistics: Dictionary from collect_statistics
+    :param path: Path of the book file
+    :param min_count: Leaves out moves played in fewer games than this
+
+    :return: Number of entries written
+    """
+    entries = sorted((key, move, count, score) for (key, move), (count, score) in statistics.items()
+                     if count >= min_count)
+
+    with open(path + ".tmp", "wb") as book_file:
+        book_file.write(BOOK_MAGIC)
+        for entry in entries:
+            book_file.write(ENTRY.pack(*entry))
+    os.replace(path + ".tmp", path)
+
+    return len(entries)
+
+
+def build_book(record_paths, path, plies=DEFAULT_PLIES, min_count=1):
+    """
+    Builds a book file from ChessLikeRecords game record files
+
+    :param record_paths: Paths of the record files
+    :param path: Path of the book file to write
+    :param plies: Moves of each game to add to the book
+    :param min_count: Leaves out moves played in fewer games than this
+
+    :return: Number of entries written
+    """
+    statistics = {}
+    for record_path in record_paths:
+        with GameRecordReader(record_path) as reader:
+            collect_statistics(reader.iter_games(), plies, statistics)
+
+    return write_book(statistics, path, min_count)
+
+
+class BookMove:
+    """
+    One book move of a position with the games that played it
+    """
+
+    def __init__(self, move, count, score):
+        self._move = move
+        self._count = count
+        self._score = score
+
+    def get_move(self):
+        """
+        :return: (origin, destination) tuple of square indexes
+        """
+        return self._move
+
+    def get_count(self):
+        return self._count
+
+    def get_score(self):
+        """
+        :return: Points for the player who made the move, 2 per win and 1 per unfinished game
+        """
+        return self._score
+
+    def get_average(self):
+        """
+        :return: Average result between 0 (always lost) and 1 (always won)
+        """
+        return self._score / (WIN_POINTS * self._count)
+
+    def get_lower_bound(self, z=CONFIDENCE_Z):
+        """
+        Returns the lower bound of the Wilson score interval of the average result, so a move with a good result over
+        many games ranks above one that won the only game it was played in
+
+        :param z: z value of the interval, CONFIDENCE_Z for 95%
+
+        :return: Lower bound between 0 and 1
+        """
+        average = self.get_average()
+        z_squared = z * z
+        spread = z * math.sqrt(average * (1 - average) / self._count + z_squared / (4 * self._count * self._count))
+        return (average + z_squared / (2 * self._count) - spread) / (1 + z_squared / self._count)
+
+    def __repr__(self):
+        origin, destination = self._move
+        return f"BookMove({SQUARES[origin]}{SQUARES[destination]}, count={self._count}, score={self._score})"
+
+
+class OpeningBook:
+    """
+    Probes a book file through mmap. Can be used as a context manager, which closes the map at the end.
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._data[:HEADER_SIZE] != BOOK_MAGIC or (len(self._data) - HEADER_SIZE) % ENTRY.size:
+            self.close()
+            raise ValueError(f"{path} is not a ChessLike opening book")
+
+        self._entries = (len(self._data) - HEADER_SIZE) // ENTRY.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._entries
+
+    def _key(self, number):
+        return KEY.unpack_from(self._data, HEADER_SIZE + number * ENTRY.size)[0]
+
+    def lookup(self, game):
+        """
+        Finds every book move of a position
+
+        :param game: ChessLike game
+
+        :return: List of BookMoves in move order, empty if the position isn't in the book
+        """
+        key = game.get_hash()
+
+        #finds the first entry for the key
+        low = 0
+        high = self._entries
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        moves = []
+        for number in range(low, self._entries):
+            entry_key, move, count, score = ENTRY.unpack_from(self._data, HEADER_SIZE + number * ENTRY.size)
+            if entry_key != key:
+                break
+            moves.append(BookMove(divmod(move, len(SQUARES)), count, score))
+
+        return moves
+
+    def best_move(self, game, min_count=1):
+        """
+        Picks the book move with the best lower bound on its average result, the most played one on ties, so moves
+        backed by few games only win out when nothing better proven is there. Moves that aren't legal in the position,
+        which can only happen if two positions share a hash, are skipped.
+
+        :param game: ChessLike game
+        :param min_count: Ignores moves played in fewer games than this
+
+        :return: (origin, destination) tuple of square indexes, or None if the book has no move for the position
+        """
+        candidates = [book_move for book_move in self.lookup(game) if book_move.get_count() >= min_count]
+        if not candidates:
+            return None
+
+        legal = set(game.legal_move_indexes())
+        best = None
+        for book_move in candidates:
+            if book_move.get_move() not in legal:
+                continue
+            if best is None or (book_move.get_lower_bound(), book_move.get_count()) > \
+                    (best.get_lower_bound(), best.get_count()):
+                best = book_move
+
+        return best.get_move() if best is not None else None
+
+    def close(self):
+        """
+        Closes the map and its file
+
+        :return: None
+        """
+        self._data.close()
+        self._file.close()
+
+
+def main(argv=None):
+    """
+    Command line entry point. Builds a book from game record files
+    """
+    parser = argparse.ArgumentParser(description="Build a ChessLike opening book from game record files")
+    parser.add_argument("book", help="book file to write")
+    parser.add_argument("records", nargs="+", help="game record files written by ChessLikeRecords")
+    parser.add_argument("--plies", type=int, default=DEFAULT_PLIES, help="moves of each game to add to the book")
+    parser.add_argument("--min-count", type=int, default=1, help="leave out moves played in fewer games")
+    args = parser.parse_args(argv)
+
+    entries = build_book(args.records, args.book, args.plies, args.min_count)
+    print(f"wrote {entries} entries to {args.book}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,41 @@
-import pygame, sys
-from ChessLike import *
-from pygame.locals import *
+import pygame, sys, time
+from ChessLike import ChessLike, SQUARES, Helicopter, Train, Car, Bike
+from ChessLikeSearch import BackgroundSearch, SearchEngine
+
+# Events the engine's worker thread posts to wake up the event loop
+ENGINE_MOVE = pygame.USEREVENT + 1
+ENGINE_PROGRESS = pygame.USEREVENT + 2
 
 class ChessLikeGUI:
     """
     The GUI for the ChessLike game
     """
 
-    def __init__(self, game):
+    def __init__(self, game, engine_color=None, engine=None, think_time=2.0, ponder=True):
+        """
+        :param game: ChessLike game to show
+        :param engine_color: "BLUE" or "ORANGE" for the computer to play that color, or None for two human players
+        :param engine: SearchEngine for the computer to use, or None for a default one
+        :param think_time: Seconds the computer spends on each move
+        :param ponder: If True, the computer keeps thinking about its next move while the human chooses theirs
+        """
         pygame.init()
         
         self.game = game
         self.clock = pygame.time.Clock()
 
+        # Computer opponent, which searches on a worker thread so the window never stops responding
+        self.engine_color = engine_color
+        self.think_time = think_time
+        self.ponder = ponder
+        self.background_search = None
+        if engine_color is not None:
+            self.background_search = BackgroundSearch(engine if engine is not None else SearchEngine(max_depth=32))
+        # Counts searches started or cancelled, so events from an old search are ignored
+        self.engine_generation = 0
+        self.engine_status = ""
+        self.last_progress = 0.0
+
         
         # Display settings
         self.WINDOW_WIDTH = 800
@@ -70,19 +93,47 @@ class ChessLikeGUI:
             "Click anywhere to close"
         ]
 
+        # Pre-rendered surfaces, so a frame only blits what has already been drawn
+        self.text_cache = {}
+        self.board_surface = self.render_board()
+        self.highlight_surface = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA)
+        self.highlight_surface.fill(self.HIGHLIGHT)
+        self.piece_surfaces = {}
+        for piece_class in (Helicopter, Train, Car, Bike):
+            for color in ("BLUE", "ORANGE"):
+                piece = piece_class(color)
+                self.piece_surfaces[(piece.get_name(), color)] = self.render_piece(piece)
+        self.rules_surface = self.render_rules()
+        self.header_rect = pygame.Rect(0, 0, self.WINDOW_WIDTH, self.BOARD_OFFSET_Y)
+        self.footer_rect = pygame.Rect(0, self.BOARD_OFFSET_Y + self.BOARD_SIZE, self.WINDOW_WIDTH,
+                                       self.WINDOW_HEIGHT - self.BOARD_OFFSET_Y - self.BOARD_SIZE)
+
+        # The window only wakes up for events that can change what is drawn
+        pygame.event.set_blocked(pygame.MOUSEMOTION)
+
+        # The computer moves first if it plays BLUE
+        self.start_engine_turn()
+
     def run_game(self):
         """
-        The main game loop. Handles events, updates the game state, and shows the display. 
-        Runs at 60fps until the user closes the window.
+        The main game loop. Handles events, updates the game state, and shows the display.
+        Sleeps until an event arrives, then redraws only the squares and text that changed, at most 60 times a second.
+        Runs until the user closes the window.
 
         :return: None
         """
 
         running = True
+        self.redraw()
 
         while running:
-            for event in pygame.event.get():
-                if event.type == QUIT:
+            # Blocks until something happens, then takes every other event already waiting
+            events = [pygame.event.wait()] + pygame.event.get()
+            before = self.get_render_state()
+            full_redraw = False
+
+            for event in events:
+                if event.type == pygame.QUIT:
                     running = False
 
                 if event.type == pygame.MOUSEBUTTONDOWN:
@@ -96,23 +147,91 @@ class ChessLikeGUI:
                         self.selected_square = None
                         self.valid_moves = []
 
-            # Draws game screen
-            self.screen.fill(self.WHITE)
-            self.draw_board()
-            self.draw_pieces()
-            self.draw_ui()
+                if event.type == ENGINE_MOVE:
+                    self.handle_engine_move(event)
 
-            # Draws rule overlay
-            if self.show_rules:
-                self.draw_rules()
-            
-            pygame.display.flip()
-            self.clock.tick(60)
+                if event.type == ENGINE_PROGRESS:
+                    if event.generation == self.engine_generation:
+                        self.engine_status = event.text
+
+                # The window was uncovered or resized, so everything has to be drawn again
+                if event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE):
+                    full_redraw = True
+
+            if running:
+                self.update_display(before, full_redraw)
+                self.clock.tick(60)
 
         # Quits game if user kills game
+        self.cancel_engine()
         pygame.quit()
         sys.exit()
 
+    def get_render_state(self):
+        """
+        Captures everything that decides what the window shows, so two captures can be compared to find what to
+        redraw
+
+        :return: Tuple of (dictionary of square to (piece, highlighted), (turn, game state), rules shown, engine
+            status)
+        """
+        highlighted = set(self.valid_moves)
+        if self.selected_square is not None:
+            highlighted.add(self.selected_square)
+
+        squares = {square: (piece, square in highlighted) for square, piece in self.game.get_board_view().items()}
+        return squares, (self.game.get_turn(), self.game.get_game_state()), self.show_rules, self.engine_status
+
+    def update_display(self, before, full_redraw=False):
+        """
+        Redraws what changed since a render state was captured and updates only those parts of the window
+
+        :param before: Render state from get_render_state
+        :param full_redraw: If True, redraws the whole window
+
+        :return: None
+        """
+        squares, header, show_rules, engine_status = self.get_render_state()
+        if full_redraw or show_rules != before[2]:
+            self.redraw()
+            return
+
+        # Nothing under the rules popup can be seen
+        if show_rules:
+            return
+
+        dirty_rects = []
+        for square, contents in squares.items():
+            if before[0][square] != contents:
+                dirty_rects.append(self.draw_square(square))
+
+        if header != before[1]:
+            dirty_rects.append(self.draw_ui())
+
+        if engine_status != before[3]:
+            dirty_rects.append(self.draw_status())
+
+        if dirty_rects:
+            pygame.display.update(dirty_rects)
+
+    def redraw(self):
+        """
+        Draws the whole window and shows it
+
+        :return: None
+        """
+        self.screen.fill(self.WHITE)
+        self.draw_board()
+        self.draw_pieces()
+        self.draw_ui()
+        self.draw_status()
+
+        # Draws rule overlay
+        if self.show_rules:
+            self.draw_rules()
+
+        pygame.display.flip()
+
     def get_valid_moves(self, origin):
         """
         Determines which squares are valid moves for the selected piece
@@ -121,30 +240,7 @@ class ChessLikeGUI:
 
         :return: List of valid destination squares
         """
-                
-        valid_moves = []
-        piece = self.game.get_piece(origin)
-        
-        if piece is None:
-            return valid_moves
-        
-
-        columns = ['a', 'b', 'c', 'd', 'e', 'f', 'g']
-        rows = ['1', '2', '3', '4', '5', '6', '7']
-        
-        for col in columns:
-            for row in rows:
-                destination = col + row
-                
-                if destination == origin:
-                    continue
-                
-                # Uses ChessLike functions to check validity
-                if self.game.check_destination(destination):
-                    if piece.can_move(self.game, origin, destination):
-                        valid_moves.append(destination)
-        
-        return valid_moves        
+        return self.game.legal_moves_from(origin)
 
     def pos_to_square(self, row, column):
         """
@@ -189,6 +285,19 @@ class ChessLikeGUI:
         else:
             return self.pos_to_square(y, x)
 
+    def get_square_rect(self, square):
+        """
+        Finds where a square is drawn in the window
+
+        :param square: Board notation like "d4"
+
+        :return: pygame.Rect of the square
+        """
+        column, row = self.square_to_pos(square)
+        x = column * self.SQUARE_SIZE + self.BOARD_OFFSET_X
+        y = row * self.SQUARE_SIZE + self.BOARD_OFFSET_Y
+        return pygame.Rect(x, y, self.SQUARE_SIZE, self.SQUARE_SIZE)
+
     def handle_click(self, pos):
         """
         Handles click events for all interactive elements of the game
@@ -211,6 +320,10 @@ class ChessLikeGUI:
             self.show_rules = False
             return
 
+        # The board is locked while the computer chooses its move
+        if self.is_engine_turn():
+            return
+
         # if a valid square has been selected
         if square is not None:
             # If a piece has not been selected yet
@@ -221,102 +334,279 @@ class ChessLikeGUI:
                     self.valid_moves = self.get_valid_moves(square)
             # If a piece has been selected already, make the move
             else:
-                self.game.make_move(self.selected_square, square)
+                moved = self.game.make_move(self.selected_square, square)
                 self.selected_square = None
                 self.valid_moves = []
 
-    def draw_board(self):
+                if moved:
+                    self.start_engine_turn()
+
+    def is_engine_turn(self):
+        """
+        Determines if the computer is to move
+
+        :return: True if the computer plays the color whose turn it is and the game isn't over
+        """
+        return self.engine_color == self.game.get_turn() and self.game.get_game_state() == "UNFINISHED"
+
+    def start_engine_turn(self):
         """
-        Draws the checkerboard using alternating colors, along with highlighting valid moves if a user selects
-        a piece to move.
+        Starts the computer thinking about its move if it is its turn. Any pondering is stopped first, which leaves
+        what it found in the engine's transposition table for this search to use.
 
         :return: None
         """
-        transparency = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA)
-        transparency.fill(self.HIGHLIGHT)
-        
+        if self.background_search is None:
+            return
+
+        # Stops pondering once the human's move has ended the game
+        if not self.is_engine_turn():
+            self.cancel_engine()
+            return
+
+        self.engine_generation += 1
+        generation = self.engine_generation
+        self.background_search.start(self.game,
+                                     on_done=lambda result: self.post_engine_move(generation, result),
+                                     progress=self.make_progress(generation, "thinking"),
+                                     time_limit=self.think_time)
+
+    def start_pondering(self, result):
+        """
+        Starts the computer thinking about the position after the reply it expects from the human, until the human
+        moves
+
+        :param result: SearchResult of the computer's last move, whose principal variation holds the expected reply
+
+        :return: None
+        """
+        principal_variation = result.get_principal_variation()
+        if not self.ponder or len(principal_variation) < 2 or self.game.get_game_state() != "UNFINISHED":
+            return
+
+        expected = principal_variation[1]
+        position = self.game.clone()
+        position.push(expected)
+        if position.get_game_state() != "UNFINISHED":
+            return
+
+        self.engine_generation += 1
+        activity = f"pondering on {SQUARES[expected[0]]}{SQUARES[expected[1]]}"
+        self.background_search.start(position, progress=self.make_progress(self.engine_generation, activity))
+
+    def cancel_engine(self):
+        """
+        Stops the computer's search or pondering, if any
+
+        :return: None
+        """
+        if self.background_search is not None:
+            self.background_search.cancel()
+            self.engine_generation += 1
+            self.engine_status = ""
+
+    def make_progress(self, generation, activity):
+        """
+        Makes the progress function for a search, which posts the search depth and nodes to the event loop at most
+        10 times a second
+
+        :param generation: engine_generation of the search
+        :param activity: What the computer is doing, shown in the status line
+
+        :return: Function called on the engine's worker thread
+        """
+        def progress(depth, nodes, result):
+            now = time.perf_counter()
+            if now - self.last_progress >= 0.1:
+                self.last_progress = now
+                text = f"Computer {activity}: depth {depth}, {nodes:,} nodes"
+                pygame.event.post(pygame.event.Event(ENGINE_PROGRESS, generation=generation, text=text))
+
+        return progress
+
+    def post_engine_move(self, generation, result):
+        """
+        Hands the computer's chosen move from the worker thread to the event loop
+
+        :return: None
+        """
+        pygame.event.post(pygame.event.Event(ENGINE_MOVE, generation=generation, result=result))
+
+    def handle_engine_move(self, event):
+        """
+        Plays the computer's move, unless the game has been reset since it started thinking
+
+        :param event: ENGINE_MOVE event
+
+        :return: None
+        """
+        if event.generation != self.engine_generation or not self.is_engine_turn():
+            return
+
+        result = event.result
+        best_move = result.get_best_move()
+
+        # The search finds no move when the computer has no legal moves left
+        if best_move is None:
+            self.engine_status = "Computer has no legal moves"
+            return
+
+        origin, destination = best_move
+        self.game.make_move_index(origin, destination)
+        self.engine_status = (f"Computer played {SQUARES[origin]}{SQUARES[destination]} "
+                              f"(depth {result.get_depth()}, {result.get_nodes():,} nodes)")
+        self.start_pondering(result)
+
+    def render_board(self):
+        """
+        Draws the checkerboard once, to be copied to the window whenever squares need redrawing
+
+        :return: pygame.Surface of the board
+        """
+        board = pygame.Surface((self.BOARD_SIZE, self.BOARD_SIZE))
+
         # Draw the checkerboard
         for row in range(7):
             for column in range(7):
-                x = column * self.SQUARE_SIZE + self.BOARD_OFFSET_X
-                y = row * self.SQUARE_SIZE + self.BOARD_OFFSET_Y
-
                 if (row + column) % 2 == 0:
                     color = self.WHITE
                 else:
-                    color = self.BLACK 
+                    color = self.BLACK
 
-                pygame.draw.rect(self.screen, color, (x, y, self.SQUARE_SIZE, self.SQUARE_SIZE))
+                pygame.draw.rect(board, color, (column * self.SQUARE_SIZE, row * self.SQUARE_SIZE,
+                                                self.SQUARE_SIZE, self.SQUARE_SIZE))
 
-                # Draw highlight overlay
+        return board
 
-                if self.selected_square is not None and self.square_to_pos(self.selected_square) == (column, row):
-                    self.screen.blit(transparency, (x, y))
+    def render_piece(self, piece):
+        """
+        Draws a piece's colored circle and letter once on a transparent square
 
-                elif self.pos_to_square(row, column) in self.valid_moves:
-                    self.screen.blit(transparency, (x, y))
-                    
+        :param piece: Piece object
 
+        :return: pygame.Surface the size of a square
+        """
+        glyph = pygame.Surface((self.SQUARE_SIZE, self.SQUARE_SIZE), pygame.SRCALPHA)
+        center = (self.SQUARE_SIZE // 2, self.SQUARE_SIZE // 2)
 
-        # Draw board outline
-        pygame.draw.rect(self.screen, (0,0,0), (self.BOARD_OFFSET_X, self.BOARD_OFFSET_Y, self.BOARD_SIZE, self.BOARD_SIZE), 1)
+        if piece.get_color() == "BLUE":
+            color = self.BLUE
+        else:
+            color = self.ORANGE
 
-    def draw_pieces(self):
+        pygame.draw.circle(glyph, color, center, self.CIRCLE_RADIUS)
+
+        text_surface = self.piece_font.render(piece.get_name()[0], True, (0,0,0))
+        text_rect = text_surface.get_rect(center=center)
+        glyph.blit(text_surface, text_rect)
+        return glyph
+
+    def render_text(self, font, text, color):
         """
-        Draws the pieces on the board
+        Renders text, reusing the surface if the same text has been rendered before
+
+        :return: pygame.Surface of the text
+        """
+        key = (id(font), text, color)
+        if key not in self.text_cache:
+            self.text_cache[key] = font.render(text, True, color)
+
+        return self.text_cache[key]
+
+    def draw_square(self, square):
+        """
+        Draws one square with its highlight and piece
+
+        :param square: Board notation like "d4"
+
+        :return: pygame.Rect that was drawn over
+        """
+        rect = self.get_square_rect(square)
+        board_area = rect.move(-self.BOARD_OFFSET_X, -self.BOARD_OFFSET_Y)
+        self.screen.blit(self.board_surface, rect, board_area)
+
+        # Draw highlight overlay
+        if square == self.selected_square or square in self.valid_moves:
+            self.screen.blit(self.highlight_surface, rect)
+
+        # Draw the part of the board outline along this square, over the highlight
+        self.screen.set_clip(rect)
+        self.draw_outline()
+        self.screen.set_clip(None)
+
+        piece = self.game.get_piece(square)
+        if piece is not None:
+            self.screen.blit(self.piece_surfaces[(piece.get_name(), piece.get_color())], rect)
+
+        return rect
+
+    def draw_board(self):
+        """
+        Draws the checkerboard, along with highlighting valid moves if a user selects a piece to move.
 
         :return: None
         """
+        self.screen.blit(self.board_surface, (self.BOARD_OFFSET_X, self.BOARD_OFFSET_Y))
 
-        for row in range(7):
-            for column in range(7):
-                square = self.pos_to_square(row, column)
-                piece = self.game.get_piece(square)
-                x = column * self.SQUARE_SIZE + self.BOARD_OFFSET_X + self.SQUARE_SIZE // 2
-                y = row * self.SQUARE_SIZE + self.BOARD_OFFSET_Y + self.SQUARE_SIZE // 2
+        # Draw highlight overlay
+        if self.selected_square is not None:
+            self.screen.blit(self.highlight_surface, self.get_square_rect(self.selected_square))
+
+        for square in self.valid_moves:
+            self.screen.blit(self.highlight_surface, self.get_square_rect(square))
 
-                # Draw colored circles for pieces
-                if piece:
-                    if piece.get_color() == "BLUE":
-                        color = self.BLUE
-                    else:
-                        color = self.ORANGE
+        self.draw_outline()
 
-                    pygame.draw.circle(self.screen, color, (x, y), self.CIRCLE_RADIUS)
+    def draw_outline(self):
+        """
+        Draws the board outline
 
-                    # Draw piece letters
-                    text_surface = self.piece_font.render(piece.get_name()[0], True, (0,0,0))
-                    text_rect = text_surface.get_rect(center=(x, y))
-                    self.screen.blit(text_surface, text_rect)
+        :return: None
+        """
+        pygame.draw.rect(self.screen, (0,0,0), (self.BOARD_OFFSET_X, self.BOARD_OFFSET_Y, self.BOARD_SIZE, self.BOARD_SIZE), 1)
+
+    def draw_pieces(self):
+        """
+        Draws the pieces on the board
+
+        :return: None
+        """
+
+        for square, piece in self.game.get_board_view().items():
+            if piece is not None:
+                surface = self.piece_surfaces[(piece.get_name(), piece.get_color())]
+                self.screen.blit(surface, self.get_square_rect(square))
 
     def draw_ui(self):
         """
         Draws all the UI elements including text and rules button
 
-        :return: None
+        :return: pygame.Rect of the header area that was drawn over
         """
-        
+
+        self.screen.fill(self.WHITE, self.header_rect)
+
         turn = self.game.get_turn()
         game_state = self.game.get_game_state()
 
         color = self.BLUE if turn == "BLUE" else self.ORANGE
 
         if game_state == "UNFINISHED":
-            title_text = self.title_font.render("Transportation Chess", True, (0,0,0))
+            title_text = self.render_text(self.title_font, "Transportation Chess", (0,0,0))
             title_rect = title_text.get_rect(center=(self.WINDOW_WIDTH // 2, 20))
             self.screen.blit(title_text, title_rect)
 
-            turn_text = self.info_font.render(f"{turn}'s turn", True, color)
+            turn_text = self.render_text(self.info_font, f"{turn}'s turn", color)
             turn_rect = turn_text.get_rect(center=(self.WINDOW_WIDTH // 2, 60))
             self.screen.blit(turn_text, turn_rect)
         else:
             win_color = self.BLUE if game_state == "BLUE" else self.ORANGE
-            title_text = self.title_font.render(f"{game_state} WON!", True, win_color)
+            title_text = self.render_text(self.title_font, f"{game_state} WON!", win_color)
             title_rect = title_text.get_rect(center=(self.WINDOW_WIDTH // 2, 20))
             self.screen.blit(title_text, title_rect)
 
             # Prompts user to start new game
-            restart_text = self.info_font.render("Click anywhere to start a new game", True, (0, 0, 0))
+            restart_text = self.render_text(self.info_font, "Click anywhere to start a new game", (0, 0, 0))
             restart_rect = restart_text.get_rect(center=(self.WINDOW_WIDTH // 2, 60))
             self.screen.blit(restart_text, restart_rect)
 
@@ -325,31 +615,58 @@ class ChessLikeGUI:
         pygame.draw.rect(self.screen, (0, 0, 0), self.rules_button_rect.inflate(10, 5), 2)
 
         self.screen.blit(self.rules_button_text, self.rules_button_rect)
-        
-    def draw_rules(self):
+
+        return self.header_rect
+
+    def render_rules(self):
         """
-        Draws the rules popup to explain the game to users
+        Draws the rules popup and the transparent overlay around it once, to be shown whenever the rules are opened
 
-        :return: None
+        :return: pygame.Surface the size of the window
         """
 
         # Draw transparent overlay over game window
-        transparency = pygame.Surface((self.WINDOW_WIDTH, self.WINDOW_HEIGHT), pygame.SRCALPHA)
-        transparency.fill(self.OVERLAY)
-        self.screen.blit(transparency, (0,0))
+        rules = pygame.Surface((self.WINDOW_WIDTH, self.WINDOW_HEIGHT), pygame.SRCALPHA)
+        rules.fill(self.OVERLAY)
 
         x = (self.WINDOW_WIDTH - self.POPUP_WIDTH) // 2
         y = (self.WINDOW_HEIGHT - self.POPUP_HEIGHT) // 2
 
         popup_rect = pygame.Rect(x, y, self.POPUP_WIDTH, self.POPUP_HEIGHT)
-        pygame.draw.rect(self.screen, (255, 255, 255), popup_rect)
+        pygame.draw.rect(rules, (255, 255, 255), popup_rect)
 
         for line_number, line in enumerate(self.rules_lines):
             line_x = x + 20
             line_y = y + (line_number * 30) + 10
 
             text_surface = self.info_font.render(line, True, (0,0,0))
-            self.screen.blit(text_surface, (line_x, line_y))
+            rules.blit(text_surface, (line_x, line_y))
+
+        return rules
+
+    def draw_status(self):
+        """
+        Draws the computer's status line under the board
+
+        :return: pygame.Rect of the status area that was drawn over
+        """
+        self.screen.fill(self.WHITE, self.footer_rect)
+
+        # The text changes with every update, so it isn't cached
+        if self.engine_status:
+            status_text = self.info_font.render(self.engine_status, True, (0, 0, 0))
+            status_rect = status_text.get_rect(center=self.footer_rect.center)
+            self.screen.blit(status_text, status_rect)
+
+        return self.footer_rect
+
+    def draw_rules(self):
+        """
+        Draws the rules popup to explain the game to users
+
+        :return: None
+        """
+        self.screen.blit(self.rules_surface, (0,0))
 
     def reset(self):
         """
@@ -358,6 +675,11 @@ class ChessLikeGUI:
         :return: None
         """
 
+        self.cancel_engine()
+
         self.game = ChessLike()
         self.selected_square = None
-        self.valid_moves = []
\ No newline at end of file
+        self.valid_moves = []
+
+        # The computer moves first if it plays BLUE
+        self.start_engine_turn()
\ No newline at end of file
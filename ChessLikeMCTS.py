@@ -0,0 +1,557 @@
+# Description: A Monte Carlo Tree Search (UCT) computer opponent for ChessLike. Leaves are picked a batch at a time
+# and their playouts are handed to an evaluator together, so playouts can run in this process, across a process pool,
+# or all at once on the NumPy batch simulator. The tree is kept between searches and reused once the game moves on.
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ChessLike import ChessLike, GAME_STATES, SQUARES
+from ChessLikeSelfPlay import DEFAULT_MAX_PLIES, make_policy
+
+#exploration constant in the UCT formula, sqrt(2) is the textbook value for results between 0 and 1
+DEFAULT_EXPLORATION = 1.4
+
+#leaves picked before their playouts are evaluated together
+DEFAULT_BATCH_SIZE = 16
+
+#what a playout scores for the player who made the move into a node
+WIN = 1.0
+DRAW = 0.5
+LOSS = 0.0
+
+
+def play_out(data, policy, max_plies=DEFAULT_MAX_PLIES):
+    """
+    Plays a position out to the end with one policy moving for both players
+
+    :param data: Position encoded by ChessLike.to_bytes
+    :param policy: Policy object with a choose_move(game) method that returns None when there is no legal move
+    :param max_plies: Moves after which the playout is stopped unfinished
+
+    :return: Final game state, "UNFINISHED", "BLUE" or "ORANGE"
+    """
+    game = ChessLike.from_bytes(data, silent=True)
+    plies = 0
+    while game.get_game_state() == "UNFINISHED" and plies < max_plies:
+        #the policy lists the moves itself, so they are only generated once per ply
+        move = policy.choose_move(game)
+        if move is None:
+            break
+
+        origin, destination = move
+        game.commit_move(origin, destination)
+        game.switch_turn()
+        plies += 1
+
+    return game.get_game_state()
+
+
+def _play_out_block(job):
+    """
+    Worker side of ProcessPoolEvaluator: plays out a block of positions
+
+    :param job: Tuple of (list of position bytes, policy spec, max plies, seed)
+
+    :return: List of final game states in the same order
+    """
+    positions, policy_spec, max_plies, seed = job
+    policy = make_policy(policy_spec, seed)
+    return [play_out(data, policy, max_plies) for data in positions]
+
+
+class PlayoutEvaluator:
+    """
+    Plays out every leaf of a batch one after another in this process
+    """
+
+    def __init__(self, policy="random", max_plies=DEFAULT_MAX_PLIES, seed=None):
+        """
+        :param policy: Playout policy name accepted by ChessLikeSelfPlay.make_policy, such as "random" or "greedy"
+        :param max_plies: Moves after which a playout is stopped unfinished
+        :param seed: Seed for the policy's random choices
+        """
+        self._policy = make_policy(policy, seed)
+        self._max_plies = max_plies
+
+    def evaluate(self, positions):
+        """
+        :param positions: List of positions encoded by ChessLike.to_bytes
+
+        :return: List of final game states in the same order
+        """
+        return [play_out(data, self._policy, self._max_plies) for data in positions]
+
+    def close(self):
+        pass
+
+
+class ProcessPoolEvaluator:
+    """
+    Splits each batch of leaves into one block per worker process and plays the blocks out in parallel. Best with
+    batches several times larger than the number of workers.
+    """
+
+    def __init__(self, policy="random", max_plies=DEFAULT_MAX_PLIES, workers=None, seed=0):
+        """
+        :param policy: Playout policy name accepted by ChessLikeSelfPlay.make_policy
+        :param max_plies: Moves after which a playout is stopped unfinished
+        :param workers: Number of worker processes, or None for one per CPU
+        :param seed: Seed for the policies, each block gets its own seed derived from it
+        """
+        #checks the policy name before starting any workers
+        make_policy(policy)
+
+        self._policy = policy
+        self._max_plies = max_plies
+        self._workers = workers or os.cpu_count()
+        self._seed = seed
+        self._batches = 0
+        self._pool = ProcessPoolExecutor(max_workers=self._workers)
+
+    def evaluate(self, positions):
+        """
+        :param positions: List of positions encoded by ChessLike.to_bytes
+
+        :return: List of final game states in the same order
+        """
+        block_size = -(-len(positions) // self._workers)
+        jobs = [(positions[first:first + block_size], self._policy, self._max_plies,
+                 f"{self._seed}:{self._batches}:{first}")
+                for first in range(0, len(positions), block_size)]
+        self._batches += 1
+
+        results = []
+        for block in self._pool.map(_play_out_block, jobs):
+            results.extend(block)
+
+        return results
+
+    def close(self):
+        """
+        Shuts down the worker processes
+
+        :return: None
+        """
+        self._pool.shutdown()
+
+
+class VectorizedEvaluator:
+    """
+    Plays out a whole batch of leaves in lockstep on ChessLikeBatch with uniformly random moves. Needs numpy, which is
+    only imported when this evaluator is made.
+    """
+
+    def __init__(self, max_plies=DEFAULT_MAX_PLIES, seed=None):
+        """
+        :param max_plies: Moves after which a playout is stopped unfinished
+        :param seed: Seed for the random moves
+        """
+        import numpy as np
+        from ChessLikeBatch import ChessLikeBatch
+
+        self._batch_class = ChessLikeBatch
+        self._random = np.random.default_rng(seed)
+        self._max_plies = max_plies
+
+    def evaluate(self, positions):
+        """
+        :param positions: List of positions encoded by ChessLike.to_bytes
+
+        :return: List of final game states in the same order
+        """
+        batch = self._batch_class.from_games([ChessLike.from_bytes(data, silent=True) for data in positions])
+        for _ in range(self._max_plies):
+            if not batch.get_unfinished().any():
+                break
+
+            actions = batch.random_actions(self._random)
+            if (actions < 0).all():
+                break
+            batch.step(actions)
+
+        return [GAME_STATES[state] for state in batch.get_states().tolist()]
+
+    def close(self):
+        pass
+
+
+def make_evaluator(name, policy="random", max_plies=DEFAULT_MAX_PLIES, workers=None, seed=0):
+    """
+    Builds an evaluator from its command line name
+
+    :param name: "serial", "pool" or "vectorized"
+    :param policy: Playout policy name, the vectorized evaluator only plays random moves
+    :param max_plies: Moves after which a playout is stopped unfinished
+    :param workers: Number of worker processes for "pool"
+    :param seed: Seed for the playouts
+
+    :return: Evaluator object with evaluate(positions) and close() methods
+    """
+    if name == "serial":
+        return PlayoutEvaluator(policy, max_plies, seed)
+    if name == "pool":
+        return ProcessPoolEvaluator(policy, max_plies, workers, seed)
+    if name == "vectorized":
+        if policy != "random":
+            raise ValueError("The vectorized evaluator only plays random playouts")
+        return VectorizedEvaluator(max_plies, seed)
+
+    raise ValueError(f"Unknown evaluator {name!r}, expected serial, pool or vectorized")
+
+
+class MCTSNode:
+    """
+    One position in the search tree, reached by playing move from the parent's position
+    """
+
+    __slots__ = ("move", "parent", "children", "untried", "visits", "score", "mover", "position_hash", "game_state")
+
+    def __init__(self, move, parent, mover, position_hash, game_state):
+        """
+        :param move: (origin, destination) move that leads here from the parent, None for the root
+        :param parent: Parent MCTSNode, None for the root
+        :param mover: Color of the player who made the move, whose results the score counts
+        :param position_hash: Zobrist hash of the position
+        :param game_state: Game state of the position
+        """
+        self.move = move
+        self.parent = parent
+        self.children = []
+        #moves not expanded into children yet, None until the node is first reached
+        self.untried = None
+        self.visits = 0
+        self.score = 0.0
+        self.mover = mover
+        self.position_hash = position_hash
+        self.game_state = game_state
+
+    def is_terminal(self):
+        return self.game_state != "UNFINISHED"
+
+    def select_child(self, exploration):
+        """
+        Picks the child with the highest UCT value
+
+        :param exploration: Exploration constant
+
+        :return: MCTSNode
+        """
+        log_visits = math.log(self.visits)
+        best_child = None
+        best_value = -1.0
+        for child in self.children:
+            value = child.score / child.visits + exploration * math.sqrt(log_visits / child.visits)
+            if value > best_value:
+                best_value = value
+                best_child = child
+
+        return best_child
+
+
+class MCTSResult:
+    """
+    Holds the outcome of a search: the most visited move, how often it won, and how fast playouts ran
+    """
+
+    def __init__(self, best_move, visits, win_rate, playouts, elapsed, tree_size):
+        self._best_move = best_move
+        self._visits = visits
+        self._win_rate = win_rate
+        self._playouts = playouts
+        self._elapsed = elapsed
+        self._tree_size = tree_size
+
+    def get_best_move(self):
+        return self._best_move
+
+    def get_visits(self):
+        return self._visits
+
+    def get_win_rate(self):
+        return self._win_rate
+
+    def get_playouts(self):
+        return self._playouts
+
+    def get_elapsed(self):
+        return self._elapsed
+
+    def get_tree_size(self):
+        """
+        :return: Visits of the root, including those carried over from earlier searches
+        """
+        return self._tree_size
+
+    def get_playouts_per_second(self):
+        return self._playouts / self._elapsed if self._elapsed > 0 else 0.0
+
+
+class MCTSEngine:
+    """
+    UCT search. Each round picks up to batch_size leaves, marking the path to each with a virtual loss so the next
+    pick spreads to other lines, expands them by one move, then has the evaluator play all of them out together and
+    backs the results up the tree. The tree is kept after a search, and the next search carries on from the node for
+    the new position if it is within two moves of the old root. Positions in the opening book are played from the book.
+    """
+
+    def __init__(self, evaluator=None, playouts=1000, time_limit=None, exploration=DEFAULT_EXPLORATION,
+                 batch_size=DEFAULT_BATCH_SIZE, seed=None, book=None):
+        """
+        :param evaluator: Object with an evaluate(positions) method, a random PlayoutEvaluator if None
+        :param playouts: Playouts per search, or None for no limit
+        :param time_limit: Seconds a search may take, or None for no limit
+        :param exploration: Exploration constant in the UCT formula
+        :param batch_size: Leaves evaluated together
+        :param seed: Seed for the order unexpanded moves are tried in
+        :param book: ChessLikeBook.OpeningBook to probe before searching, or None
+        """
+        self._evaluator = evaluator if evaluator is not None else PlayoutEvaluator(seed=seed)
+        self._playouts = playouts
+        self._time_limit = time_limit
+        self._exploration = exploration
+        self._batch_size = batch_size
+        self._random = random.Random(seed)
+        self._book = book
+
+        self._root = None
+        self._total_playouts = 0
+        self._total_elapsed = 0.0
+
+    def get_evaluator(self):
+        return self._evaluator
+
+    def get_root(self):
+        return self._root
+
+    def get_playouts_per_second(self):
+        """
+        :return: Playouts per second across every search this engine has run
+        """
+        return self._total_playouts / self._total_elapsed if self._total_elapsed > 0 else 0.0
+
+    def close(self):
+        """
+        Releases the evaluator, shutting down any worker processes
+
+        :return: None
+        """
+        self._evaluator.close()
+
+    def search(self, game, playouts=None, time_limit=None):
+        """
+        Finds the best move for the player whose turn it is. The game is left exactly as it was passed in.
+
+        :param game: ChessLike game to search from
+        :param playouts: Overrides the engine's playout budget for this search
+        :param time_limit: Overrides the engine's time limit for this search
+
+        :return: MCTSResult. Its best move is None if the game is over
+        """
+        playouts = playouts if playouts is not None else self._playouts
+        time_limit = time_limit if time_limit is not None else self._time_limit
+        if playouts is None and time_limit is None:
+            raise ValueError("A search needs a playout budget or a time limit")
+
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else None
+
+        if self._book is not None:
+            move = self._book.best_move(game)
+            if move is not None:
+                return MCTSResult(move, 0, 0.0, 0, time.perf_counter() - start, 0)
+
+        root = self._find_root(game)
+        search_game = game.clone()
+        search_game.set_silent(True)
+        self._expand(root, search_game)
+
+        done = 0
+        while root.untried or root.children:
+            if playouts is not None and done >= playouts:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+            batch_size = self._batch_size if playouts is None else min(self._batch_size, playouts - done)
+            done += self._run_batch(root, search_game, batch_size)
+
+        elapsed = time.perf_counter() - start
+        self._total_playouts += done
+        self._total_elapsed += elapsed
+
+        if not root.children:
+            return MCTSResult(None, 0, 0.0, done, elapsed, root.visits)
+
+        best = max(root.children, key=lambda child: child.visits)
+        return MCTSResult(best.move, best.visits, best.score / best.visits, done, elapsed, root.visits)
+
+    def _find_root(self, game):
+        """
+        Reuses the part of the old tree below the game's position, or starts a new tree
+
+        :param game: ChessLike game being searched
+
+        :return: MCTSNode for the game's position, with no parent
+        """
+        position_hash = game.get_hash()
+
+        #looks at the old root, then its children, then its grandchildren, one layer at a time
+        frontier = [self._root] if self._root is not None else []
+        for _ in range(3):
+            for node in frontier:
+                if node.position_hash == position_hash:
+                    node.parent = None
+                    self._root = node
+                    return node
+            frontier = [child for node in frontier for child in node.children]
+
+        mover = "ORANGE" if game.get_turn() == "BLUE" else "BLUE"
+        self._root = MCTSNode(None, None, mover, position_hash, game.get_game_state())
+        return self._root
+
+    def _expand(self, node, game):
+        """
+        Lists the moves of a node the first time it is reached
+
+        :param node: MCTSNode for the game's position
+        :param game: ChessLike game at the node's position
+
+        :return: None
+        """
+        if node.untried is None:
+            node.untried = game.legal_move_indexes() if not node.is_terminal() else []
+            self._random.shuffle(node.untried)
+
+    def _run_batch(self, root, game, batch_size):
+        """
+        Picks, expands and evaluates one batch of leaves
+
+        :param root: Root MCTSNode
+        :param game: ChessLike game at the root position, left as it was
+        :param batch_size: Most leaves to pick
+
+        :return: Number of leaves evaluated
+        """
+        leaves = []
+        positions = []
+        for _ in range(batch_size):
+            node = root
+            depth = 0
+            #a virtual loss on the way down, undone in _back_up
+            node.visits += 1
+            while not node.untried and node.children:
+                node = node.select_child(self._exploration)
+                game.push(node.move)
+                depth += 1
+                node.visits += 1
+
+            if node.untried:
+                move = node.untried.pop()
+                game.push(move)
+                depth += 1
+                mover = "ORANGE" if game.get_turn() == "BLUE" else "BLUE"
+                child = MCTSNode(move, node, mover, game.get_hash(), game.get_game_state())
+                node.children.append(child)
+                self._expand(child, game)
+                node = child
+                node.visits += 1
+
+            leaves.append(node)
+            positions.append(game.to_bytes() if not node.is_terminal() else None)
+            for _ in range(depth):
+                game.pop()
+
+        playout_positions = [data for data in positions if data is not None]
+        results = iter(self._evaluator.evaluate(playout_positions) if playout_positions else [])
+        for node, data in zip(leaves, positions):
+            self._back_up(node, next(results) if data is not None else node.game_state)
+
+        return len(leaves)
+
+    def _back_up(self, node, game_state):
+        """
+        Adds a playout result to every node from the leaf up to the root. Visits were already counted on the way down.
+
+        :param node: Leaf MCTSNode
+        :param game_state: Final game state of the playout
+
+        :return: None
+        """
+        while node is not None:
+            if game_state == node.mover:
+                node.score += WIN
+            elif game_state == "UNFINISHED":
+                node.score += DRAW
+            else:
+                node.score += LOSS
+            node = node.parent
+
+
+class MCTSPolicy:
+    """
+    Self-play policy that plays the move chosen by the MCTS engine with a fixed number of random playouts, reusing
+    its tree from one move to the next
+    """
+
+    def __init__(self, playouts, seed=None):
+        self._engine = MCTSEngine(PlayoutEvaluator(seed=seed), playouts, seed=seed)
+
+    def choose_move(self, game):
+        """
+        :param game: ChessLike game
+
+        :return: (origin, destination) tuple of square indexes, or None if there is no legal move
+        """
+        return self._engine.search(game).get_best_move()
+
+
+def main(argv=None):
+    """
+    Command line entry point. Searches the start position, or a position reached by a list of moves, and reports the
+    move found and the playout rate
+    """
+    parser = argparse.ArgumentParser(description="Run the ChessLike MCTS engine on a position")
+    parser.add_argument("moves", nargs="*", help="moves from the start position, like b1b3")
+    parser.add_argument("--playouts", type=int, default=2000, help="playouts to run")
+    parser.add_argument("--time", type=float, default=None, help="seconds to search instead of a playout count")
+    parser.add_argument("--evaluator", choices=("serial", "pool", "vectorized"), default="serial",
+                        help="where playouts run")
+    parser.add_argument("--policy", default="random", help="playout policy: random, greedy or search:<depth>")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="leaves evaluated together")
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES, help="moves before a playout is stopped")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="worker processes for --evaluator pool, 0 for one per CPU")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the playouts")
+    args = parser.parse_args(argv)
+
+    game = ChessLike(silent=True)
+    for move in args.moves:
+        if not game.make_move(move[:2], move[2:]):
+            parser.error(f"illegal move {move}")
+
+    evaluator = make_evaluator(args.evaluator, args.policy, args.max_plies, args.workers or None, args.seed)
+    engine = MCTSEngine(evaluator, None if args.time else args.playouts, args.time, batch_size=args.batch_size,
+                        seed=args.seed)
+    try:
+        result = engine.search(game)
+    finally:
+        engine.close()
+
+    if result.get_best_move() is None:
+        print("the game is over")
+        return 0
+
+    origin, destination = result.get_best_move()
+    print(f"{SQUARES[origin]}{SQUARES[destination]}: {result.get_visits()} visits, "
+          f"{result.get_win_rate():.1%} wins, {result.get_playouts()} playouts in {result.get_elapsed():.2f}s "
+          f"({result.get_playouts_per_second():,.0f} playouts/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
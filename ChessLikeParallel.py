@@ -0,0 +1,124 @@
+# Description: Splits perft and the search engine across a process pool. The root moves of a position are handed out
+# to worker processes, which each get the position as ChessLike.to_bytes and the root move to play, and the results
+# are combined in root move order so the answer doesn't depend on which worker finishes first.
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ChessLike import ChessLike, SQUARES
+from ChessLikePerft import perft
+from ChessLikeSearch import SearchEngine, SearchResult, WIN_SCORE, evaluate, order_moves
+
+
+def _perft_job(job):
+    """
+    Worker side of parallel_perft: plays one root move and counts the rest of the tree
+
+    :param job: Tuple of (position bytes, root move, depth)
+
+    :return: Leaf count below the root move
+    """
+    data, move, depth = job
+    game = ChessLike.from_bytes(data)
+    game.push(move)
+    return perft(game, depth - 1)
+
+
+def parallel_divide(game, depth, workers=None):
+    """
+    Runs divide with one job per root move spread across a process pool
+
+    :param game: ChessLike game, left unchanged
+    :param depth: Number of moves to look ahead, at least 1
+    :param workers: Number of worker processes, or None for one per CPU
+
+    :return: Dictionary mapping each root move in board notation like "b1c2" to its leaf count
+    """
+    data = game.to_bytes()
+    moves = game.legal_move_indexes()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        counts = pool.map(_perft_job, [(data, move, depth) for move in moves])
+        return {SQUARES[origin] + SQUARES[destination]: count for (origin, destination), count in zip(moves, counts)}
+
+
+def parallel_perft(game, depth, workers=None):
+    """
+    Counts leaf nodes like perft, with the root moves split across a process pool
+
+    :param game: ChessLike game, left unchanged
+    :param depth: Number of moves to look ahead
+    :param workers: Number of worker processes, or None for one per CPU
+
+    :return: Number of leaf nodes
+    """
+    if depth == 0:
+        return 1
+
+    return sum(parallel_divide(game, depth, workers).values())
+
+
+def _search_job(job):
+    """
+    Worker side of parallel_search: plays one root move and searches the reply with a fresh engine
+
+    :param job: Tuple of (position bytes, root move, depth, node limit, table size in megabytes)
+
+    :return: Tuple of (score for the player who made the root move, principal variation after it, nodes searched)
+    """
+    data, move, depth, node_limit, table_size_mb = job
+    game = ChessLike.from_bytes(data)
+    game.push(move)
+
+    #the root move captured the Bike
+    if game.get_game_state() != "UNFINISHED":
+        return WIN_SCORE - 1, [], 1
+
+    if depth == 1:
+        return -evaluate(game), [], 1
+
+    engine = SearchEngine(max_depth=depth - 1, node_limit=node_limit, table_size_mb=table_size_mb)
+    result = engine.search(game)
+    score = -result.get_score()
+
+    #wins and losses found below the root move are one ply further from the real root
+    if score >= WIN_SCORE - 1000:
+        score -= 1
+    elif score <= -WIN_SCORE + 1000:
+        score += 1
+
+    return score, result.get_principal_variation(), result.get_nodes()
+
+
+def parallel_search(game, depth, workers=None, node_limit=None, table_size_mb=4):
+    """
+    Searches every root move to a fixed depth in its own worker process. Ties between equal scores go to the move
+    that comes first in the engine's move ordering, so the same position and depth always give the same move.
+
+    :param game: ChessLike game, left unchanged
+    :param depth: Depth of the whole search in plies, at least 1
+    :param workers: Number of worker processes, or None for one per CPU
+    :param node_limit: Node budget for each root move, or None for no limit
+    :param table_size_mb: Transposition table size for each worker's engine
+
+    :return: SearchResult for the position, with the nodes of every worker added up
+    """
+    start = time.perf_counter()
+    moves = order_moves(game, game.legal_move_indexes())
+    if not moves:
+        return SearchResult(None, evaluate(game), 0, [], 0, 0.0)
+
+    data = game.to_bytes()
+    jobs = [(data, move, depth, node_limit, table_size_mb) for move in moves]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_search_job, jobs))
+
+    best_index = 0
+    for index, (score, _, _) in enumerate(results):
+        if score > results[best_index][0]:
+            best_index = index
+
+    best_score, best_line, _ = results[best_index]
+    nodes = sum(result[2] for result in results)
+    return SearchResult(moves[best_index], best_score, depth, [moves[best_index]] + best_line, nodes,
+                        time.perf_counter() - start)
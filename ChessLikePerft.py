@@ -0,0 +1,181 @@
+# Description: Perft (performance test) for the ChessLike move generator. Counts the leaf nodes of the game tree to a
+# fixed depth from known positions, checks them against stored reference counts, and reports nodes per second.
+
+import argparse
+import sys
+import time
+
+from ChessLike import ChessLike, SQUARES
+
+#test positions given as the moves played from the start position, with reference leaf counts by depth
+TEST_POSITIONS = {
+    "start": {
+        "moves": [],
+        "counts": {1: 29, 2: 837, 3: 28136, 4: 937502, 5: 33646806},
+    },
+    "opening": {
+        "moves": ["d1c2", "b7f3", "c2b2", "c7d6", "b1a2", "a7a6"],
+        "counts": {1: 33, 2: 1365, 3: 49161, 4: 2018545, 5: 76373809},
+    },
+    "middlegame": {
+        "moves": ["f1c4", "c7c6", "c4a2", "e7f6", "d1c2", "f7e7", "c2b2", "f6f4", "c1d2", "e7g5", "b2b3", "b7b6"],
+        "counts": {1: 38, 2: 1771, 3: 68251, 4: 3169881, 5: 125168072},
+    },
+    "tactical": {
+        "moves": ["b1c2", "f7d5", "c2g6", "a7c5", "g6f7", "d5f3", "f7e6", "b7b6", "e6c4", "c5c4", "e1e2", "f3e2",
+                  "d1e2", "c7b7", "f1e1", "b6a7", "c1c4", "a7b6", "e2d2", "d7e6"],
+        "counts": {1: 33, 2: 982, 3: 31495, 4: 980583, 5: 31389781},
+    },
+    "endgame": {
+        "moves": ["c1c4", "e7e4", "c4d4", "c7c4", "e1e4", "b7e4", "f1c4", "f7c4", "b1e4", "c4d4", "e4d4", "a7a6",
+                  "d4c4", "d7d6", "c4a2", "d6c5", "d1d2", "c5d5", "a2b3", "d5d6", "g1g2", "d6c6", "b3a4", "a6a5",
+                  "a4a5", "c6b6", "d2c1", "b6a5", "g2g3", "a5b4"],
+        "counts": {1: 13, 2: 143, 3: 1997, 4: 21221, 5: 306526},
+    },
+}
+
+
+def perft(game, depth):
+    """
+    Counts the positions reached after exactly depth moves. Games that end early stop counting, as there are no
+    moves after a Bike is captured.
+
+    :param game: ChessLike game, left unchanged
+    :param depth: Number of moves to look ahead
+
+    :return: Number of leaf nodes
+    """
+    if depth == 0:
+        return 1
+
+    moves = game.legal_move_indexes()
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        game.push(move)
+        nodes += perft(game, depth - 1)
+        game.pop()
+
+    return nodes
+
+
+def divide(game, depth):
+    """
+    Breaks the perft count down by the first move, which narrows down where two move generators disagree
+
+    :param game: ChessLike game, left unchanged
+    :param depth: Number of moves to look ahead, at least 1
+
+    :return: Dictionary mapping each root move in board notation like "b1c2" to its leaf count
+    """
+    counts = {}
+    for move in game.legal_move_indexes():
+        game.push(move)
+        counts[SQUARES[move[0]] + SQUARES[move[1]]] = perft(game, depth - 1)
+        game.pop()
+
+    return counts
+
+
+def load_position(name):
+    """
+    Plays out one of the stored test positions
+
+    :param name: Key of TEST_POSITIONS
+
+    :return: ChessLike game at that position
+    """
+    game = ChessLike()
+    for move in TEST_POSITIONS[name]["moves"]:
+        game.push((move[:2], move[2:]))
+
+    return game
+
+
+def run_perft(name, depth, workers=1):
+    """
+    Runs perft on a stored test position and times it
+
+    :param name: Key of TEST_POSITIONS
+    :param depth: Number of moves to look ahead
+    :param workers: Number of processes to split the root moves across, 1 to run in this process
+
+    :return: Tuple of (nodes, seconds)
+    """
+    game = load_position(name)
+
+    start = time.perf_counter()
+    if workers != 1:
+        from ChessLikeParallel import parallel_perft
+        nodes = parallel_perft(game, depth, workers)
+    else:
+        nodes = perft(game, depth)
+
+    return nodes, time.perf_counter() - start
+
+
+def run_divide(name, depth, workers=1):
+    """
+    Runs divide on a stored test position and times it
+
+    :param name: Key of TEST_POSITIONS
+    :param depth: Number of moves to look ahead, at least 1
+    :param workers: Number of processes to split the root moves across, 1 to run in this process
+
+    :return: Tuple of (dictionary of root move to leaf count, seconds)
+    """
+    game = load_position(name)
+
+    start = time.perf_counter()
+    if workers != 1:
+        from ChessLikeParallel import parallel_divide
+        counts = parallel_divide(game, depth, workers)
+    else:
+        counts = divide(game, depth)
+
+    return counts, time.perf_counter() - start
+
+
+def main(argv=None):
+    """
+    Command line entry point. Runs perft on the chosen positions, prints counts and nodes per second, and exits with
+    status 1 if any count differs from its stored reference.
+    """
+    parser = argparse.ArgumentParser(description="Count ChessLike move generation leaf nodes")
+    parser.add_argument("--depth", type=int, default=3, help="moves to look ahead")
+    parser.add_argument("--position", choices=sorted(TEST_POSITIONS), action="append",
+                        help="test position to run, may be repeated (default: all)")
+    parser.add_argument("--divide", action="store_true", help="break the count down by root move")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to split root moves across, 0 for one per CPU")
+    args = parser.parse_args(argv)
+    if args.divide and args.depth < 1:
+        parser.error("--divide needs a depth of at least 1")
+
+    failed = False
+    for name in args.position or sorted(TEST_POSITIONS):
+        if args.divide:
+            #the total is the sum of the root moves, so the tree is only walked once
+            counts, seconds = run_divide(name, args.depth, args.workers or None)
+            for move, nodes in sorted(counts.items()):
+                print(f"{move}: {nodes}")
+            nodes = sum(counts.values())
+        else:
+            nodes, seconds = run_perft(name, args.depth, args.workers or None)
+
+        expected = TEST_POSITIONS[name]["counts"].get(args.depth)
+        status = ""
+        if expected is not None:
+            status = "ok" if nodes == expected else f"MISMATCH (expected {expected})"
+            failed = failed or nodes != expected
+
+        rate = nodes / seconds if seconds > 0 else float("inf")
+        print(f"{name} depth {args.depth}: {nodes} nodes in {seconds:.3f}s ({rate:,.0f} nodes/s) {status}".rstrip())
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+# Description: A compact append-only file format for recorded ChessLike games. Games are stored back to back in a data
+# file, each move taking two bytes, and a separate index file holds the byte offset of every game so any game can be
+# read through mmap without scanning the ones before it.
+#
+# Data file: the 8-byte header DATA_MAGIC, then for each game a result byte (index into GAME_STATES), the number of
+# moves as a little-endian uint16, and one (origin, destination) pair of square index bytes per move.
+# Index file (data path + ".idx"): the 8-byte header INDEX_MAGIC, then one little-endian uint64 offset per game.
+
+import mmap
+import os
+import struct
+
+from ChessLike import ChessLike, GAME_STATES
+
+DATA_MAGIC = b"CLGDATA1"
+INDEX_MAGIC = b"CLGINDX1"
+HEADER_SIZE = 8
+
+GAME_HEADER = struct.Struct("<BH")
+OFFSET = struct.Struct("<Q")
+
+#the move count is stored in a uint16
+MAX_MOVES = 0xFFFF
+
+
+def index_path(path):
+    """
+    Returns the path of the index file that goes with a data file
+
+    :param path: Path of the data file
+
+    :return: Path of the index file
+    """
+    return path + ".idx"
+
+
+class GameRecordWriter:
+    """
+    Appends games to a record file and its index. Opening an existing file adds to the end of it. Can be used as a
+    context manager, which closes the files at the end.
+    """
+
+    def __init__(self, path):
+        self._data = open(path, "ab")
+        self._index = open(index_path(path), "ab")
+
+        if self._data.tell() == 0:
+            self._data.write(DATA_MAGIC)
+        if self._index.tell() == 0:
+            self._index.write(INDEX_MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_game(self, moves, result):
+        """
+        Appends one game. The game data is written before its index entry, so a game only becomes visible to readers
+        once it is complete.
+
+        :param moves: List of (origin, destination) tuples of square indexes
+        :param result: Final game state, "UNFINISHED", "BLUE" or "ORANGE"
+
+        :return: None
+        """
+        if len(moves) > MAX_MOVES:
+            raise ValueError(f"A recorded game can have at most {MAX_MOVES} moves")
+
+        offset = self._data.tell()
+        record = bytearray(GAME_HEADER.pack(GAME_STATES.index(result), len(moves)))
+        for origin, destination in moves:
+            record.append(origin)
+            record.append(destination)
+
+        self._data.write(record)
+        self._data.flush()
+        self._index.write(OFFSET.pack(offset))
+
+    def close(self):
+        """
+        Flushes and closes the data and index files
+
+        :return: None
+        """
+        self._data.close()
+        self._index.close()
+
+
+class GameRecordReader:
+    """
+    Reads a record file through mmap. Games are only decoded when they are asked for, so the file is never loaded
+    into memory as a whole. Can be used as a context manager, which closes the maps at the end.
+    """
+
+    def __init__(self, path):
+        self._data_file = open(path, "rb")
+        self._index_file = open(index_path(path), "rb")
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._data[:HEADER_SIZE] != DATA_MAGIC or self._index[:HEADER_SIZE] != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a ChessLike game record file")
+
+        self._games = (len(self._index) - HEADER_SIZE) // OFFSET.size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self._games
+
+    def __iter__(self):
+        return self.iter_games()
+
+    def _offset(self, number):
+        """
+        Looks up where a game starts in the data file
+
+        :param number: Game number, counting from 0
+
+        :return: Byte offset of the game
+        """
+        if not 0 <= number < self._games:
+            raise IndexError(f"Game {number} is out of range, the file holds {self._games} games")
+
+        return OFFSET.unpack_from(self._index, HEADER_SIZE + number * OFFSET.size)[0]
+
+    def get_result(self, number):
+        """
+        Reads a game's result without decoding its moves
+
+        :param number: Game number, counting from 0
+
+        :return: Final game state of the game
+        """
+        return GAME_STATES[self._data[self._offset(number)]]
+
+    def get_game(self, number):
+        """
+        Reads one game
+
+        :param number: Game number, counting from 0
+
+        :return: Tuple of (moves, result) where moves is a list of (origin, destination) square index tuples
+        """
+        offset = self._offset(number)
+        result, count = GAME_HEADER.unpack_from(self._data, offset)
+        start = offset + GAME_HEADER.size
+        move_bytes = self._data[start:start + count * 2]
+        moves = list(zip(move_bytes[0::2], move_bytes[1::2]))
+        return moves, GAME_STATES[result]
+
+    def iter_games(self, start=0, stop=None):
+        """
+        Generates games one at a time
+
+        :param start: First game number
+        :param stop: Game number to stop before, or None for the end of the file
+
+        :return: Generator of (moves, result) tuples
+        """
+        stop = self._games if stop is None else min(stop, self._games)
+        for number in range(start, stop):
+            yield self.get_game(number)
+
+    def iter_positions(self, number):
+        """
+        Replays a game lazily, without checking the moves are legal. The same silent ChessLike object is updated and
+        yielded after each move, so clone it to keep a position.
+
+        :param number: Game number, counting from 0
+
+        :return: Generator yielding the game at the start position and after every move
+        """
+        moves, _ = self.get_game(number)
+        game = ChessLike(silent=True)
+        yield game
+
+        for origin, destination in moves:
+            game.commit_move(origin, destination)
+            game.switch_turn()
+            yield game
+
+    def close(self):
+        """
+        Closes the maps and their files
+
+        :return: None
+        """
+        self._data.close()
+        self._index.close()
+        self._data_file.close()
+        self._index_file.close()
+
+
+def count_games(path):
+    """
+    Counts the games in a record file from the size of its index, without opening the data file
+
+    :param path: Path of the data file
+
+    :return: Number of games
+    """
+    return max(0, (os.path.getsize(index_path(path)) - HEADER_SIZE) // OFFSET.size)
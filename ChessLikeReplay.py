@@ -0,0 +1,143 @@
+# Description: Bulk replay and validation of ChessLike games, such as games submitted by clients. Every move is checked
+# with the same rules as ChessLike.make_move, but moves are parsed with a single table lookup and played through
+# make_move_index, and batches of games can be spread across worker processes.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from ChessLike import ChessLike, SQUARES
+
+#every move in "b1c2" notation mapped to its square indexes, so parsing is one dictionary lookup
+MOVE_INDEXES = {origin + destination: (origin_index, destination_index)
+                for origin_index, origin in enumerate(SQUARES)
+                for destination_index, destination in enumerate(SQUARES)}
+
+
+class ReplayResult:
+    """
+    The outcome of replaying one game: whether every move was legal, the game state reached, and where the first
+    illegal move is
+    """
+
+    def __init__(self, legal, game_state, first_illegal, moves_played):
+        self._legal = legal
+        self._game_state = game_state
+        self._first_illegal = first_illegal
+        self._moves_played = moves_played
+
+    def is_legal(self):
+        return self._legal
+
+    def get_game_state(self):
+        return self._game_state
+
+    def get_first_illegal(self):
+        """
+        :return: Index in the move list of the first illegal move, or None if every move was legal
+        """
+        return self._first_illegal
+
+    def get_moves_played(self):
+        return self._moves_played
+
+    def __repr__(self):
+        return (f"ReplayResult(legal={self._legal}, game_state={self._game_state!r}, "
+                f"first_illegal={self._first_illegal}, moves_played={self._moves_played})")
+
+
+def parse_move(move):
+    """
+    Turns a move into square indexes. Accepts "b1c2" strings, ("b1", "c2") tuples and (1, 9) index tuples
+
+    :param move: Move in any of the accepted forms
+
+    :return: (origin, destination) tuple of square indexes, or None if the move can't be parsed
+    """
+    if isinstance(move, str):
+        indexes = MOVE_INDEXES.get(move)
+        if indexes is None:
+            indexes = MOVE_INDEXES.get(move.lower())
+        return indexes
+
+    try:
+        origin, destination = move
+    except (TypeError, ValueError):
+        return None
+
+    if isinstance(origin, str) and isinstance(destination, str):
+        return parse_move(origin + destination)
+
+    if isinstance(origin, int) and isinstance(destination, int) and \
+            0 <= origin < len(SQUARES) and 0 <= destination < len(SQUARES):
+        return origin, destination
+
+    return None
+
+
+def replay_game(moves):
+    """
+    Replays one game from the start position and stops at the first illegal move. Moves after the game has ended
+    count as illegal, as make_move refuses them.
+
+    :param moves: Iterable of moves in any form parse_move accepts
+
+    :return: ReplayResult
+    """
+    game = ChessLike(silent=True)
+    played = 0
+    for number, move in enumerate(moves):
+        indexes = parse_move(move)
+        if indexes is None or not game.make_move_index(indexes[0], indexes[1]):
+            return ReplayResult(False, game.get_game_state(), number, played)
+        played += 1
+
+    return ReplayResult(True, game.get_game_state(), None, played)
+
+
+def _replay_block(games):
+    """
+    Worker side of validate_games: replays a block of games
+
+    :param games: List of move lists
+
+    :return: List of ReplayResults in the same order
+    """
+    return [replay_game(moves) for moves in games]
+
+
+def validate_games(games, workers=1, block_size=256):
+    """
+    Replays many games and yields a result for each, in the same order as the games. With more than one worker,
+    blocks of games are replayed in a process pool and only a few blocks are in flight at once, so games can come
+    from a stream of any length.
+
+    :param games: Iterable of move lists
+    :param workers: Number of worker processes, 1 to replay in this process, or None for one per CPU
+    :param block_size: Games per job sent to a worker
+
+    :return: Generator of ReplayResults
+    """
+    if workers == 1:
+        for moves in games:
+            yield replay_game(moves)
+        return
+
+    games = iter(games)
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        #keeps two blocks per worker queued so workers never wait on this process
+        in_flight = []
+        max_in_flight = 2 * workers
+        while True:
+            while len(in_flight) < max_in_flight:
+                block = [list(moves) for moves in islice(games, block_size)]
+                if not block:
+                    break
+                in_flight.append(pool.submit(_replay_block, block))
+
+            if not in_flight:
+                return
+
+            for result in in_flight.pop(0).result():
+                yield result
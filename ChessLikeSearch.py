@@ -0,0 +1,492 @@
+# Description: A computer opponent for ChessLike. Runs a negamax alpha-beta search with iterative deepening on a
+# single ChessLike object using push/pop, and stops cleanly when its time or node budget runs out.
+
+import threading
+import time
+from array import array
+
+#material values used by the evaluation and by move ordering. Capturing the Bike ends the game, so it is worth more
+#than every other piece combined
+PIECE_VALUES = {
+    "Bike": 1000,
+    "Car": 5,
+    "Train": 4,
+    "Helicopter": 3,
+}
+
+WIN_SCORE = 100000
+
+#how many nodes are searched between checks of the clock
+CHECK_INTERVAL = 1024
+
+#bound types stored in the transposition table
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+NO_MOVE = 0xFFFF
+
+#bytes used by one transposition table entry: key (8), score (4), depth (1), bound (1) and move (2)
+ENTRY_SIZE = 16
+
+
+class SearchStopped(Exception):
+    """
+    Raised inside the search when the time or node budget runs out so the current iteration can be abandoned
+    """
+    pass
+
+
+class SearchResult:
+    """
+    Holds the outcome of a search: the best move found, its score, and the principal variation that backs it up
+    """
+
+    def __init__(self, best_move, score, depth, principal_variation, nodes, elapsed):
+        self._best_move = best_move
+        self._score = score
+        self._depth = depth
+        self._principal_variation = principal_variation
+        self._nodes = nodes
+        self._elapsed = elapsed
+
+    def get_best_move(self):
+        return self._best_move
+
+    def get_score(self):
+        return self._score
+
+    def get_depth(self):
+        return self._depth
+
+    def get_principal_variation(self):
+        return self._principal_variation
+
+    def get_nodes(self):
+        return self._nodes
+
+    def get_elapsed(self):
+        return self._elapsed
+
+
+def evaluate(game):
+    """
+    Scores the position by material from the point of view of the player whose turn it is
+
+    :param game: ChessLike game
+
+    :return: Positive score if the player to move is ahead, negative if behind
+    """
+    turn = game.get_turn()
+    score = 0
+    for index in range(49):
+        piece = game.get_piece_at(index)
+        if piece is not None:
+            value = PIECE_VALUES[piece.get_name()]
+            if piece.get_color() == turn:
+                score += value
+            else:
+                score -= value
+
+    return score
+
+
+def order_moves(game, moves, first_move=None):
+    """
+    Sorts moves so Bike captures come first, then other captures by the value of the captured piece, then quiet moves
+
+    :param game: ChessLike game the moves belong to
+    :param moves: List of (origin, destination) square index tuples
+    :param first_move: Move to try before all others, such as the best move from the previous iteration
+
+    :return: New list of moves in search order
+    """
+    def capture_value(move):
+        victim = game.get_piece_at(move[1])
+        if victim is None:
+            return 0
+
+        return PIECE_VALUES[victim.get_name()]
+
+    ordered = sorted(moves, key=capture_value, reverse=True)
+    if first_move is not None and first_move in ordered:
+        ordered.remove(first_move)
+        ordered.insert(0, first_move)
+
+    return ordered
+
+
+class TranspositionTable:
+    """
+    A fixed-size table of search results keyed by Zobrist hash. Entries are stored in parallel arrays rather than as
+    Python objects so the memory used is set by the size passed in. Each bucket holds two entries: the first only
+    gets replaced by a search at least as deep, the second is always replaced.
+    """
+
+    def __init__(self, size_mb=16):
+        """
+        :param size_mb: Memory cap for the table in megabytes
+        """
+        self._buckets = max(1, size_mb * 1024 * 1024 // (ENTRY_SIZE * 2))
+        entries = self._buckets * 2
+
+        self._keys = array("Q", bytes(8 * entries))
+        self._scores = array("i", bytes(4 * entries))
+        self._depths = array("b", [-1]) * entries
+        self._bounds = array("B", bytes(entries))
+        self._moves = array("H", [NO_MOVE]) * entries
+
+    def get_capacity(self):
+        return self._buckets * 2
+
+    def clear(self):
+        """
+        Empties the table without releasing its memory
+
+        :return: None
+        """
+        self._depths[:] = array("b", [-1]) * len(self._depths)
+
+    def probe(self, key):
+        """
+        Looks up the entry for a position
+
+        :param key: Zobrist hash of the position
+
+        :return: Tuple of (depth, score, bound, move) or None if the position isn't stored. move is an
+            (origin, destination) tuple of square indexes or None
+        """
+        slot = (key % self._buckets) * 2
+        for slot in (slot, slot + 1):
+            if self._depths[slot] >= 0 and self._keys[slot] == key:
+                move = self._moves[slot]
+                if move == NO_MOVE:
+                    move = None
+                else:
+                    move = divmod(move, 49)
+
+                return self._depths[slot], self._scores[slot], self._bounds[slot], move
+
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        """
+        Saves a search result. It goes in the depth-preferred slot if that slot holds the same position or a
+        shallower search, otherwise in the always-replace slot.
+
+        :param key: Zobrist hash of the position
+        :param depth: Depth the position was searched to
+        :param score: Score found for the player to move
+        :param bound: EXACT, LOWER_BOUND or UPPER_BOUND
+        :param move: Best (origin, destination) move found, or None
+
+        :return: None
+        """
+        slot = (key % self._buckets) * 2
+        if self._keys[slot] != key and self._depths[slot] > depth:
+            slot += 1
+
+        self._keys[slot] = key
+        self._scores[slot] = score
+        self._depths[slot] = min(depth, 127)
+        self._bounds[slot] = bound
+        self._moves[slot] = NO_MOVE if move is None else move[0] * 49 + move[1]
+
+
+def _score_to_table(score, ply):
+    """
+    Stores win and loss scores as distance from the current node instead of from the root, so the entry is valid
+    wherever the position appears in the tree
+    """
+    if score >= WIN_SCORE - 1000:
+        return score + ply
+    if score <= -WIN_SCORE + 1000:
+        return score - ply
+
+    return score
+
+
+def _score_from_table(score, ply):
+    """
+    Turns a stored win or loss score back into distance from the root
+    """
+    if score >= WIN_SCORE - 1000:
+        return score - ply
+    if score <= -WIN_SCORE + 1000:
+        return score + ply
+
+    return score
+
+
+def _tablebase_score(value, ply):
+    """
+    Turns a tablebase value into a search score at the given ply, on the same scale as a Bike capture found by the
+    search itself
+    """
+    if value == 0:
+        return 0
+    if value & 1:
+        return WIN_SCORE - ply - value
+
+    return -WIN_SCORE + ply + value
+
+
+class SearchEngine:
+    """
+    Negamax alpha-beta search with iterative deepening. Each iteration searches one ply deeper than the last, and the
+    result of the deepest finished iteration is returned when the wall-clock or node budget runs out. Results are kept
+    in a transposition table that lasts between searches. With an endgame tablebase, positions it covers are scored
+    exactly instead of being searched, and with an opening book, book positions are played from the book.
+    """
+
+    def __init__(self, max_depth=6, time_limit=None, node_limit=None, table_size_mb=16, tablebase=None, book=None):
+        """
+        :param max_depth: Deepest iteration to run
+        :param time_limit: Seconds the search may take, or None for no limit
+        :param node_limit: Nodes the search may visit, or None for no limit
+        :param table_size_mb: Memory cap of the transposition table, or 0 to search without one
+        :param tablebase: ChessLikeTablebase.Tablebase to probe, or None
+        :param book: ChessLikeBook.OpeningBook to probe before searching, or None
+        """
+        self._max_depth = max_depth
+        self._time_limit = time_limit
+        self._node_limit = node_limit
+        self._table = TranspositionTable(table_size_mb) if table_size_mb else None
+        self._tablebase = tablebase
+        self._book = book
+
+        self._nodes = 0
+        self._deadline = None
+        self._node_limit_value = None
+        self._next_check = CHECK_INTERVAL
+        self._stop_event = None
+        self._progress = None
+        self._depth = 0
+        self._result = None
+        self._pv_table = []
+
+    def search(self, game, max_depth=None, time_limit=None, node_limit=None, stop_event=None, progress=None):
+        """
+        Finds the best move for the player whose turn it is. The game is left exactly as it was passed in.
+
+        :param game: ChessLike game to search from
+        :param max_depth: Overrides the engine's maximum depth for this search
+        :param time_limit: Overrides the engine's time limit for this search
+        :param node_limit: Overrides the engine's node limit for this search
+        :param stop_event: threading.Event that stops the search like a spent budget once it is set, or None
+        :param progress: Function called every CHECK_INTERVAL nodes and after each iteration with (depth being
+            searched, nodes so far, SearchResult of the deepest finished iteration or None), or None
+
+        :return: SearchResult of the deepest finished iteration. Its best move is None if the game is over
+        """
+        max_depth = max_depth if max_depth is not None else self._max_depth
+        time_limit = time_limit if time_limit is not None else self._time_limit
+        node_limit = node_limit if node_limit is not None else self._node_limit
+
+        start = time.perf_counter()
+        self._deadline = start + time_limit if time_limit is not None else None
+        self._node_limit_value = node_limit
+        self._nodes = 0
+        self._next_check = CHECK_INTERVAL
+        self._stop_event = stop_event
+        self._progress = progress
+        self._depth = 0
+        self._result = None
+
+        moves = game.legal_move_indexes()
+        if not moves:
+            return SearchResult(None, evaluate(game), 0, [], 0, 0.0)
+
+        #a tablebase position needs no search at all
+        if self._tablebase is not None:
+            entry = self._tablebase.best_move(game)
+            if entry is not None:
+                move, _, _ = entry
+                score = _tablebase_score(self._tablebase.probe_value(game), 0)
+                return SearchResult(move, score, 0, [move], 0, time.perf_counter() - start)
+
+        if self._book is not None:
+            move = self._book.best_move(game)
+            if move is not None:
+                return SearchResult(move, 0, 0, [move], 0, time.perf_counter() - start)
+
+        #falls back to the best looking capture if not even the first iteration finishes
+        result = SearchResult(order_moves(game, moves)[0], 0, 0, [], 0, 0.0)
+        for depth in range(1, max_depth + 1):
+            self._depth = depth
+            self._pv_table = [[] for _ in range(depth + 1)]
+            try:
+                score = self._negamax(game, depth, -WIN_SCORE - 1, WIN_SCORE + 1, 0, result.get_best_move())
+            except SearchStopped:
+                break
+
+            principal_variation = self._pv_table[0]
+            result = SearchResult(principal_variation[0], score, depth, principal_variation, self._nodes,
+                                  time.perf_counter() - start)
+            self._result = result
+            if progress is not None:
+                progress(depth, self._nodes, result)
+
+            #a forced win or loss has been found, so deeper iterations won't change the move
+            if abs(score) >= WIN_SCORE - max_depth:
+                break
+
+        return SearchResult(result.get_best_move(), result.get_score(), result.get_depth(),
+                            result.get_principal_variation(), self._nodes, time.perf_counter() - start)
+
+    def get_table(self):
+        return self._table
+
+    def _check_budget(self):
+        """
+        Raises SearchStopped if the node budget or the deadline has been reached, or the search has been told to stop
+
+        :return: None
+        """
+        if self._node_limit_value is not None and self._nodes >= self._node_limit_value:
+            raise SearchStopped()
+
+        if self._nodes >= self._next_check:
+            self._next_check = self._nodes + CHECK_INTERVAL
+            if self._deadline is not None and time.perf_counter() >= self._deadline:
+                raise SearchStopped()
+            if self._stop_event is not None and self._stop_event.is_set():
+                raise SearchStopped()
+            if self._progress is not None:
+                self._progress(self._depth, self._nodes, self._result)
+
+    def _negamax(self, game, depth, alpha, beta, ply, first_move=None):
+        """
+        Scores the position for the player to move, searching depth plies ahead. Fills in the principal variation
+        table for this ply.
+
+        :return: Score of the position for the player whose turn it is
+        """
+        self._nodes += 1
+        self._check_budget()
+
+        self._pv_table[ply] = []
+
+        #the player who just moved captured the Bike, so the player to move has lost. Quicker wins score higher
+        if game.get_game_state() != "UNFINISHED":
+            return -WIN_SCORE + ply
+
+        if ply > 0 and self._tablebase is not None:
+            value = self._tablebase.probe_value(game)
+            if value is not None:
+                return _tablebase_score(value, ply)
+
+        if depth == 0:
+            return evaluate(game)
+
+        #uses a stored result if it was searched at least as deep, and tries its best move first either way
+        key = game.get_hash()
+        entry = self._table.probe(key) if self._table is not None else None
+        if entry is not None:
+            entry_depth, entry_score, bound, entry_move = entry
+            if entry_move is not None:
+                first_move = entry_move
+
+            if ply > 0 and entry_depth >= depth:
+                entry_score = _score_from_table(entry_score, ply)
+                if bound == EXACT or (bound == LOWER_BOUND and entry_score >= beta) or \
+                        (bound == UPPER_BOUND and entry_score <= alpha):
+                    if entry_move is not None:
+                        self._pv_table[ply] = [entry_move]
+                    return entry_score
+
+        moves = game.legal_move_indexes()
+        if not moves:
+            return 0
+
+        original_alpha = alpha
+        best_score = -WIN_SCORE - 1
+        best_move = None
+        for move in order_moves(game, moves, first_move):
+            game.push(move)
+            try:
+                score = -self._negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                game.pop()
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                self._pv_table[ply] = [move] + self._pv_table[ply + 1]
+
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if self._table is not None:
+            if best_score <= original_alpha:
+                bound = UPPER_BOUND
+            elif best_score >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            self._table.store(key, depth, _score_to_table(best_score, ply), bound, best_move)
+
+        return best_score
+
+
+class BackgroundSearch:
+    """
+    Runs an engine's searches on a worker thread so the caller, such as a GUI event loop, never waits for one. Only
+    one search runs at a time, and starting a new one cancels the last. The engine searches a copy of the game, so
+    the caller's game can change while it thinks.
+    """
+
+    def __init__(self, engine):
+        """
+        :param engine: SearchEngine to run, which keeps its transposition table from one search to the next
+        """
+        self._engine = engine
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def get_engine(self):
+        return self._engine
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, game, on_done=None, progress=None, max_depth=None, time_limit=None):
+        """
+        Starts searching a copy of a position
+
+        :param game: ChessLike game to search from
+        :param on_done: Function called on the worker thread with the SearchResult, unless the search is cancelled
+        :param progress: Progress function passed to SearchEngine.search, called on the worker thread
+        :param max_depth: Overrides the engine's maximum depth for this search
+        :param time_limit: Overrides the engine's time limit for this search
+
+        :return: None
+        """
+        self.cancel()
+
+        position = game.clone()
+        position.set_silent(True)
+        stop_event = threading.Event()
+
+        def run():
+            result = self._engine.search(position, max_depth, time_limit, stop_event=stop_event, progress=progress)
+            if on_done is not None and not stop_event.is_set():
+                on_done(result)
+
+        self._stop_event = stop_event
+        self._thread = threading.Thread(target=run, name="ChessLikeSearch", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """
+        Stops the running search, if any, and waits for its thread to finish, which takes at most CHECK_INTERVAL
+        nodes. Its on_done function isn't called.
+
+        :return: None
+        """
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,322 @@
+# Description: Headless self-play for ChessLike. Plays games between computer policies across worker processes and
+# streams each finished game's moves and result to a file, either one JSON object per line or in the binary
+# ChessLikeRecords format. Doesn't import pygame.
+
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ChessLike import ChessLike, SQUARES
+from ChessLikeRecords import GameRecordWriter
+from ChessLikeSearch import PIECE_VALUES, SearchEngine
+
+#moves played before a game is stopped and recorded as UNFINISHED
+DEFAULT_MAX_PLIES = 200
+
+
+class RandomPolicy:
+    """
+    Plays a uniformly random legal move
+    """
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+
+    def choose_move(self, game):
+        """
+        :param game: ChessLike game
+
+        :return: (origin, destination) tuple of square indexes, or None if there is no legal move
+        """
+        moves = game.legal_move_indexes()
+        return self._random.choice(moves) if moves else None
+
+
+class GreedyCapturePolicy:
+    """
+    Captures the most valuable piece it can, or plays a random move if nothing can be captured
+    """
+
+    def __init__(self, seed=None):
+        self._random = random.Random(seed)
+
+    def choose_move(self, game):
+        """
+        :param game: ChessLike game
+
+        :return: (origin, destination) tuple of square indexes, or None if there is no legal move
+        """
+        moves = game.legal_move_indexes()
+        if not moves:
+            return None
+
+        best_value = 0
+        best_moves = moves
+        for move in moves:
+            victim = game.get_piece_at(move[1])
+            if victim is None:
+                continue
+
+            value = PIECE_VALUES[victim.get_name()]
+            if value > best_value:
+                best_value = value
+                best_moves = [move]
+            elif value == best_value:
+                best_moves.append(move)
+
+        return self._random.choice(best_moves)
+
+
+class SearchPolicy:
+    """
+    Plays the move chosen by the alpha-beta search engine at a fixed depth
+    """
+
+    def __init__(self, depth, time_limit=None, node_limit=None):
+        self._engine = SearchEngine(max_depth=depth, time_limit=time_limit, node_limit=node_limit, table_size_mb=4)
+
+    def choose_move(self, game):
+        """
+        :param game: ChessLike game
+
+        :return: (origin, destination) tuple of square indexes, or None if there is no legal move
+        """
+        return self._engine.search(game).get_best_move()
+
+
+class BookPolicy:
+    """
+    Plays from an opening book while the position is in it, and leaves the rest of the game to another policy
+    """
+
+    def __init__(self, policy, book):
+        """
+        :param policy: Policy to play positions the book doesn't cover
+        :param book: ChessLikeBook.OpeningBook
+        """
+        self._policy = policy
+        self._book = book
+
+    def choose_move(self, game):
+        """
+        :param game: ChessLike game
+
+        :return: (origin, destination) tuple of square indexes, or None if there is no legal move
+        """
+        move = self._book.best_move(game)
+        if move is not None:
+            return move
+
+        return self._policy.choose_move(game)
+
+
+def _positive_count(spec, argument, default):
+    """
+    Reads the depth or playout count of a policy spec, which has to be a positive whole number
+
+    :return: The count, or default if the spec doesn't give one
+    """
+    if not argument:
+        return default
+    if not argument.isdigit() or int(argument) < 1:
+        raise ValueError(f"Invalid policy {spec!r}, the number after the colon must be a positive whole number")
+
+    return int(argument)
+
+
+def make_policy(spec, seed=None, book=None):
+    """
+    Builds a policy from its command line name
+
+    :param spec: "random", "greedy", "search:<depth>" or "mcts:<playouts>"
+    :param seed: Seed for any random choices the policy makes
+    :param book: ChessLikeBook.OpeningBook the policy plays from before choosing moves itself, or None
+
+    :return: Policy object with a choose_move(game) method that returns None when there is no legal move
+    """
+    name, _, argument = spec.partition(":")
+    if name == "random":
+        policy = RandomPolicy(seed)
+    elif name == "greedy":
+        policy = GreedyCapturePolicy(seed)
+    elif name == "search":
+        policy = SearchPolicy(_positive_count(spec, argument, 3))
+    elif name == "mcts":
+        #imported here as ChessLikeMCTS uses this module for its playout policies
+        from ChessLikeMCTS import MCTSPolicy
+        policy = MCTSPolicy(_positive_count(spec, argument, 200), seed)
+    else:
+        raise ValueError(f"Unknown policy {spec!r}, expected random, greedy, search:<depth> or mcts:<playouts>")
+
+    return BookPolicy(policy, book) if book is not None else policy
+
+
+def play_game(blue, orange, max_plies=DEFAULT_MAX_PLIES):
+    """
+    Plays one silent game between two policies
+
+    :param blue: Policy for BLUE
+    :param orange: Policy for ORANGE
+    :param max_plies: Moves after which the game is stopped unfinished
+
+    :return: Tuple of (moves, result) where moves is a list of (origin, destination) square index tuples and result
+        is the final game state
+    """
+    game = ChessLike(silent=True)
+    moves = []
+    while game.get_game_state() == "UNFINISHED" and len(moves) < max_plies:
+        policy = blue if game.get_turn() == "BLUE" else orange
+        move = policy.choose_move(game)
+        if move is None:
+            break
+
+        origin, destination = move
+        game.commit_move(origin, destination)
+        game.switch_turn()
+        moves.append((origin, destination))
+
+    return moves, game.get_game_state()
+
+
+def _play_games(job):
+    """
+    Worker side of run_self_play: plays a block of games
+
+    :param job: Tuple of (first game number, number of games, blue spec, orange spec, max plies, seed, book path or
+        None)
+
+    :return: List of game record dictionaries, with moves as (origin, destination) square index tuples
+    """
+    first, count, blue_spec, orange_spec, max_plies, seed, book_path = job
+
+    #the book is mapped by each worker, an open map can't be sent to another process
+    book = None
+    if book_path is not None:
+        from ChessLikeBook import OpeningBook
+        book = OpeningBook(book_path)
+
+    records = []
+    try:
+        for number in range(first, first + count):
+            blue = make_policy(blue_spec, f"{seed}:{number}:BLUE", book)
+            orange = make_policy(orange_spec, f"{seed}:{number}:ORANGE", book)
+            moves, result = play_game(blue, orange, max_plies)
+            records.append({
+                "game": number,
+                "blue": blue_spec,
+                "orange": orange_spec,
+                "result": result,
+                "plies": len(moves),
+                "moves": moves,
+            })
+    finally:
+        if book is not None:
+            book.close()
+
+    return records
+
+
+def write_json_record(output, record):
+    """
+    Writes a game record as one line of JSON with the moves in board notation like "b1c2"
+
+    :param output: Text file object
+    :param record: Game record dictionary from _play_games
+
+    :return: None
+    """
+    record = dict(record, moves=[SQUARES[origin] + SQUARES[destination] for origin, destination in record["moves"]])
+    output.write(json.dumps(record) + "\n")
+
+
+def run_self_play(games, blue_spec, orange_spec, write_record, workers=None, max_plies=DEFAULT_MAX_PLIES, seed=0,
+                  block_size=16, book_path=None):
+    """
+    Plays games across a process pool and passes each block of records to write_record as soon as it is done, so
+    records may be out of game number order
+
+    :param games: Number of games to play
+    :param blue_spec: Policy name for BLUE
+    :param orange_spec: Policy name for ORANGE
+    :param write_record: Function called with each finished game record dictionary
+    :param workers: Number of worker processes, or None for one per CPU
+    :param max_plies: Moves after which a game is stopped unfinished
+    :param seed: Seed for the policies, each game's policies get their own seed derived from it
+    :param block_size: Games per job sent to a worker
+    :param book_path: Opening book file both policies play from while they are in it, or None
+
+    :return: Dictionary counting the results
+    """
+    #checks the policy names before starting any workers
+    make_policy(blue_spec)
+    make_policy(orange_spec)
+    if book_path is not None:
+        from ChessLikeBook import OpeningBook
+        OpeningBook(book_path).close()
+
+    jobs = [(first, min(block_size, games - first), blue_spec, orange_spec, max_plies, seed, book_path)
+            for first in range(0, games, block_size)]
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(_play_games, job) for job in jobs]):
+            for record in future.result():
+                write_record(record)
+                results[record["result"]] = results.get(record["result"], 0) + 1
+
+    return results
+
+
+def main(argv=None):
+    """
+    Command line entry point for self-play
+    """
+    parser = argparse.ArgumentParser(description="Play ChessLike games between computer policies")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--blue", default="random",
+                        help="BLUE policy: random, greedy, search:<depth> or mcts:<playouts>")
+    parser.add_argument("--orange", default="random",
+                        help="ORANGE policy: random, greedy, search:<depth> or mcts:<playouts>")
+    parser.add_argument("--output", default="-", help="file to write records to, - for stdout with --format json")
+    parser.add_argument("--format", choices=("json", "binary"), default="json",
+                        help="JSON lines, or the binary ChessLikeRecords format appended to --output")
+    parser.add_argument("--workers", type=int, default=0, help="worker processes, 0 for one per CPU")
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES, help="moves before a game is stopped")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random policies")
+    parser.add_argument("--book", default=None, help="opening book file written by ChessLikeBook to play from")
+    args = parser.parse_args(argv)
+
+    #checks the policy names before any worker starts
+    for spec in (args.blue, args.orange):
+        try:
+            make_policy(spec)
+        except ValueError as error:
+            parser.error(str(error))
+
+    if args.format == "binary":
+        if args.output == "-":
+            parser.error("--format binary needs an --output file")
+        output = GameRecordWriter(args.output)
+        write_record = lambda record: output.write_game(record["moves"], record["result"])
+    else:
+        output = sys.stdout if args.output == "-" else open(args.output, "w")
+        write_record = lambda record: write_json_record(output, record)
+
+    start = time.perf_counter()
+    try:
+        results = run_self_play(args.games, args.blue, args.orange, write_record, args.workers or None,
+                                args.max_plies, args.seed, book_path=args.book)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    seconds = time.perf_counter() - start
+    summary = ", ".join(f"{result}: {count}" for result, count in sorted(results.items()))
+    print(f"{args.games} games in {seconds:.2f}s ({args.games / seconds:,.1f} games/s) - {summary}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,572 @@
+# Description: A headless asyncio server hosting many ChessLike games at once over TCP or a Unix socket. Clients send
+# one JSON object per line and get one JSON object per line back. Moves are checked with ChessLike.make_move, every
+# player and watcher of a game is sent its new state after each move, and computer opponents think in a process pool
+# so the event loop never waits on a search.
+#
+# Requests, each with an "op":
+#   {"op": "new", "opponent": "search:3", "color": "BLUE"}   starts a game. Without an opponent the creator plays
+#                                                            both colors, like the pygame GUI. A computer opponent
+#                                                            has to be one the server allows, OPPONENTS by default.
+#                                                            With "opponent": "human" the creator plays color and
+#                                                            the other color is left open for a join
+#   {"op": "join", "game": 7}                                takes the free color of a game
+#   {"op": "watch", "game": 7}                               gets the game's updates without playing
+#   {"op": "move", "game": 7, "move": "b1b3"}                plays a move for a color this connection holds
+#   {"op": "state", "game": 7}                               asks for the game's state again
+#   {"op": "leave", "game": 7}                               stops playing or watching
+# Replies and updates, each with a "type": "created", "joined", "state" or "error". A state update holds the game
+# number, the board as {square: [color, piece]}, the turn, the game state, the last move and the legal moves.
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count
+
+from ChessLike import ChessLike, SQUARES
+
+COLORS = ("BLUE", "ORANGE")
+
+#marks a seat taken by a computer opponent
+ENGINE = "ENGINE"
+
+#opponent of a new game whose other color is left open for another connection to join
+HUMAN = "human"
+
+#computer opponents clients may ask for by default. Searches and playout counts are capped here because every engine
+#move ties up a worker process until it finishes
+OPPONENTS = ("random", "greedy", "search:1", "search:2", "search:3", "search:4", "mcts:100", "mcts:500")
+
+logger = logging.getLogger(__name__)
+
+#policies and opening books kept by each worker process between moves, so search tables and trees are reused
+_worker_policies = {}
+_worker_books = {}
+
+
+def _engine_move(data, opponent, book_path=None):
+    """
+    Worker side of the engine: picks a move for a position
+
+    :param data: Position encoded by ChessLike.to_bytes
+    :param opponent: Policy name accepted by ChessLikeSelfPlay.make_policy
+    :param book_path: Opening book file the policy plays from, or None
+
+    :return: (origin, destination) tuple of square indexes, or None if there is no legal move
+    """
+    from ChessLikeSelfPlay import make_policy
+
+    policy = _worker_policies.get((opponent, book_path))
+    if policy is None:
+        book = None
+        if book_path is not None:
+            book = _worker_books.get(book_path)
+            if book is None:
+                from ChessLikeBook import OpeningBook
+                book = _worker_books[book_path] = OpeningBook(book_path)
+        policy = _worker_policies[(opponent, book_path)] = make_policy(opponent, os.getpid(), book)
+
+    return policy.choose_move(ChessLike.from_bytes(data, silent=True))
+
+
+class GameSession:
+    """
+    One hosted game: the ChessLike game itself, who holds each color, and every connection following it
+    """
+
+    def __init__(self, number, opponent=None):
+        self._number = number
+        self._game = ChessLike(silent=True)
+        self._opponent = opponent
+        self._seats = {color: None for color in COLORS}
+        self._followers = set()
+        self._last_move = None
+
+    def get_number(self):
+        return self._number
+
+    def get_game(self):
+        return self._game
+
+    def get_opponent(self):
+        return self._opponent
+
+    def get_seats(self):
+        return self._seats
+
+    def get_followers(self):
+        return self._followers
+
+    def get_last_move(self):
+        return self._last_move
+
+    def set_last_move(self, move):
+        self._last_move = move
+
+    def state_message(self):
+        """
+        :return: Dictionary of the game's state, sent to every follower after each move
+        """
+        board = {}
+        for square, piece in self._game.get_board_view().items():
+            if piece is not None:
+                board[square] = [piece.get_color(), piece.get_name()]
+
+        return {
+            "type": "state",
+            "game": self._number,
+            "board": board,
+            "turn": self._game.get_turn(),
+            "game_state": self._game.get_game_state(),
+            "last_move": self._last_move,
+            "moves": [origin + destination for origin, destination in self._game.legal_moves()],
+        }
+
+
+class GameServer:
+    """
+    Hosts games for any number of connections. Each game lives as long as at least one connection follows it.
+    """
+
+    def __init__(self, engine_workers=None, opponents=OPPONENTS, book_path=None):
+        """
+        :param engine_workers: Worker processes for computer opponents, or None for one per CPU
+        :param opponents: Policy names accepted by ChessLikeSelfPlay.make_policy that clients may play against
+        :param book_path: Opening book file computer opponents play from while they are in it, or None
+        """
+        self._sessions = {}
+        self._numbers = count(1)
+        self._engine_workers = engine_workers
+        self._opponents = tuple(opponents)
+        self._book_path = book_path
+        self._pool = None
+        self._servers = []
+        self._unix_paths = []
+        self._connections = set()
+        self._handlers = {
+            "new": self._new,
+            "join": self._join,
+            "watch": self._watch,
+            "move": self._move,
+            "state": self._state,
+            "leave": self._leave,
+        }
+
+    def get_session_count(self):
+        return len(self._sessions)
+
+    async def start_tcp(self, host="127.0.0.1", port=0):
+        """
+        Starts listening on a TCP port
+
+        :param host: Address to listen on
+        :param port: Port to listen on, 0 for any free port
+
+        :return: The port being listened on
+        """
+        server = await asyncio.start_server(self._serve_connection, host, port)
+        self._servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    async def start_unix(self, path):
+        """
+        Starts listening on a Unix socket
+
+        :param path: Path of the socket file
+
+        :return: None
+        """
+        self._servers.append(await asyncio.start_unix_server(self._serve_connection, path))
+        self._unix_paths.append(path)
+
+    async def serve_forever(self):
+        await asyncio.gather(*(server.serve_forever() for server in self._servers))
+
+    async def close(self):
+        """
+        Stops listening, closes every connection and shuts down the engine processes
+
+        :return: None
+        """
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+
+        for path in self._unix_paths:
+            if os.path.exists(path):
+                os.unlink(path)
+        self._unix_paths = []
+
+        for task in self._connections:
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    async def _serve_connection(self, reader, writer):
+        """
+        Reads requests from one connection until it closes
+
+        :return: None
+        """
+        followed = set()
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    request = json.loads(line)
+                    handler = self._handlers[request["op"]]
+                except (ValueError, KeyError, TypeError):
+                    self._send(writer, {"type": "error", "message": "Expected a JSON object with a known op"})
+                else:
+                    try:
+                        handler(writer, followed, request)
+                    except KeyError as error:
+                        self._send(writer, {"type": "error", "op": request["op"],
+                                            "message": f"Missing field {error.args[0]!r}"})
+                    except (TypeError, ValueError) as error:
+                        self._send(writer, {"type": "error", "op": request["op"], "message": str(error)})
+
+                #stops reading while the client is slow to take its replies
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            #a cancelled connection is the server closing, which ends the handler like a disconnect
+            pass
+        finally:
+            for number in list(followed):
+                self._drop(writer, followed, number)
+            writer.close()
+            self._connections.discard(task)
+
+    def _send(self, writer, message):
+        if not writer.is_closing():
+            writer.write(json.dumps(message).encode() + b"\n")
+
+    def _broadcast(self, session, message=None):
+        """
+        Sends a message to every connection following a game
+
+        :param session: GameSession
+        :param message: Message dictionary, or None for the game's state
+
+        :return: None
+        """
+        message = json.dumps(message if message is not None else session.state_message()).encode() + b"\n"
+        for writer in session.get_followers():
+            if not writer.is_closing():
+                writer.write(message)
+
+    def _session(self, request):
+        number = request["game"]
+        session = self._sessions.get(number)
+        if session is None:
+            raise ValueError(f"No game {number}")
+
+        return session
+
+    def _new(self, writer, followed, request):
+        opponent = request.get("opponent")
+        color = request.get("color", "BLUE")
+        if color not in COLORS:
+            raise ValueError(f"color must be BLUE or ORANGE, not {color!r}")
+        if opponent is not None and opponent != HUMAN and \
+                (not isinstance(opponent, str) or opponent not in self._opponents):
+            raise ValueError(f"opponent must be {HUMAN} or one of {', '.join(self._opponents)}, not {opponent!r}")
+
+        session = GameSession(next(self._numbers), opponent)
+        self._sessions[session.get_number()] = session
+        seats = session.get_seats()
+        for seat in COLORS:
+            if opponent is None or seat == color:
+                seats[seat] = writer
+            else:
+                seats[seat] = None if opponent == HUMAN else ENGINE
+        session.get_followers().add(writer)
+        followed.add(session.get_number())
+
+        held = list(COLORS) if opponent is None else [color]
+        self._send(writer, {"type": "created", "game": session.get_number(), "colors": held})
+        self._send(writer, session.state_message())
+        self._engine_turn(session)
+
+    def _join(self, writer, followed, request):
+        session = self._session(request)
+        seats = session.get_seats()
+        free = [color for color in COLORS if seats[color] is None]
+        if not free:
+            raise ValueError(f"Game {session.get_number()} has no free color")
+
+        seats[free[0]] = writer
+        session.get_followers().add(writer)
+        followed.add(session.get_number())
+        self._send(writer, {"type": "joined", "game": session.get_number(), "colors": [free[0]]})
+        self._send(writer, session.state_message())
+
+    def _watch(self, writer, followed, request):
+        session = self._session(request)
+        session.get_followers().add(writer)
+        followed.add(session.get_number())
+        self._send(writer, {"type": "joined", "game": session.get_number(), "colors": []})
+        self._send(writer, session.state_message())
+
+    def _move(self, writer, followed, request):
+        session = self._session(request)
+        game = session.get_game()
+        move = request["move"]
+        if session.get_seats()[game.get_turn()] is not writer:
+            raise ValueError(f"It is not your turn in game {session.get_number()}")
+        if not isinstance(move, str) or len(move) != 4 or not game.make_move(move[:2], move[2:]):
+            raise ValueError(f"Illegal move {move!r}")
+
+        session.set_last_move(move.lower())
+        self._broadcast(session)
+        self._engine_turn(session)
+
+    def _state(self, writer, followed, request):
+        self._send(writer, self._session(request).state_message())
+
+    def _leave(self, writer, followed, request):
+        self._drop(writer, followed, self._session(request).get_number())
+
+    def _drop(self, writer, followed, number):
+        """
+        Removes a connection from a game, freeing its colors, and ends the game once nobody follows it
+
+        :return: None
+        """
+        followed.discard(number)
+        session = self._sessions.get(number)
+        if session is None:
+            return
+
+        session.get_followers().discard(writer)
+        seats = session.get_seats()
+        for color in COLORS:
+            if seats[color] is writer:
+                seats[color] = None
+
+        if not session.get_followers():
+            del self._sessions[number]
+
+    def _engine_turn(self, session):
+        """
+        Starts the computer opponent thinking if it is its turn
+
+        :return: None
+        """
+        game = session.get_game()
+        if game.get_game_state() != "UNFINISHED" or session.get_seats()[game.get_turn()] != ENGINE:
+            return
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self._engine_workers)
+
+        position_hash = game.get_hash()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, _engine_move, game.to_bytes(), session.get_opponent(),
+                                      self._book_path)
+        future.add_done_callback(lambda done: self._engine_done(session, position_hash, done))
+
+    def _engine_done(self, session, position_hash, done):
+        """
+        Plays the computer opponent's move once it has been found, unless the game has gone away in the meantime.
+        If the worker failed, the game's followers are told, since the move they are waiting for will never come.
+
+        :return: None
+        """
+        if done.cancelled():
+            return
+
+        error = done.exception()
+        if error is not None:
+            logger.error("Engine move failed in game %d", session.get_number(), exc_info=error)
+            if self._sessions.get(session.get_number()) is session:
+                self._broadcast(session, {"type": "error", "game": session.get_number(),
+                                          "message": f"The computer opponent failed: {error}"})
+            return
+
+        game = session.get_game()
+        if self._sessions.get(session.get_number()) is not session or game.get_hash() != position_hash:
+            return
+
+        move = done.result()
+        if move is None:
+            #the engine found no move, so the game can't go on
+            self._broadcast(session, {"type": "error", "game": session.get_number(),
+                                      "message": "The computer opponent has no move to play"})
+            return
+
+        origin, destination = move
+        if game.make_move_index(origin, destination):
+            session.set_last_move(SQUARES[origin] + SQUARES[destination])
+            self._broadcast(session)
+            self._engine_turn(session)
+
+
+class GameClient:
+    """
+    A small client for the server, used by the loopback benchmark and handy for scripting games
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def connect_tcp(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    @classmethod
+    async def connect_unix(cls, path):
+        return cls(*await asyncio.open_unix_connection(path))
+
+    async def send(self, **request):
+        self._writer.write(json.dumps(request).encode() + b"\n")
+        await self._writer.drain()
+
+    async def receive(self):
+        """
+        :return: The next message from the server, or None once the connection is closed
+        """
+        line = await self._reader.readline()
+        return json.loads(line) if line else None
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def _bench_game(client, opponent, seed, latencies):
+    """
+    Plays one game with random moves through a client, timing each move until the server's state update comes back
+
+    :return: Final game state
+    """
+    rng = random.Random(seed)
+    await client.send(op="new", opponent=opponent)
+    created = await client.receive()
+    colors = created["colors"]
+    state = await client.receive()
+    while state["game_state"] == "UNFINISHED" and state["moves"]:
+        if state["turn"] not in colors:
+            state = await client.receive()
+            continue
+
+        start = time.perf_counter()
+        await client.send(op="move", game=created["game"], move=rng.choice(state["moves"]))
+        state = await client.receive()
+        latencies.append(time.perf_counter() - start)
+
+    await client.send(op="leave", game=created["game"])
+    return state["game_state"]
+
+
+async def _bench(games, opponent, engine_workers, unix_path, opponents=OPPONENTS, book_path=None):
+    """
+    Starts a server and plays games against it over loopback connections, all at once
+
+    :return: Tuple of (moves played, seconds, sorted move latencies in seconds)
+    """
+    server = GameServer(engine_workers, opponents, book_path)
+    if unix_path:
+        await server.start_unix(unix_path)
+        connect = lambda: GameClient.connect_unix(unix_path)
+    else:
+        port = await server.start_tcp()
+        connect = lambda: GameClient.connect_tcp("127.0.0.1", port)
+
+    clients = [await connect() for _ in range(games)]
+    latencies = []
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(_bench_game(client, opponent, seed, latencies) for seed, client in enumerate(clients)))
+    finally:
+        seconds = time.perf_counter() - start
+        for client in clients:
+            await client.close()
+        await server.close()
+
+    return len(latencies), seconds, sorted(latencies)
+
+
+def main(argv=None):
+    """
+    Command line entry point. Serves games, or with --bench plays games against a local server and reports latency
+    """
+    parser = argparse.ArgumentParser(description="Host ChessLike games over TCP or a Unix socket")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=7777, help="TCP port to listen on")
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--engine-workers", type=int, default=0,
+                        help="processes for computer opponents, 0 for one per CPU")
+    parser.add_argument("--bench", type=int, default=0, metavar="GAMES",
+                        help="play this many concurrent games over loopback and report move latency")
+    parser.add_argument("--opponent", default=None, help="computer opponent for --bench games, like random or search:2")
+    parser.add_argument("--opponents", default=",".join(OPPONENTS),
+                        help="comma separated computer opponents clients may play against")
+    parser.add_argument("--book", default=None, help="opening book file written by ChessLikeBook for the opponents")
+    args = parser.parse_args(argv)
+
+    opponents = [name for name in args.opponents.split(",") if name]
+    from ChessLikeSelfPlay import make_policy
+    for name in opponents:
+        try:
+            make_policy(name)
+        except ValueError as error:
+            parser.error(str(error))
+    if args.book is not None:
+        from ChessLikeBook import OpeningBook
+        try:
+            OpeningBook(args.book).close()
+        except (OSError, ValueError) as error:
+            parser.error(str(error))
+    if args.opponent is not None and args.opponent not in opponents:
+        parser.error(f"--opponent must be one of --opponents: {', '.join(opponents)}")
+
+    if args.bench:
+        moves, seconds, latencies = asyncio.run(_bench(args.bench, args.opponent, args.engine_workers or None,
+                                                       args.unix, opponents, args.book))
+        if not moves:
+            print("no moves were played")
+            return 1
+        print(f"{args.bench} games, {moves} moves in {seconds:.2f}s ({moves / seconds:,.0f} moves/s), latency "
+              f"median {latencies[len(latencies) // 2] * 1000:.2f}ms, "
+              f"99th percentile {latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms")
+        return 0
+
+    async def serve():
+        server = GameServer(args.engine_workers or None, opponents, args.book)
+        if args.unix:
+            await server.start_unix(args.unix)
+            print(f"listening on {args.unix}", file=sys.stderr)
+        else:
+            port = await server.start_tcp(args.host, args.port)
+            print(f"listening on {args.host}:{port}", file=sys.stderr)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
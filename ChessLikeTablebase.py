@@ -0,0 +1,621 @@
+# Description: Endgame tablebases for ChessLike. Every position of an ending with both Bikes and a few other pieces is
+# solved exactly by retrograde analysis, working backwards from Bike captures, and stored as one byte per position in
+# a file that probes read through mmap.
+#
+# Endings are named by their material, BLUE pieces then ORANGE pieces with "v" between them, using B for Bike, C for
+# Car, T for Train and H for Helicopter, for example "BCvB". Each table file, <name>.clt, holds the 8-byte header
+# TABLE_MAGIC and then one byte per position index. A position index is the square of every piece in the ending's
+# order, as base-49 digits, times 2, plus 1 if ORANGE is to move. Byte values:
+#   0         a draw: neither side can force a Bike capture, or the player to move has no legal move
+#   odd d     the player to move captures the Bike on their move d plies from now
+#   even d    the player to move loses, the Bike being captured d plies from now
+#   255       not a position, two pieces on one square
+# Wins end on the winner's move and losses on the opponent's, which is why the parity of the distance is the result.
+
+import argparse
+import mmap
+import os
+import sys
+import time
+from itertools import combinations_with_replacement
+
+from ChessLike import BOARD_WIDTH, Bike, Car, Helicopter, Train
+
+TABLE_MAGIC = b"CLTBASE1"
+HEADER_SIZE = 8
+TABLE_SUFFIX = ".clt"
+
+SQUARE_COUNT = BOARD_WIDTH * BOARD_WIDTH
+
+DRAW = 0
+ILLEGAL = 255
+MAX_DISTANCE = 254
+
+COLORS = ("BLUE", "ORANGE")
+
+#letters in the order pieces of one color appear in an ending's name and position index
+PIECE_LETTERS = {"B": Bike, "C": Car, "T": Train, "H": Helicopter}
+LETTER_ORDER = "BCTH"
+NAME_LETTERS = {piece_class.__name__: letter for letter, piece_class in PIECE_LETTERS.items()}
+
+
+def ending_name(pieces):
+    """
+    Returns the name of the ending a set of pieces belongs to
+
+    :param pieces: Iterable of Piece objects
+
+    :return: Name like "BCvB"
+    """
+    letters = {color: [] for color in COLORS}
+    for piece in pieces:
+        letters[piece.get_color()].append(NAME_LETTERS[piece.get_name()])
+
+    return "v".join("".join(sorted(letters[color], key=LETTER_ORDER.index)) for color in COLORS)
+
+
+def parse_ending(name):
+    """
+    Turns an ending name into its pieces in index order
+
+    :param name: Name like "BCvB", with exactly one Bike per side
+
+    :return: Tuple of Piece objects, BLUE's then ORANGE's, each side in LETTER_ORDER
+    """
+    sides = name.split("v")
+    if len(sides) != 2 or any(side.count("B") != 1 for side in sides) or \
+            any(letter not in PIECE_LETTERS for side in sides for letter in side):
+        raise ValueError(f"Invalid ending {name!r}, expected something like BCvB with one Bike per side")
+
+    return tuple(PIECE_LETTERS[letter](color) for side, color in zip(sides, COLORS)
+                 for letter in sorted(side, key=LETTER_ORDER.index))
+
+
+def endings(extra_pieces):
+    """
+    Lists every ending with both Bikes and up to a number of other pieces, smallest first, which is the order they
+    have to be generated in
+
+    :param extra_pieces: Most pieces besides the Bikes
+
+    :return: List of ending names
+    """
+    names = []
+    for count in range(extra_pieces + 1):
+        for letters in combinations_with_replacement([(color, letter) for color in COLORS for letter in "CTH"], count):
+            sides = {color: "B" + "".join(letter for piece_color, letter in letters if piece_color == color)
+                     for color in COLORS}
+            names.append(f"{sides['BLUE']}v{sides['ORANGE']}")
+
+    return names
+
+
+def table_path(directory, name):
+    return os.path.join(directory, name + TABLE_SUFFIX)
+
+
+def _decode_index(index, count):
+    """
+    Splits a position index into piece squares and the player to move
+
+    :return: Tuple of (list of squares in the ending's order, 0 for BLUE or 1 for ORANGE to move)
+    """
+    turn = index & 1
+    index >>= 1
+    squares = [0] * count
+    for number in range(count - 1, -1, -1):
+        index, squares[number] = divmod(index, SQUARE_COUNT)
+
+    return squares, turn
+
+
+def _encode_index(squares, turn):
+    index = 0
+    for square in squares:
+        index = index * SQUARE_COUNT + square
+
+    return index * 2 + turn
+
+
+class _Generator:
+    """
+    Solves one ending. Tables of the endings reached by capturing a piece other than a Bike must already be solved.
+    """
+
+    def __init__(self, name, subtables):
+        """
+        :param name: Ending name
+        :param subtables: Dictionary of ending name to the solved table bytes of every smaller ending
+        """
+        self._pieces = parse_ending(name)
+        self._count = len(self._pieces)
+        self._size = 2 * SQUARE_COUNT ** self._count
+        self._subtables = subtables
+
+        self._values = bytearray(self._size)
+        self._solved = bytearray(self._size)
+        #successors inside this ending whose value isn't known yet, only counted down by successors that are wins
+        self._remaining = [0] * self._size
+        #longest win found for the opponent among the successors, for positions that turn out to be lost
+        self._longest = bytearray(self._size)
+        #set for positions with a capture into a smaller ending that wins, which can never be lost whatever their
+        #moves inside this ending turn out to be worth
+        self._capture_wins = bytearray(self._size)
+        self._buckets = [[] for _ in range(MAX_DISTANCE + 2)]
+
+    def solve(self):
+        """
+        :return: The table as a bytearray indexed by position index
+        """
+        for index in range(self._size):
+            self._initialize(index)
+
+        for distance in range(1, MAX_DISTANCE + 1):
+            for index in self._buckets[distance]:
+                if not self._solved[index]:
+                    self._solved[index] = 1
+                    self._values[index] = distance
+                    self._propagate(index, distance)
+
+        if any(self._buckets[MAX_DISTANCE + 1]):
+            raise ValueError(f"A distance in the ending is longer than {MAX_DISTANCE} plies")
+
+        return self._values
+
+    def _board(self, squares):
+        """
+        :return: 49 element list holding the number of the piece on each square, or None
+        """
+        board = [None] * SQUARE_COUNT
+        for number, square in enumerate(squares):
+            board[square] = number
+
+        return board
+
+    def _push(self, index, distance):
+        self._buckets[min(distance, MAX_DISTANCE + 1)].append(index)
+
+    def _initialize(self, index):
+        """
+        Looks at every move from a position. Bike captures and captures into smaller endings are resolved on the
+        spot, moves that stay in this ending are counted for the backward pass.
+
+        :param index: Position index
+
+        :return: None
+        """
+        squares, turn = _decode_index(index, self._count)
+        if len(set(squares)) != self._count:
+            self._values[index] = ILLEGAL
+            self._solved[index] = 1
+            return
+
+        board = self._board(squares)
+        color = COLORS[turn]
+        best_win = None
+        longest = 0
+        remaining = 0
+        for number, piece in enumerate(self._pieces):
+            if piece.get_color() != color:
+                continue
+
+            origin = squares[number]
+            for ray in piece.get_rays(origin):
+                for destination in ray:
+                    target = board[destination]
+                    if target is None:
+                        remaining += 1
+                        continue
+
+                    victim = self._pieces[target]
+                    if victim.get_color() != color:
+                        if isinstance(victim, Bike):
+                            best_win = 1
+                        else:
+                            value = self._capture_value(squares, number, destination, target, turn)
+                            if value == DRAW:
+                                #a drawn reply means this position can never be lost, so the count never reaches 0
+                                remaining += 1
+                            elif value & 1:
+                                longest = max(longest, value)
+                            elif best_win is None or value + 1 < best_win:
+                                best_win = value + 1
+                    break
+
+        self._remaining[index] = remaining
+        self._longest[index] = min(longest, MAX_DISTANCE)
+        if best_win is not None:
+            self._capture_wins[index] = 1
+            self._push(index, best_win)
+        elif remaining == 0 and longest:
+            self._push(index, longest + 1)
+        elif remaining == 0:
+            #no legal moves at all
+            self._solved[index] = 1
+
+    def minimax_value(self, index, values):
+        """
+        Works out a position's value from the table values of the positions its moves lead to, which is what its own
+        table value has to be
+
+        :param index: Position index
+        :param values: Solved table of this ending
+
+        :return: Table value
+        """
+        squares, turn = _decode_index(index, self._count)
+        if len(set(squares)) != self._count:
+            return ILLEGAL
+
+        board = self._board(squares)
+        color = COLORS[turn]
+        best_win = None
+        longest = 0
+        drawn = False
+        for number, piece in enumerate(self._pieces):
+            if piece.get_color() != color:
+                continue
+
+            origin = squares[number]
+            for ray in piece.get_rays(origin):
+                for destination in ray:
+                    target = board[destination]
+                    if target is None:
+                        squares[number] = destination
+                        value = values[_encode_index(squares, turn ^ 1)]
+                        squares[number] = origin
+                    elif self._pieces[target].get_color() == color:
+                        break
+                    elif isinstance(self._pieces[target], Bike):
+                        best_win = 1
+                        break
+                    else:
+                        value = self._capture_value(squares, number, destination, target, turn)
+
+                    #values are the opponent's, so their loss in d is a win in d + 1 and their win a loss
+                    if value == DRAW:
+                        drawn = True
+                    elif value & 1:
+                        longest = max(longest, value)
+                    elif best_win is None or value + 1 < best_win:
+                        best_win = value + 1
+
+                    if target is not None:
+                        break
+
+        if best_win is not None:
+            return min(best_win, MAX_DISTANCE)
+        if drawn or not longest:
+            return DRAW
+
+        return min(longest + 1, MAX_DISTANCE)
+
+    def _capture_value(self, squares, mover, destination, victim, turn):
+        """
+        Looks up the position after a capture in the smaller ending's table
+
+        :return: Table value for the opponent, who is to move after the capture
+        """
+        pieces = []
+        after = []
+        for number, piece in enumerate(self._pieces):
+            if number == victim:
+                continue
+            pieces.append(piece)
+            after.append(destination if number == mover else squares[number])
+
+        return self._subtables[ending_name(pieces)][_encode_index(after, turn ^ 1)]
+
+    def _propagate(self, index, distance):
+        """
+        Passes a solved position's value back to every position that reaches it with a move inside this ending
+
+        :param index: Solved position index
+        :param distance: Its table value
+
+        :return: None
+        """
+        squares, turn = _decode_index(index, self._count)
+        board = self._board(squares)
+
+        #the player who isn't to move made the last move
+        previous_turn = turn ^ 1
+        color = COLORS[previous_turn]
+        for number, piece in enumerate(self._pieces):
+            if piece.get_color() != color:
+                continue
+
+            #moves are symmetric, so the squares the piece could have come from are the empty squares it could go to
+            destination = squares[number]
+            for ray in piece.get_rays(destination):
+                for origin in ray:
+                    if board[origin] is not None:
+                        break
+
+                    squares[number] = origin
+                    previous = _encode_index(squares, previous_turn)
+                    squares[number] = destination
+                    if self._solved[previous]:
+                        continue
+
+                    if distance & 1:
+                        if distance > self._longest[previous]:
+                            self._longest[previous] = distance
+                        self._remaining[previous] -= 1
+                        if self._remaining[previous] == 0 and not self._capture_wins[previous]:
+                            self._push(previous, self._longest[previous] + 1)
+                    else:
+                        self._push(previous, distance + 1)
+
+
+def _read_table(directory, name):
+    """
+    :return: Table values of an ending as bytes, without the header
+    """
+    with open(table_path(directory, name), "rb") as table_file:
+        data = table_file.read()
+    if data[:HEADER_SIZE] != TABLE_MAGIC:
+        raise ValueError(f"{table_path(directory, name)} is not a ChessLike tablebase file")
+
+    return data[HEADER_SIZE:]
+
+
+def generate_table(name, directory):
+    """
+    Solves one ending and writes its table file. The tables of the smaller endings it leads to must already be in the
+    directory.
+
+    :param name: Ending name like "BCvB"
+    :param directory: Directory holding the table files
+
+    :return: Path of the table written
+    """
+    subtables = {}
+    pieces = parse_ending(name)
+    for number, piece in enumerate(pieces):
+        if not isinstance(piece, Bike):
+            smaller = ending_name(pieces[:number] + pieces[number + 1:])
+            subtables[smaller] = _read_table(directory, smaller)
+
+    values = _Generator(name, subtables).solve()
+
+    #written under a temporary name first, so a half-written table is never probed
+    path = table_path(directory, name)
+    with open(path + ".tmp", "wb") as table_file:
+        table_file.write(TABLE_MAGIC)
+        table_file.write(values)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def generate_tablebases(directory, extra_pieces=1, progress=None):
+    """
+    Solves every ending with both Bikes and up to a number of other pieces, skipping endings whose table already
+    exists. One extra piece takes seconds per ending; two extra pieces means 49^4 * 2 positions per ending and takes
+    a long time in pure Python.
+
+    :param directory: Directory to write the tables to, made if missing
+    :param extra_pieces: Most pieces besides the Bikes
+    :param progress: Function called with (ending name, seconds) after each table, or None
+
+    :return: List of the endings now in the directory
+    """
+    os.makedirs(directory, exist_ok=True)
+    names = endings(extra_pieces)
+    for name in names:
+        if os.path.exists(table_path(directory, name)):
+            continue
+
+        start = time.perf_counter()
+        generate_table(name, directory)
+        if progress is not None:
+            progress(name, time.perf_counter() - start)
+
+    return names
+
+
+def verify_table(name, directory):
+    """
+    Checks every entry of a table against the minimax of the positions its moves lead to, which catches a generator
+    that stored a position's value before all of its moves were accounted for. Takes about as long as generating the
+    table.
+
+    :param name: Ending name like "BCvBC"
+    :param directory: Directory holding the table and the tables of the smaller endings it leads to
+
+    :return: List of the position indexes whose stored value disagrees, empty if the table is consistent
+    """
+    pieces = parse_ending(name)
+    subtables = {}
+    for number, piece in enumerate(pieces):
+        if not isinstance(piece, Bike):
+            smaller = ending_name(pieces[:number] + pieces[number + 1:])
+            subtables[smaller] = _read_table(directory, smaller)
+
+    values = _read_table(directory, name)
+    generator = _Generator(name, subtables)
+    return [index for index in range(len(values)) if generator.minimax_value(index, values) != values[index]]
+
+
+class Tablebase:
+    """
+    Probes the tables in a directory. Each table is mapped into memory the first time a position from its ending is
+    probed, and stays mapped until close.
+    """
+
+    def __init__(self, directory):
+        """
+        :param directory: Directory holding the table files
+        """
+        self._directory = directory
+        self._tables = {}
+        self._files = []
+
+        #the largest ending present decides which positions are worth looking up
+        self._max_pieces = 0
+        for file_name in os.listdir(directory):
+            if file_name.endswith(TABLE_SUFFIX):
+                try:
+                    pieces = parse_ending(file_name[:-len(TABLE_SUFFIX)])
+                except ValueError:
+                    continue
+                self._max_pieces = max(self._max_pieces, len(pieces))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_max_pieces(self):
+        return self._max_pieces
+
+    def _table(self, name):
+        """
+        :return: mmap of the ending's table, or None if it hasn't been generated
+        """
+        if name not in self._tables:
+            path = table_path(self._directory, name)
+            table = None
+            if os.path.exists(path):
+                table_file = open(path, "rb")
+                table = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self._files.append(table_file)
+                if table[:HEADER_SIZE] != TABLE_MAGIC:
+                    raise ValueError(f"{path} is not a ChessLike tablebase file")
+            self._tables[name] = table
+
+        return self._tables[name]
+
+    def probe_value(self, game):
+        """
+        Looks up the raw table value of a position
+
+        :param game: ChessLike game
+
+        :return: Table value, see the top of this module, or None if the position isn't in any table
+        """
+        if game.get_game_state() != "UNFINISHED":
+            return None
+
+        pieces = []
+        for square in range(SQUARE_COUNT):
+            piece = game.get_piece_at(square)
+            if piece is not None:
+                pieces.append((piece, square))
+                if len(pieces) > self._max_pieces:
+                    return None
+
+        name = ending_name(piece for piece, _ in pieces)
+        table = self._table(name)
+        if table is None:
+            return None
+
+        #puts the squares in the ending's order, pieces of one type keep the order they were found in
+        pieces.sort(key=lambda entry: (COLORS.index(entry[0].get_color()),
+                                       LETTER_ORDER.index(NAME_LETTERS[entry[0].get_name()])))
+        index = _encode_index([square for _, square in pieces], COLORS.index(game.get_turn()))
+        return table[HEADER_SIZE + index]
+
+    def probe(self, game):
+        """
+        Looks up the exact result of a position for the player to move
+
+        :param game: ChessLike game
+
+        :return: Tuple of ("WIN", "LOSS" or "DRAW", plies until the Bike is captured, 0 for a draw), or None if the
+            position isn't in any table
+        """
+        value = self.probe_value(game)
+        if value is None:
+            return None
+        if value == DRAW:
+            return "DRAW", 0
+
+        return ("WIN" if value & 1 else "LOSS"), value
+
+    def best_move(self, game):
+        """
+        Picks the move that wins fastest, or draws, or loses slowest
+
+        :param game: ChessLike game in a tablebase ending
+
+        :return: Tuple of (move, result, distance) for the player to move, or None if the position isn't in any table
+        """
+        result = self.probe(game)
+        if result is None:
+            return None
+
+        best = None
+        for move in game.legal_move_indexes():
+            game.push(move)
+            try:
+                if game.get_game_state() != "UNFINISHED":
+                    rank = (0, 1)
+                else:
+                    reply = self.probe_value(game)
+                    if reply is None:
+                        continue
+                    #the opponent's loss in d is our win in d + 1, their win is our loss
+                    if reply == DRAW:
+                        rank = (1, 0)
+                    elif reply & 1:
+                        rank = (2, -reply)
+                    else:
+                        rank = (0, reply + 1)
+            finally:
+                game.pop()
+
+            if best is None or rank < best[0]:
+                best = rank, move
+
+        if best is None:
+            return None
+
+        return best[1], result[0], result[1]
+
+    def close(self):
+        """
+        Unmaps every table and closes the files
+
+        :return: None
+        """
+        for table in self._tables.values():
+            if table is not None:
+                table.close()
+        for table_file in self._files:
+            table_file.close()
+        self._tables = {}
+        self._files = []
+
+
+def main(argv=None):
+    """
+    Command line entry point. Generates the tables into a directory
+    """
+    parser = argparse.ArgumentParser(description="Generate ChessLike endgame tablebases")
+    parser.add_argument("directory", help="directory to write the table files to")
+    parser.add_argument("--pieces", type=int, default=1, help="most pieces besides the two Bikes")
+    parser.add_argument("--verify", action="store_true",
+                        help="check every table entry against the minimax of its moves after generating")
+    args = parser.parse_args(argv)
+
+    names = generate_tablebases(args.directory, args.pieces,
+                                lambda name, seconds: print(f"{name}: {seconds:.1f}s", file=sys.stderr))
+    print(f"{len(names)} endings in {args.directory}")
+
+    failed = False
+    if args.verify:
+        for name in names:
+            wrong = verify_table(name, args.directory)
+            if wrong:
+                failed = True
+                print(f"{name}: {len(wrong)} entries disagree with their moves, first at index {wrong[0]}")
+            else:
+                print(f"{name}: ok")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# Description: Exports ChessLike positions as fixed-shape NumPy arrays for training models. Each position becomes 9
+# feature planes of 7x7 (one per piece type and color, plus the side to move) and a 49x49 legal move mask. Positions
+# are converted a chunk at a time straight from their ChessLike.to_bytes encoding, and written as .npz chunk files or
+# into memory-mapped .npy files. Needs numpy.
+
+import argparse
+import sys
+from itertools import islice
+
+import numpy as np
+
+from ChessLike import BOARD_WIDTH, CODE_PIECES, ENCODED_SIZE
+from ChessLikeBatch import ChessLikeBatch, SQUARE_COUNT
+from ChessLikeRecords import GameRecordReader
+
+#planes 0-7 follow PIECE_CODES (BLUE Helicopter, Train, Car, Bike, then ORANGE), plane 8 is all ones when ORANGE is
+#to move
+PIECE_PLANES = len(CODE_PIECES)
+TURN_PLANE = PIECE_PLANES
+PLANE_COUNT = PIECE_PLANES + 1
+
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def decode_positions(encoded):
+    """
+    Unpacks a stack of ChessLike.to_bytes encodings
+
+    :param encoded: (N, ENCODED_SIZE) uint8 array
+
+    :return: Tuple of (codes, turns, states): (N, 49) uint8 PIECE_CODES per square, (N,) 0 for BLUE or 1 for ORANGE to
+        move, and (N,) GAME_STATES indexes
+    """
+    squares = encoded[:, :ENCODED_SIZE - 1]
+    codes = np.empty((len(encoded), squares.shape[1] * 2), dtype=np.uint8)
+    codes[:, 0::2] = squares & 0xF
+    codes[:, 1::2] = squares >> 4
+
+    flags = encoded[:, ENCODED_SIZE - 1]
+    return codes[:, :SQUARE_COUNT], flags & 1, flags >> 1
+
+
+def encode_chunk(encoded):
+    """
+    Builds the feature planes and legal move masks for a chunk of positions
+
+    :param encoded: (N, ENCODED_SIZE) uint8 array of ChessLike.to_bytes encodings
+
+    :return: Tuple of (planes, legal): (N, 9, 7, 7) uint8 feature planes and (N, 49, 49) bool legal move masks indexed
+        [position, origin, destination]
+    """
+    codes, turns, states = decode_positions(encoded)
+    count = len(encoded)
+
+    planes = np.zeros((count, PLANE_COUNT, BOARD_WIDTH, BOARD_WIDTH), dtype=np.uint8)
+    squares = codes.reshape(count, BOARD_WIDTH, BOARD_WIDTH)
+    for plane in range(PIECE_PLANES):
+        planes[:, plane] = squares == plane + 1
+    planes[:, TURN_PLANE] = turns[:, None, None]
+
+    #ORANGE codes come after the 4 BLUE codes, the batch simulator stores them as the negative BLUE code
+    types = PIECE_PLANES // 2
+    signed = np.where(codes > types, -(codes.astype(np.int8) - types), codes.astype(np.int8))
+    batch = ChessLikeBatch.from_arrays(signed.reshape(count, BOARD_WIDTH, BOARD_WIDTH), turns, states)
+    return planes, np.ascontiguousarray(batch.legal_move_mask())
+
+
+def iter_chunks(positions, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Groups positions into encoded chunks
+
+    :param positions: Iterable of ChessLike games
+    :param chunk_size: Positions per chunk
+
+    :return: Generator of (N, ENCODED_SIZE) uint8 arrays
+    """
+    positions = iter(positions)
+    while True:
+        chunk = [game.to_bytes() for game in islice(positions, chunk_size)]
+        if not chunk:
+            return
+
+        yield np.frombuffer(b"".join(chunk), dtype=np.uint8).reshape(len(chunk), ENCODED_SIZE)
+
+
+def record_positions(reader):
+    """
+    Every position of every game in a record file, including the start position and the final one
+
+    :param reader: ChessLikeRecords.GameRecordReader
+
+    :return: Generator of ChessLike games. The same object is reused within a game
+    """
+    for number in range(len(reader)):
+        for game in reader.iter_positions(number):
+            yield game
+
+
+def count_record_positions(reader):
+    """
+    Counts the positions record_positions will yield without replaying any games
+
+    :param reader: ChessLikeRecords.GameRecordReader
+
+    :return: Number of positions
+    """
+    return sum(len(moves) + 1 for moves, _ in reader.iter_games())
+
+
+def export_npz(positions, prefix, chunk_size=DEFAULT_CHUNK_SIZE, compress=False):
+    """
+    Writes positions as a series of .npz files named prefix-00000.npz, prefix-00001.npz, ... each holding a "planes"
+    and a "legal" array for one chunk
+
+    :param positions: Iterable of ChessLike games
+    :param prefix: Path prefix for the chunk files
+    :param chunk_size: Positions per file
+    :param compress: Whether to compress the files
+
+    :return: List of the paths written
+    """
+    save = np.savez_compressed if compress else np.savez
+    paths = []
+    for number, encoded in enumerate(iter_chunks(positions, chunk_size)):
+        planes, legal = encode_chunk(encoded)
+        path = f"{prefix}-{number:05d}.npz"
+        save(path, planes=planes, legal=legal)
+        paths.append(path)
+
+    return paths
+
+
+def export_memmap(positions, prefix, count, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Writes positions into two memory-mapped .npy files, prefix-planes.npy and prefix-legal.npy, that training code
+    can open with numpy.load(path, mmap_mode="r"). The files are made at full size up front and filled a chunk at a
+    time.
+
+    :param positions: Iterable of at least count ChessLike games
+    :param prefix: Path prefix for the two files
+    :param count: Number of positions to write
+    :param chunk_size: Positions converted at a time
+
+    :return: Number of positions written
+    """
+    planes_file = np.lib.format.open_memmap(f"{prefix}-planes.npy", mode="w+", dtype=np.uint8,
+                                            shape=(count, PLANE_COUNT, BOARD_WIDTH, BOARD_WIDTH))
+    legal_file = np.lib.format.open_memmap(f"{prefix}-legal.npy", mode="w+", dtype=bool,
+                                           shape=(count, SQUARE_COUNT, SQUARE_COUNT))
+
+    written = 0
+    for encoded in iter_chunks(islice(positions, count), chunk_size):
+        planes, legal = encode_chunk(encoded)
+        planes_file[written:written + len(encoded)] = planes
+        legal_file[written:written + len(encoded)] = legal
+        written += len(encoded)
+
+    planes_file.flush()
+    legal_file.flush()
+    if written != count:
+        raise ValueError(f"Expected {count} positions but only got {written}")
+
+    return written
+
+
+def main(argv=None):
+    """
+    Command line entry point. Exports every position in a game record file
+    """
+    parser = argparse.ArgumentParser(description="Export ChessLike positions from a game record file as NumPy arrays")
+    parser.add_argument("records", help="game record file written by ChessLikeRecords")
+    parser.add_argument("prefix", help="path prefix for the output files")
+    parser.add_argument("--format", choices=("npz", "memmap"), default="npz",
+                        help="npz chunk files, or two memory-mapped .npy files")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="positions per chunk")
+    parser.add_argument("--compress", action="store_true", help="compress npz chunk files")
+    args = parser.parse_args(argv)
+
+    with GameRecordReader(args.records) as reader:
+        if args.format == "memmap":
+            count = export_memmap(record_positions(reader), args.prefix, count_record_positions(reader),
+                                  args.chunk_size)
+            print(f"wrote {count} positions to {args.prefix}-planes.npy and {args.prefix}-legal.npy")
+        else:
+            paths = export_npz(record_positions(reader), args.prefix, args.chunk_size, args.compress)
+            print(f"wrote {len(paths)} chunk files to {args.prefix}-*.npz")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,210 @@
-from ChessLike import ChessLike
-from ChessLikeGUI import ChessLikeGUI
+# Description: Command line entry point for ChessLike. Run with no arguments, or with the gui command, to play in the
+# pygame window; the other commands run without a display. Each command imports only the modules it needs, so pygame
+# and SDL are loaded by the gui command alone and batch jobs and worker processes start without them.
+#
+# Usage: python -m PlayChessLike [gui|play-text|selfplay|perft|analyze] [options]
 
-game = ChessLike()
+import argparse
+import sys
 
-gui = ChessLikeGUI(game)
+from ChessLike import ChessLike, SQUARE_INDEX, SQUARES
 
-gui.run_game()
\ No newline at end of file
+#commands that hand their arguments to another module's main
+DELEGATED_COMMANDS = {
+    "selfplay": "ChessLikeSelfPlay",
+    "perft": "ChessLikePerft",
+}
+
+
+def parse_move(text):
+    """
+    Reads a move typed as "d1d2", "d1 d2" or "d1-d2"
+
+    :param text: Move text
+
+    :return: (origin, destination) tuple of square indexes, or None if the text isn't a move
+    """
+    text = text.replace(" ", "").replace("-", "").lower()
+    if len(text) != 4 or text[:2] not in SQUARE_INDEX or text[2:] not in SQUARE_INDEX:
+        return None
+
+    return SQUARE_INDEX[text[:2]], SQUARE_INDEX[text[2:]]
+
+
+def format_move(move):
+    return SQUARES[move[0]] + SQUARES[move[1]]
+
+
+def play_moves(moves):
+    """
+    Plays a list of moves from the start position
+
+    :param moves: Moves in any form parse_move reads
+
+    :return: ChessLike game after the moves
+    """
+    game = ChessLike(silent=True)
+    for text in moves:
+        move = parse_move(text)
+        if move is None or not game.make_move_index(*move):
+            raise ValueError(f"Illegal move {text} for {game.get_turn()}")
+
+    return game
+
+
+def make_engine(args, time_limit):
+    """
+    Makes the search engine for the gui, play-text and analyze commands from their options
+
+    :param time_limit: Seconds the engine searches when a search doesn't say, or None for no limit
+
+    :return: ChessLikeSearch.SearchEngine
+    """
+    from ChessLikeSearch import SearchEngine
+
+    tablebase = None
+    if args.tablebase:
+        from ChessLikeTablebase import Tablebase
+        tablebase = Tablebase(args.tablebase)
+
+    book = None
+    if args.book:
+        from ChessLikeBook import OpeningBook
+        book = OpeningBook(args.book)
+
+    return SearchEngine(max_depth=args.depth, time_limit=time_limit, tablebase=tablebase, book=book)
+
+
+def run_gui(args):
+    from ChessLikeGUI import ChessLikeGUI
+
+    #the GUI gives every move its think time, the engine itself has no limit so pondering lasts until the human moves
+    engine = make_engine(args, None) if args.engine else None
+    gui = ChessLikeGUI(ChessLike(), engine_color=args.engine, engine=engine, think_time=args.time,
+                       ponder=not args.no_ponder)
+    gui.run_game()
+    return 0
+
+
+def run_play_text(args):
+    """
+    Plays a game in the console, against another person or the search engine
+    """
+    engine = make_engine(args, args.time) if args.engine else None
+    game = ChessLike()
+
+    while game.get_game_state() == "UNFINISHED":
+        game.print_board()
+
+        if game.get_turn() == args.engine:
+            result = engine.search(game)
+            move = result.get_best_move()
+            if move is None:
+                print(f"{game.get_turn()} has no legal moves")
+                return 0
+
+            print(f"{game.get_turn()} plays {format_move(move)} (depth {result.get_depth()}, "
+                  f"score {result.get_score()})")
+            game.make_move_index(*move)
+            continue
+
+        try:
+            text = input(f"{game.get_turn()} to move (e.g. d1 d2, or quit): ").strip()
+        except EOFError:
+            print()
+            return 0
+
+        if text.lower() in ("quit", "exit", "q"):
+            return 0
+
+        move = parse_move(text)
+        if move is None or not game.make_move_index(*move):
+            print(f"Invalid move: {text}")
+
+    game.print_board()
+    return 0
+
+
+def run_analyze(args):
+    """
+    Searches a position and prints the best move with its principal variation
+    """
+    try:
+        game = play_moves(args.moves)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return 1
+
+    if game.get_game_state() != "UNFINISHED":
+        print(f"game over: {game.get_game_state()} won")
+        return 0
+
+    result = make_engine(args, args.time).search(game)
+    if result.get_best_move() is None:
+        print(f"{game.get_turn()} to move has no legal moves")
+        return 0
+
+    principal_variation = " ".join(format_move(move) for move in result.get_principal_variation())
+    rate = result.get_nodes() / result.get_elapsed() if result.get_elapsed() > 0 else 0.0
+    print(f"{game.get_turn()} to move")
+    print(f"best move: {format_move(result.get_best_move())}")
+    print(f"score: {result.get_score()}")
+    print(f"depth: {result.get_depth()}")
+    print(f"principal variation: {principal_variation}")
+    print(f"{result.get_nodes()} nodes in {result.get_elapsed():.3f}s ({rate:,.0f} nodes/s)")
+    return 0
+
+
+def add_engine_options(parser, depth, time_limit):
+    parser.add_argument("--depth", type=int, default=depth, help="deepest search iteration")
+    parser.add_argument("--time", type=float, default=time_limit, help="seconds to search for each move")
+    parser.add_argument("--book", help="opening book file written by ChessLikeBook")
+    parser.add_argument("--tablebase", help="directory of endgame tables written by ChessLikeTablebase")
+
+
+def main(argv=None):
+    """
+    Command line entry point. Starts the GUI when no command is given
+    """
+    parser = argparse.ArgumentParser(description="Play or analyze ChessLike")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    gui_parser = commands.add_parser("gui", help="play in a window (default)")
+    gui_parser.add_argument("--engine", choices=("BLUE", "ORANGE"), help="color the computer plays")
+    add_engine_options(gui_parser, 32, 2.0)
+    gui_parser.add_argument("--no-ponder", action="store_true",
+                            help="don't let the computer think while it is the human's turn")
+
+    text_parser = commands.add_parser("play-text", help="play in the console")
+    text_parser.add_argument("--engine", choices=("BLUE", "ORANGE"), help="color the computer plays")
+    add_engine_options(text_parser, 32, 2.0)
+
+    analyze_parser = commands.add_parser("analyze", help="search a position for the best move")
+    analyze_parser.add_argument("moves", nargs="*", help="moves played from the start position, like d1d2")
+    add_engine_options(analyze_parser, 32, 2.0)
+
+    #the rest of the command line goes to the other module's own parser, including -h
+    commands.add_parser("selfplay", add_help=False, help="play games between computer policies (see selfplay -h)")
+    commands.add_parser("perft", add_help=False, help="count move generation leaf nodes (see perft -h)")
+
+    args, extra = parser.parse_known_args(argv)
+
+    if args.command in DELEGATED_COMMANDS:
+        module = __import__(DELEGATED_COMMANDS[args.command])
+        return module.main(extra)
+
+    if extra:
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
+
+    if args.command == "play-text":
+        return run_play_text(args)
+    if args.command == "analyze":
+        return run_analyze(args)
+
+    if args.command is None:
+        args = parser.parse_args(["gui"])
+    return run_gui(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
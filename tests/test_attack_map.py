@@ -0,0 +1,88 @@
+# Description: Checks the incremental attack map against a map rebuilt from scratch and against brute force
+
+import random
+import unittest
+
+from ChessLike import AttackMap, ChessLike, SQUARES, SQUARE_INDEX
+
+
+def brute_force_attacked(game, square, color):
+    """
+    Checks whether any piece of the color reaches the square by asking every piece's can_move rule. A square held by
+    the color's own piece counts as reached when it is defended, as it does for the attack map.
+    """
+    for origin in range(len(SQUARES)):
+        piece = game.get_piece_at(origin)
+        if piece is not None and piece.get_color() == color and origin != square:
+            if piece.can_move_index(game, origin, square):
+                return True
+
+    return False
+
+
+class AttackMapTest(unittest.TestCase):
+
+    def assert_matches_rebuild(self, game):
+        attack_map = game.get_attack_map()
+        rebuilt = AttackMap([game.get_piece_at(square) for square in range(len(SQUARES))])
+        for square in range(len(SQUARES)):
+            self.assertEqual(attack_map.get_attackers(square), rebuilt.get_attackers(square))
+            self.assertEqual(attack_map.get_moves(square), rebuilt.get_moves(square))
+        for color in ("BLUE", "ORANGE"):
+            self.assertEqual(attack_map.get_origins(color), rebuilt.get_origins(color))
+
+    def test_updates_match_rebuild_through_moves_and_pops(self):
+        rng = random.Random(5)
+        for _ in range(20):
+            game = ChessLike(silent=True)
+            game.get_attack_map()
+            while game.get_game_state() == "UNFINISHED":
+                moves = game.legal_move_indexes()
+                for move in rng.sample(moves, min(3, len(moves))):
+                    game.push(move)
+                    self.assert_matches_rebuild(game)
+                    game.pop()
+                self.assert_matches_rebuild(game)
+                game.make_move_index(*rng.choice(moves))
+
+    def test_is_attacked_matches_brute_force(self):
+        rng = random.Random(7)
+        game = ChessLike(silent=True)
+        for _ in range(40):
+            if game.get_game_state() != "UNFINISHED":
+                game = ChessLike(silent=True)
+            for square in range(len(SQUARES)):
+                for color in ("BLUE", "ORANGE"):
+                    self.assertEqual(game.is_attacked(square, color), brute_force_attacked(game, square, color),
+                                     (SQUARES[square], color))
+            game.make_move_index(*rng.choice(game.legal_move_indexes()))
+
+    def test_legal_moves_same_with_and_without_map(self):
+        rng = random.Random(11)
+        plain = ChessLike(silent=True)
+        mapped = ChessLike(silent=True)
+        mapped.get_attack_map()
+        for _ in range(300):
+            if plain.get_game_state() != "UNFINISHED":
+                plain = ChessLike(silent=True)
+                mapped = ChessLike(silent=True)
+                mapped.get_attack_map()
+            moves = plain.legal_move_indexes()
+            self.assertEqual(mapped.legal_move_indexes(), moves)
+            for origin in range(len(SQUARES)):
+                self.assertEqual(mapped.legal_moves_from_index(origin), plain.legal_moves_from_index(origin))
+            move = rng.choice(moves)
+            plain.push(move)
+            mapped.push(move)
+
+    def test_is_attacked_notation(self):
+        game = ChessLike(silent=True)
+        self.assertEqual(game.is_attacked("D2", "BLUE"), game.is_attacked(SQUARE_INDEX["d2"], "BLUE"))
+        self.assertTrue(game.is_attacked("d2", "BLUE"))
+        self.assertFalse(game.is_attacked("d4", "BLUE"))
+        for square in ("z9", "", "d"):
+            self.assertFalse(game.is_attacked(square, "BLUE"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# Description: Checks that opening book files round-trip their statistics and that book moves are picked sensibly
+
+import os
+import tempfile
+import unittest
+
+from ChessLike import ChessLike, SQUARE_INDEX
+from ChessLikeBook import BookMove, OpeningBook, collect_statistics, write_book
+from ChessLikeSelfPlay import BookPolicy, RandomPolicy
+
+
+def move(text):
+    return SQUARE_INDEX[text[:2]], SQUARE_INDEX[text[2:]]
+
+
+class OpeningBookTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test.book")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, games, min_count=1):
+        statistics = collect_statistics(games, plies=4)
+        return write_book(statistics, self.path, min_count)
+
+    def test_round_trip(self):
+        games = [([move("d1d2"), move("d7d6")], "BLUE"),
+                 ([move("d1d2"), move("b7b6")], "ORANGE"),
+                 ([move("b1b2")], "UNFINISHED")]
+        self.assertEqual(self.write(games), 4)
+
+        with OpeningBook(self.path) as book:
+            self.assertEqual(len(book), 4)
+            start = {book_move.get_move(): book_move for book_move in book.lookup(ChessLike(silent=True))}
+            self.assertEqual(set(start), {move("d1d2"), move("b1b2")})
+            self.assertEqual((start[move("d1d2")].get_count(), start[move("d1d2")].get_score()), (2, 2))
+            self.assertEqual((start[move("b1b2")].get_count(), start[move("b1b2")].get_score()), (1, 1))
+
+            game = ChessLike(silent=True)
+            game.make_move_index(*move("b1b2"))
+            game.make_move_index(*move("b7b6"))
+            self.assertEqual(book.lookup(game), [])
+            self.assertIsNone(book.best_move(game))
+
+    def test_min_count_leaves_out_rare_moves(self):
+        games = [([move("d1d2")], "BLUE")] * 3 + [([move("b1b2")], "BLUE")]
+        self.assertEqual(self.write(games, min_count=2), 1)
+
+    def test_proven_move_beats_a_single_win(self):
+        games = [([move("b1b2")], "BLUE")] + [([move("d1d2")], "BLUE")] * 30 + [([move("d1d2")], "ORANGE")] * 10
+        self.write(games)
+        with OpeningBook(self.path) as book:
+            self.assertEqual(book.best_move(ChessLike(silent=True)), move("d1d2"))
+
+    def test_lower_bound_grows_with_games(self):
+        self.assertLess(BookMove(move("b1b2"), 1, 2).get_lower_bound(), BookMove(move("d1d2"), 100, 200).get_lower_bound())
+        self.assertLess(BookMove(move("b1b2"), 100, 120).get_lower_bound(), 0.6)
+
+    def test_rejects_other_files(self):
+        with open(self.path, "wb") as other:
+            other.write(b"not a book")
+        with self.assertRaises(ValueError):
+            OpeningBook(self.path)
+
+    def test_book_policy_plays_book_then_falls_back(self):
+        self.write([([move("d1d2"), move("d7d6")], "BLUE")] * 3)
+        with OpeningBook(self.path) as book:
+            policy = BookPolicy(RandomPolicy(0), book)
+            game = ChessLike(silent=True)
+            self.assertEqual(policy.choose_move(game), move("d1d2"))
+            game.make_move_index(*move("b1b2"))
+            self.assertIn(policy.choose_move(game), game.legal_move_indexes())
+
+
+if __name__ == "__main__":
+    unittest.main()
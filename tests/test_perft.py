@@ -0,0 +1,35 @@
+# Description: Checks the ChessLike move generator against the stored perft reference counts
+
+import unittest
+
+from ChessLikePerft import TEST_POSITIONS, divide, load_position, perft
+
+#deepest reference count checked for every position, deeper ones take too long for a test run
+MAX_TEST_DEPTH = 3
+
+
+class PerftTest(unittest.TestCase):
+
+    def test_reference_counts(self):
+        for name, position in TEST_POSITIONS.items():
+            game = load_position(name)
+            for depth in range(1, MAX_TEST_DEPTH + 1):
+                with self.subTest(position=name, depth=depth):
+                    self.assertEqual(perft(game, depth), position["counts"][depth])
+
+    def test_perft_leaves_game_unchanged(self):
+        game = load_position("middlegame")
+        before = game.to_bytes(), game.get_hash()
+        perft(game, 3)
+        self.assertEqual((game.to_bytes(), game.get_hash()), before)
+
+    def test_divide_adds_up_to_perft(self):
+        for name, position in TEST_POSITIONS.items():
+            with self.subTest(position=name):
+                counts = divide(load_position(name), 2)
+                self.assertEqual(len(counts), position["counts"][1])
+                self.assertEqual(sum(counts.values()), position["counts"][2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+# Description: Checks that pop takes back exactly what push did, and that push plays moves like make_move_index
+
+import random
+import unittest
+
+from ChessLike import ChessLike
+
+
+def snapshot(game):
+    return game.to_bytes(), game.get_hash(), game.get_turn(), game.get_game_state()
+
+
+class PushPopTest(unittest.TestCase):
+
+    def test_pop_restores_every_move(self):
+        rng = random.Random(3)
+        for _ in range(20):
+            game = ChessLike(silent=True)
+            while game.get_game_state() == "UNFINISHED":
+                before = snapshot(game)
+                moves = game.legal_move_indexes()
+                for move in moves:
+                    game.push(move)
+                    self.assertEqual(game.pop(), move)
+                    self.assertEqual(snapshot(game), before)
+                game.make_move_index(*rng.choice(moves))
+
+    def test_push_plays_like_make_move_index(self):
+        rng = random.Random(4)
+        for _ in range(20):
+            game = ChessLike(silent=True)
+            while game.get_game_state() == "UNFINISHED":
+                move = rng.choice(game.legal_move_indexes())
+                played = game.clone()
+                self.assertTrue(played.make_move_index(*move))
+                game.push(move)
+                self.assertEqual(snapshot(game), snapshot(played))
+
+    def test_whole_game_pops_back_to_start(self):
+        rng = random.Random(6)
+        start = snapshot(ChessLike(silent=True))
+        game = ChessLike(silent=True)
+        history = []
+        while game.get_game_state() == "UNFINISHED":
+            history.append(snapshot(game))
+            game.push(rng.choice(game.legal_move_indexes()))
+
+        #the last move captured a Bike, and taking it back reopens the game
+        self.assertEqual(game.get_game_state(), "ORANGE" if game.get_turn() == "BLUE" else "BLUE")
+        while history:
+            game.pop()
+            self.assertEqual(snapshot(game), history.pop())
+        self.assertEqual(snapshot(game), start)
+
+    def test_push_takes_board_notation(self):
+        game = ChessLike(silent=True)
+        game.push(("d1", "d2"))
+        played = ChessLike(silent=True)
+        played.make_move("d1", "d2")
+        self.assertEqual(snapshot(game), snapshot(played))
+
+
+if __name__ == "__main__":
+    unittest.main()
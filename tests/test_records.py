@@ -0,0 +1,79 @@
+# Description: Checks that game record files read back the games written to them
+
+import os
+import random
+import tempfile
+import unittest
+
+from ChessLike import ChessLike
+from ChessLikeRecords import GameRecordReader, GameRecordWriter, count_games, index_path
+
+
+def random_game(rng, max_moves):
+    game = ChessLike(silent=True)
+    moves = []
+    while game.get_game_state() == "UNFINISHED" and len(moves) < max_moves:
+        moves.append(rng.choice(game.legal_move_indexes()))
+        game.push(moves[-1])
+
+    return moves, game.get_game_state()
+
+
+class GameRecordsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "games.rec")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        rng = random.Random(11)
+        games = [random_game(rng, rng.choice((0, 5, 500))) for _ in range(30)]
+        with GameRecordWriter(self.path) as writer:
+            for moves, result in games:
+                writer.write_game(moves, result)
+
+        self.assertEqual(count_games(self.path), len(games))
+        with GameRecordReader(self.path) as reader:
+            self.assertEqual(len(reader), len(games))
+            self.assertEqual(list(reader), games)
+            self.assertEqual([reader.get_result(number) for number in range(len(games))],
+                             [result for _, result in games])
+            self.assertEqual(list(reader.iter_games(10, 12)), games[10:12])
+            with self.assertRaises(IndexError):
+                reader.get_game(len(games))
+
+    def test_positions_replay_the_game(self):
+        moves, result = random_game(random.Random(12), 500)
+        with GameRecordWriter(self.path) as writer:
+            writer.write_game(moves, result)
+
+        expected = ChessLike(silent=True)
+        with GameRecordReader(self.path) as reader:
+            positions = reader.iter_positions(0)
+            self.assertEqual(next(positions).to_bytes(), expected.to_bytes())
+            for move, game in zip(moves, positions):
+                expected.push(move)
+                self.assertEqual(game.to_bytes(), expected.to_bytes())
+
+    def test_appending_keeps_earlier_games(self):
+        with GameRecordWriter(self.path) as writer:
+            writer.write_game([(1, 8)], "UNFINISHED")
+        with GameRecordWriter(self.path) as writer:
+            writer.write_game([(3, 10)], "UNFINISHED")
+
+        with GameRecordReader(self.path) as reader:
+            self.assertEqual(list(reader), [([(1, 8)], "UNFINISHED"), ([(3, 10)], "UNFINISHED")])
+
+    def test_rejects_other_files(self):
+        for path in (self.path, index_path(self.path)):
+            with open(path, "wb") as other:
+                other.write(b"not a record file")
+        with self.assertRaises(ValueError):
+            GameRecordReader(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
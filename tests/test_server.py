@@ -0,0 +1,93 @@
+# Description: Loopback tests for ChessLikeServer, with real clients talking to a server on a local TCP port
+
+import asyncio
+import unittest
+
+from ChessLikeServer import GameClient, GameServer
+
+
+class GameServerTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = GameServer(engine_workers=1, opponents=("random",))
+        self.port = await self.server.start_tcp()
+        self.clients = []
+
+    async def asyncTearDown(self):
+        for client in self.clients:
+            await client.close()
+        await self.server.close()
+
+    async def connect(self):
+        client = await GameClient.connect_tcp("127.0.0.1", self.port)
+        self.clients.append(client)
+        return client
+
+    async def receive(self, client):
+        return await asyncio.wait_for(client.receive(), 10)
+
+    async def test_two_clients_play_each_other(self):
+        blue = await self.connect()
+        orange = await self.connect()
+
+        await blue.send(op="new", opponent="human", color="BLUE")
+        created = await self.receive(blue)
+        self.assertEqual(created["colors"], ["BLUE"])
+        await self.receive(blue)
+
+        await orange.send(op="join", game=created["game"])
+        joined = await self.receive(orange)
+        self.assertEqual(joined["colors"], ["ORANGE"])
+        await self.receive(orange)
+
+        #a color can't be taken twice, and a player can't move for the other color
+        watcher = await self.connect()
+        await watcher.send(op="join", game=created["game"])
+        self.assertEqual((await self.receive(watcher))["type"], "error")
+        await orange.send(op="move", game=created["game"], move="b7b6")
+        self.assertEqual((await self.receive(orange))["type"], "error")
+
+        await blue.send(op="move", game=created["game"], move="d1d2")
+        for client in (blue, orange):
+            state = await self.receive(client)
+            self.assertEqual(state["last_move"], "d1d2")
+            self.assertEqual(state["turn"], "ORANGE")
+
+        await orange.send(op="move", game=created["game"], move="d7d6")
+        for client in (blue, orange):
+            self.assertEqual((await self.receive(client))["turn"], "BLUE")
+
+    async def test_engine_opponent_replies(self):
+        client = await self.connect()
+        await client.send(op="new", opponent="random", color="BLUE")
+        created = await self.receive(client)
+        self.assertEqual(created["colors"], ["BLUE"])
+        await self.receive(client)
+
+        await client.send(op="move", game=created["game"], move="d1d2")
+        self.assertEqual((await self.receive(client))["turn"], "ORANGE")
+        reply = await self.receive(client)
+        self.assertEqual(reply["turn"], "BLUE")
+        self.assertIsNotNone(reply["last_move"])
+
+    async def test_bad_requests_get_errors(self):
+        client = await self.connect()
+        requests = [
+            {"op": "new", "opponent": 5},
+            {"op": "new", "opponent": "search:60"},
+            {"op": "new", "color": "GREEN"},
+            {"op": "move", "game": 99, "move": "d1d2"},
+            {"op": "join"},
+            {"op": "fly"},
+        ]
+        for request in requests:
+            await client.send(**request)
+            self.assertEqual((await self.receive(client))["type"], "error", request)
+
+        #the connection still works after the errors
+        await client.send(op="new")
+        self.assertEqual((await self.receive(client))["colors"], ["BLUE", "ORANGE"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+# Description: Checks generated endgame tables against the minimax of their moves and against a short exhaustive search
+
+import random
+import tempfile
+import unittest
+
+from ChessLike import ChessLike, ENCODED_SIZE, PIECE_CODES
+from ChessLikeTablebase import (DRAW, ILLEGAL, Tablebase, generate_table, parse_ending, table_path, verify_table,
+                                _decode_index, _read_table)
+
+#small enough to generate in a few seconds
+ENDINGS = ("BvB", "BCvB")
+
+
+def make_game(name, index):
+    """
+    Sets up the position a table index stands for
+    """
+    squares, turn = _decode_index(index, len(parse_ending(name)))
+    data = bytearray(ENCODED_SIZE)
+    for piece, square in zip(parse_ending(name), squares):
+        data[square >> 1] |= PIECE_CODES[(piece.get_name(), piece.get_color())] << ((square & 1) * 4)
+    data[ENCODED_SIZE - 1] = turn
+    return ChessLike.from_bytes(bytes(data), silent=True)
+
+
+def search_value(game, plies):
+    """
+    Searches every line to a number of plies and scores the position like a table entry
+
+    :return: Table value, or None if the result isn't decided within the plies
+    """
+    moves = game.legal_move_indexes()
+    if not moves:
+        return DRAW
+    if plies == 0:
+        return None
+
+    results = []
+    for move in moves:
+        game.push(move)
+        if game.get_game_state() != "UNFINISHED":
+            results.append(1)
+        else:
+            reply = search_value(game, plies - 1)
+            results.append(reply if reply is None or reply == DRAW else reply + 1)
+        game.pop()
+
+    wins = [result for result in results if result is not None and result & 1]
+    if wins:
+        return min(wins)
+    if None in results:
+        return None
+    if DRAW in results:
+        return DRAW
+
+    return max(results)
+
+
+class TablebaseTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        for name in ENDINGS:
+            generate_table(name, cls.directory.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_tables_match_minimax_of_their_moves(self):
+        for name in ENDINGS:
+            with self.subTest(name):
+                self.assertEqual(verify_table(name, self.directory.name), [])
+
+    def test_short_results_match_search(self):
+        rng = random.Random(15)
+        values = _read_table(self.directory.name, "BCvB")
+        short = [index for index, value in enumerate(values) if 1 <= value <= 3]
+        anything = [index for index, value in enumerate(values) if value != ILLEGAL]
+        for index in rng.sample(short, 40) + rng.sample(anything, 20):
+            with self.subTest(index=index):
+                #results within 3 plies must be found, and whatever the search decides must agree with the table
+                value = search_value(make_game("BCvB", index), 3)
+                if value is not None or 1 <= values[index] <= 3:
+                    self.assertEqual(value, values[index])
+
+    def test_best_move_keeps_the_result(self):
+        rng = random.Random(16)
+        values = _read_table(self.directory.name, "BCvB")
+        with Tablebase(self.directory.name) as tablebase:
+            self.assertEqual(tablebase.get_max_pieces(), 3)
+            self.assertIsNone(tablebase.probe(ChessLike(silent=True)))
+
+            for index in rng.sample([index for index, value in enumerate(values) if value not in (ILLEGAL, DRAW)], 50):
+                game = make_game("BCvB", index)
+                if not game.legal_move_indexes():
+                    continue
+                with self.subTest(index=index):
+                    result, distance = tablebase.probe(game)
+                    self.assertEqual((result, distance), ("WIN" if values[index] & 1 else "LOSS", values[index]))
+
+                    move, _, _ = tablebase.best_move(game)
+                    game.push(move)
+                    if distance == 1:
+                        self.assertNotEqual(game.get_game_state(), "UNFINISHED")
+                    else:
+                        self.assertEqual(tablebase.probe_value(game), distance - 1)
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            parse_ending("CvB")
+
+        with tempfile.TemporaryDirectory() as directory:
+            with open(table_path(directory, "BvB"), "wb") as other:
+                other.write(b"not a table")
+            with self.assertRaises(ValueError):
+                generate_table("BCvB", directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+# Description: Checks the exported feature planes and legal move masks against the ChessLike positions they came from
+
+import os
+import random
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ChessLike import BOARD_WIDTH, ChessLike, PIECE_CODES, SQUARES
+
+if np is not None:
+    from ChessLikeRecords import GameRecordReader, GameRecordWriter
+    from ChessLikeTensors import (PLANE_COUNT, TURN_PLANE, count_record_positions, encode_chunk, export_memmap,
+                                  export_npz, iter_chunks, record_positions)
+
+
+def random_games(seed, games):
+    """
+    Plays random games to the end
+
+    :return: List of (moves, result) tuples like the ones in a record file
+    """
+    rng = random.Random(seed)
+    records = []
+    for _ in range(games):
+        game = ChessLike(silent=True)
+        moves = []
+        while game.get_game_state() == "UNFINISHED":
+            moves.append(rng.choice(game.legal_move_indexes()))
+            game.push(moves[-1])
+        records.append((moves, game.get_game_state()))
+
+    return records
+
+
+def replay(records):
+    """
+    Every position of the games, including the start and the final position of each
+    """
+    positions = []
+    for moves, _ in records:
+        game = ChessLike(silent=True)
+        positions.append(game.clone())
+        for move in moves:
+            game.push(move)
+            positions.append(game.clone())
+
+    return positions
+
+
+@unittest.skipIf(np is None, "needs numpy")
+class TensorExportTest(unittest.TestCase):
+
+    def assert_encodes(self, positions, planes, legal):
+        self.assertEqual(planes.shape, (len(positions), PLANE_COUNT, BOARD_WIDTH, BOARD_WIDTH))
+        self.assertEqual(legal.shape, (len(positions), len(SQUARES), len(SQUARES)))
+        for number, game in enumerate(positions):
+            expected = np.zeros((PLANE_COUNT, len(SQUARES)), dtype=np.uint8)
+            for square in range(len(SQUARES)):
+                piece = game.get_piece_at(square)
+                if piece is not None:
+                    expected[PIECE_CODES[(piece.get_name(), piece.get_color())] - 1, square] = 1
+            expected[TURN_PLANE] = game.get_turn() == "ORANGE"
+            self.assertTrue(np.array_equal(planes[number].reshape(PLANE_COUNT, -1), expected), number)
+
+            moves = set(game.legal_move_indexes()) if game.get_game_state() == "UNFINISHED" else set()
+            self.assertEqual(set(zip(*np.nonzero(legal[number]))), moves, number)
+
+    def test_encode_chunk_matches_positions(self):
+        positions = replay(random_games(13, 10))
+        planes, legal = encode_chunk(next(iter_chunks(positions, len(positions))))
+        self.assert_encodes(positions, planes, legal)
+
+    def test_exports_from_record_file(self):
+        records = random_games(14, 5)
+        positions = replay(records)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.rec")
+            with GameRecordWriter(path) as writer:
+                for moves, result in records:
+                    writer.write_game(moves, result)
+
+            prefix = os.path.join(directory, "out")
+            with GameRecordReader(path) as reader:
+                count = count_record_positions(reader)
+                self.assertEqual(count, len(positions))
+                paths = export_npz(record_positions(reader), prefix, chunk_size=64)
+                self.assertEqual(export_memmap(record_positions(reader), prefix, count, chunk_size=64), count)
+
+            chunks = [np.load(chunk) for chunk in paths]
+            self.assertEqual(len(chunks), -(-count // 64))
+            self.assert_encodes(positions, np.concatenate([chunk["planes"] for chunk in chunks]),
+                                np.concatenate([chunk["legal"] for chunk in chunks]))
+            self.assert_encodes(positions, np.load(prefix + "-planes.npy"), np.load(prefix + "-legal.npy"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+# Description: Checks the incrementally kept Zobrist hash against one computed from scratch
+
+import random
+import unittest
+
+from ChessLike import ChessLike
+
+
+class ZobristTest(unittest.TestCase):
+
+    def test_incremental_hash_matches_compute_hash(self):
+        rng = random.Random(8)
+        for _ in range(20):
+            game = ChessLike(silent=True)
+            self.assertEqual(game.get_hash(), game.compute_hash())
+            while game.get_game_state() == "UNFINISHED":
+                moves = game.legal_move_indexes()
+                for move in rng.sample(moves, min(3, len(moves))):
+                    game.push(move)
+                    self.assertEqual(game.get_hash(), game.compute_hash())
+                    game.pop()
+                    self.assertEqual(game.get_hash(), game.compute_hash())
+                game.make_move_index(*rng.choice(moves))
+                self.assertEqual(game.get_hash(), game.compute_hash())
+
+    def test_copies_keep_the_hash(self):
+        rng = random.Random(9)
+        game = ChessLike(silent=True)
+        while game.get_game_state() == "UNFINISHED":
+            copy = ChessLike.from_bytes(game.to_bytes(), silent=True)
+            self.assertEqual(copy.to_bytes(), game.to_bytes())
+            self.assertEqual(copy.get_hash(), game.get_hash())
+            self.assertEqual(game.clone().get_hash(), game.get_hash())
+            game.make_move_index(*rng.choice(game.legal_move_indexes()))
+
+    def test_transposition_gives_same_hash(self):
+        first = ChessLike(silent=True)
+        for move in (("b1", "b2"), ("b7", "b6"), ("d1", "d2"), ("d7", "d6")):
+            first.push(move)
+        second = ChessLike(silent=True)
+        for move in (("d1", "d2"), ("d7", "d6"), ("b1", "b2"), ("b7", "b6")):
+            second.push(move)
+        self.assertEqual(first.to_bytes(), second.to_bytes())
+        self.assertEqual(first.get_hash(), second.get_hash())
+
+    def test_turn_changes_the_hash(self):
+        game = ChessLike(silent=True)
+        data = bytearray(game.to_bytes())
+        data[-1] |= 1
+        self.assertNotEqual(ChessLike.from_bytes(bytes(data)).get_hash(), game.get_hash())
+
+    def test_rejects_bad_encodings(self):
+        data = ChessLike(silent=True).to_bytes()
+        with self.assertRaises(ValueError):
+            ChessLike.from_bytes(data[:-1])
+        with self.assertRaises(ValueError):
+            ChessLike.from_bytes(data[:-1] + bytes([0xFE]))
+
+
+if __name__ == "__main__":
+    unittest.main()